@@ -0,0 +1,231 @@
+# audio/batch_render.py
+from __future__ import annotations
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+from core.io import SearchResult, load_result_json
+from core.melody import Melody
+from audio.midi_writer import MidiRenderConfig, write_midi
+from audio.render_cache import RenderCache, render_key
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    name: str
+    melody: Melody
+    wav_path: str
+    mid_path: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class RenderOutcome:
+    name: str
+    status: str  # "rendered" | "cached" | "failed"
+    seconds: float = 0.0
+    error: str = ""
+
+
+def index_render_jobs(run_dir: str, limit: int, mids_dir: str, wavs_dir: str) -> List[RenderJob]:
+    """Joby dla top-`limit` elit (po score) z index.json runu."""
+    index_path = os.path.join(run_dir, "index.json")
+    if not os.path.isfile(index_path):
+        raise FileNotFoundError(f"index.json not found in: {run_dir}")
+    with open(index_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+
+    # renderuj top-N po score
+    items = sorted(items, key=lambda x: x["score"], reverse=True)[:limit]
+
+    jobs = []
+    for it in items:
+        json_file = os.path.join(run_dir, it["file"])
+        # "n16/elite_...json" (wspólny indeks runu wielu długości) -> "n16_elite_..."
+        stem = os.path.splitext(it["file"])[0].replace("/", "_").replace(os.sep, "_")
+        jobs.append(RenderJob(
+            name=stem,
+            melody=load_result_json(json_file).melody,
+            wav_path=os.path.join(wavs_dir, f"{stem}.wav"),
+            mid_path=os.path.join(mids_dir, f"{stem}.mid"),
+        ))
+    return jobs
+
+
+def _run_labels(run_ids: Sequence[str]) -> dict:
+    # ścieżka runu względem wspólnego katalogu (results/map_elites/run3 i
+    # results/sweeps/run3 -> map_elites_run3, sweeps_run3); jeden run -> jego nazwa
+    paths = {r: os.path.abspath(r) for r in set(run_ids) if r}
+    if len(paths) <= 1:
+        return {r: os.path.basename(p) for r, p in paths.items()}
+    root = os.path.commonpath(list(paths.values()))
+    return {r: os.path.relpath(p, root).replace(os.sep, "_") for r, p in paths.items()}
+
+
+def result_render_jobs(results: Sequence[SearchResult], mids_dir: str, wavs_dir: str) -> List[RenderJob]:
+    """Joby dla wyników zapytania do bazy elit (EliteStore.query); nazwa = <run>_<plik elity>, unikalna."""
+    run_ids = [str((sr.meta or {}).get("run_id") or "") for sr in results]
+    labels = _run_labels(run_ids)
+    jobs = []
+    used = set()
+    for i, (sr, run_id) in enumerate(zip(results, run_ids)):
+        meta = sr.meta or {}
+        stem = os.path.splitext(str(meta.get("file") or f"elite_{i:04d}"))[0].replace("/", "_").replace(os.sep, "_")
+        name = f"{labels.get(run_id) or 'query'}_{stem}"
+        if name in used:
+            # np. "a_b/run1" i "a/b_run1" po spłaszczeniu; nie nadpisuj cudzego pliku
+            name = f"{name}_{i:04d}"
+        used.add(name)
+        jobs.append(RenderJob(
+            name=name,
+            melody=sr.melody,
+            wav_path=os.path.join(wavs_dir, f"{name}.wav"),
+            mid_path=os.path.join(mids_dir, f"{name}.mid"),
+        ))
+    return jobs
+
+
+def _render_one(
+    renderer,
+    job: RenderJob,
+    midi_cfg: Optional[MidiRenderConfig],
+    cache: Optional[RenderCache],
+    force: bool,
+) -> RenderOutcome:
+    t0 = time.perf_counter()
+    try:
+        if cache is None:
+            renderer.render_melody_to_wav(
+                job.melody,
+                wav_path=job.wav_path,
+                midi_tmp_path=job.mid_path or os.path.splitext(job.wav_path)[0] + ".mid",
+                midi_cfg=midi_cfg,
+                keep_midi=job.mid_path is not None,
+            )
+            return RenderOutcome(job.name, "rendered", time.perf_counter() - t0)
+
+        key = render_key(job.melody, midi_cfg, renderer.cfg)
+        status = "cached"
+        if force or not cache.has(key):
+            tmp_wav = cache.tmp_path(key, ".wav")
+            tmp_mid = cache.tmp_path(key, ".mid")
+            try:
+                renderer.render_melody_to_wav(
+                    job.melody,
+                    wav_path=tmp_wav,
+                    midi_tmp_path=tmp_mid,
+                    midi_cfg=midi_cfg,
+                    keep_midi=True,
+                )
+                cache.commit(key, tmp_wav, tmp_mid)
+            finally:
+                for p in (tmp_wav, tmp_mid):
+                    if os.path.exists(p):
+                        os.remove(p)
+            status = "rendered"
+
+        cache.materialize(key, job.wav_path, job.mid_path)
+        return RenderOutcome(job.name, status, time.perf_counter() - t0)
+    except Exception as ex:  # raportujemy per element, reszta wsadu leci dalej
+        return RenderOutcome(job.name, "failed", time.perf_counter() - t0, error=f"{type(ex).__name__}: {ex}")
+
+
+def _render_chunk(
+    renderer,
+    jobs: List[RenderJob],
+    midi_cfg: Optional[MidiRenderConfig],
+    cache: Optional[RenderCache],
+    gap_s: float,
+) -> List[RenderOutcome]:
+    """Kilka jobów jednym procesem FluidSynth; przy błędzie wraca do renderowania pojedynczo."""
+    t0 = time.perf_counter()
+    keys = [render_key(j.melody, midi_cfg, renderer.cfg) for j in jobs] if cache is not None else []
+    if cache is not None:
+        wavs = [cache.tmp_path(k, f".{i}.wav") for i, k in enumerate(keys)]
+        mids = [cache.tmp_path(k, f".{i}.mid") for i, k in enumerate(keys)]
+        batch_mid = cache.tmp_path(keys[0], ".batch.mid")
+    else:
+        wavs = [j.wav_path for j in jobs]
+        mids = [j.mid_path for j in jobs]
+        batch_mid = os.path.splitext(jobs[0].wav_path)[0] + ".batch.mid"
+
+    try:
+        renderer.render_batch_to_wavs(
+            [j.melody for j in jobs],
+            wavs,
+            midi_tmp_path=batch_mid,
+            midi_cfg=midi_cfg,
+            gap_s=gap_s,
+        )
+        for j, mid in zip(jobs, mids):
+            if mid is not None:
+                write_midi(j.melody, mid, cfg=midi_cfg)
+        if cache is not None:
+            for j, k, w, m in zip(jobs, keys, wavs, mids):
+                cache.commit(k, w, m)
+                cache.materialize(k, j.wav_path, j.mid_path)
+    except Exception:
+        return [_render_one(renderer, j, midi_cfg, cache, force=True) for j in jobs]
+    finally:
+        if cache is not None:
+            for p in wavs + mids:
+                if os.path.exists(p):
+                    os.remove(p)
+
+    per_item = (time.perf_counter() - t0) / len(jobs)
+    return [RenderOutcome(j.name, "rendered", per_item) for j in jobs]
+
+
+def render_jobs(
+    renderer,
+    jobs: List[RenderJob],
+    *,
+    midi_cfg: Optional[MidiRenderConfig] = None,
+    workers: int = 4,
+    cache: Optional[RenderCache] = None,
+    force: bool = False,
+    on_done: Optional[Callable[[RenderOutcome], None]] = None,
+    batch_size: int = 0,
+    gap_s: float = 1.0,
+) -> List[RenderOutcome]:
+    """
+    Renderuje joby w puli wątków (każdy wątek to osobny proces FluidSynth,
+    więc GIL nie przeszkadza). Wyniki w kolejności jobów.
+
+    batch_size > 0 (i renderer z render_batch_to_wavs): brakujące w cache melodie
+    są renderowane po batch_size na jedno wywołanie renderera.
+    """
+    if not jobs:
+        return []
+    out: List[Optional[RenderOutcome]] = [None] * len(jobs)
+
+    def done(i: int, res: RenderOutcome) -> None:
+        out[i] = res
+        if on_done is not None:
+            on_done(res)
+
+    batched = batch_size > 0 and hasattr(renderer, "render_batch_to_wavs")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        if not batched:
+            futs = {ex.submit(_render_one, renderer, job, midi_cfg, cache, force): [i] for i, job in enumerate(jobs)}
+        else:
+            todo: List[int] = []
+            for i, job in enumerate(jobs):
+                if cache is not None and not force and cache.has(render_key(job.melody, midi_cfg, renderer.cfg)):
+                    done(i, _render_one(renderer, job, midi_cfg, cache, force=False))  # tylko link z cache
+                else:
+                    todo.append(i)
+            groups = [todo[k:k + batch_size] for k in range(0, len(todo), batch_size)]
+            futs = {
+                ex.submit(_render_chunk, renderer, [jobs[i] for i in g], midi_cfg, cache, gap_s): g
+                for g in groups
+            }
+
+        for fut in as_completed(futs):
+            res = fut.result()
+            for i, r in zip(futs[fut], res if isinstance(res, list) else [res]):
+                done(i, r)
+    return out
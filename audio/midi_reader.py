@@ -0,0 +1,153 @@
+# audio/midi_reader.py
+from __future__ import annotations
+
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# Odczyt SMF (format 0/1) bez zależności: nuty (początek/koniec w tickach) per
+# ścieżka i kanał. Obsługuje running status, meta i sysex (pomijane);
+# note-on z velocity 0 = note-off; niezamknięte nuty kończą się z końcem ścieżki.
+
+DRUM_CHANNEL = 9  # GM: kanał 10
+
+
+@dataclass(frozen=True)
+class MidiNote:
+    start: int
+    end: int
+    pitch: int
+    velocity: int
+    channel: int
+    track: int
+
+
+# liczba bajtów danych komunikatów kanałowych (wg górnej połówki statusu)
+_DATA_LEN = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+
+def _varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    v = 0
+    for _ in range(4):
+        b = buf[pos]
+        pos += 1
+        v = (v << 7) | (b & 0x7F)
+        if b < 0x80:
+            return v, pos
+    raise ValueError("Variable-length quantity longer than 4 bytes")
+
+
+def _chunks(data: bytes):
+    pos = 0
+    while pos + 8 <= len(data):
+        kind = data[pos:pos + 4]
+        size = int.from_bytes(data[pos + 4:pos + 8], "big")
+        body = data[pos + 8:pos + 8 + size]
+        if len(body) < size:
+            raise ValueError(f"Truncated {kind!r} chunk")
+        yield kind, body
+        pos += 8 + size
+
+
+def _track_notes(body: bytes, track: int) -> List[MidiNote]:
+    notes: List[MidiNote] = []
+    open_notes: Dict[Tuple[int, int], deque] = defaultdict(deque)
+    tick = 0
+    pos = 0
+    status = 0
+    try:
+        while pos < len(body):
+            delta, pos = _varint(body, pos)
+            tick += delta
+            b = body[pos]
+            if b == 0xFF:  # meta
+                kind = body[pos + 1]
+                n, pos = _varint(body, pos + 2)
+                pos += n
+                if kind == 0x2F:  # end of track
+                    break
+                continue
+            if b in (0xF0, 0xF7):  # sysex
+                n, pos = _varint(body, pos + 1)
+                pos += n
+                continue
+            if b & 0x80:
+                status = b
+                pos += 1
+            elif not status:
+                raise ValueError("Data byte without running status")
+            kind, ch = status & 0xF0, status & 0x0F
+            n = _DATA_LEN.get(kind)
+            if n is None:
+                raise ValueError(f"Unsupported status byte 0x{status:02X}")
+            data = body[pos:pos + n]
+            if len(data) < n:
+                raise IndexError
+            pos += n
+            if kind == 0x90 and data[1] > 0:
+                open_notes[(ch, data[0])].append((tick, data[1]))
+            elif kind == 0x80 or kind == 0x90:
+                q = open_notes.get((ch, data[0]))
+                if q:
+                    start, vel = q.popleft()
+                    notes.append(MidiNote(start, tick, data[0], vel, ch, track))
+    except IndexError:
+        raise ValueError(f"Truncated track {track}") from None
+
+    for (ch, pitch), q in open_notes.items():
+        for start, vel in q:
+            notes.append(MidiNote(start, tick, pitch, vel, ch, track))
+    return notes
+
+
+def read_midi_notes(data: bytes) -> Tuple[int, List[MidiNote]]:
+    """(ticks na ćwierćnutę, nuty posortowane po początku) z zawartości pliku .mid."""
+    chunks = _chunks(data)
+    kind, head = next(chunks, (None, b""))
+    if kind != b"MThd" or len(head) < 6:
+        raise ValueError("Not a standard MIDI file (missing MThd)")
+    fmt = int.from_bytes(head[0:2], "big")
+    division = int.from_bytes(head[4:6], "big")
+    if fmt not in (0, 1):
+        raise ValueError(f"Unsupported SMF format {fmt}")
+    # SMPTE (bit 15): ticki i tak są monotoniczne, zostawiamy je jak są
+    ppq = division if not division & 0x8000 else 0
+
+    notes: List[MidiNote] = []
+    track = 0
+    for kind, body in chunks:
+        if kind != b"MTrk":
+            continue  # nieznane chunki wolno pomijać
+        notes.extend(_track_notes(body, track))
+        track += 1
+    notes.sort(key=lambda n: (n.start, -n.pitch))
+    return ppq, notes
+
+
+def read_midi_file(path: str) -> Tuple[int, List[MidiNote]]:
+    with open(path, "rb") as f:
+        return read_midi_notes(f.read())
+
+
+def monophonic_lines(notes: List[MidiNote], skip_drums: bool = True) -> List[List[int]]:
+    """
+    Jedna linia na (ścieżka, kanał): "skyline" - przy każdym początku nuty
+    najwyższa z nut zaczynających się w tym ticku. Rytm jest pomijany.
+    """
+    voices: Dict[Tuple[int, int], List[MidiNote]] = defaultdict(list)
+    for n in notes:
+        if skip_drums and n.channel == DRUM_CHANNEL:
+            continue
+        voices[(n.track, n.channel)].append(n)
+
+    lines = []
+    for key in sorted(voices):
+        line: List[int] = []
+        last_start = None
+        # nuty są posortowane (start, -pitch): pierwsza w ticku = najwyższa
+        for n in voices[key]:
+            if n.start != last_start:
+                line.append(n.pitch)
+                last_start = n.start
+        lines.append(line)
+    return lines
@@ -1,13 +1,24 @@
 # audio/midi_writer.py
 from __future__ import annotations
 
+import struct
 from dataclasses import dataclass
-from typing import Optional, Tuple
-
-import pretty_midi
+from typing import List, Optional, Sequence, Tuple
 
 from core.melody import Melody
 
+# Zapis SMF bajt po bajcie (bez pretty_midi): stały nagłówek, delta-time jako
+# varint i cała ścieżka składana jednym b"".join. Tempo 120 BPM, PPQ 480,
+# więc 1 s = 960 ticków.
+
+PPQ = 480
+TEMPO_US_PER_QN = 500000  # 120 BPM
+TICKS_PER_SECOND = PPQ * 1_000_000 // TEMPO_US_PER_QN
+
+# meta tempo (delta 0) na początku ścieżki dyrygenckiej / jedynej ścieżki
+_TEMPO_EVENT = b"\x00\xff\x51\x03" + TEMPO_US_PER_QN.to_bytes(3, "big")
+_END_OF_TRACK = b"\x00\xff\x2f\x00"
+
 
 @dataclass(frozen=True)
 class MidiRenderConfig:
@@ -54,31 +65,146 @@ def _shift_to_midi_range(pitches: Tuple[int, ...], cfg: MidiRenderConfig) -> Tup
     return tuple(shifted)
 
 
+def encode_varint(v: int) -> bytes:
+    """Liczba o zmiennej długości (delta-time w SMF): 7 bitów na bajt, MSB = kontynuacja."""
+    if v < 0:
+        raise ValueError("varint must be >= 0")
+    out = [v & 0x7F]
+    v >>= 7
+    while v:
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    return bytes(reversed(out))
+
+
+def _seconds_to_ticks(t: float) -> int:
+    return int(round(t * TICKS_PER_SECOND))
+
+
+def _header(fmt: int, n_tracks: int) -> bytes:
+    return b"MThd" + struct.pack(">IHHH", 6, fmt, n_tracks, PPQ)
+
+
+def _track(events: bytes) -> bytes:
+    return b"MTrk" + struct.pack(">I", len(events)) + events
+
+
+def _program_change(channel: int, program: int) -> bytes:
+    return bytes((0x00, 0xC0 | channel, _clamp(int(program), 0, 127)))
+
+
+def _melody_events(
+    melody: Melody,
+    cfg: MidiRenderConfig,
+    channel: int = 0,
+    lead_ticks: int = 0,
+) -> Tuple[bytes, int]:
+    """
+    Zdarzenia note on/off melodii. lead_ticks = cisza przed pierwszą nutą.
+    Zwraca (bajty, długość melodii w tickach).
+    """
+    midi_pitches = _shift_to_midi_range(melody.pitches, cfg)
+    velocity = _clamp(int(cfg.velocity), 0, 127)
+    on = 0x90 | channel
+    off = 0x80 | channel
+
+    # wszystkie nuty mają tę samą długość; ticki liczymy od początku melodii,
+    # żeby błąd zaokrąglenia się nie kumulował
+    ends = [_seconds_to_ticks((i + 1) * melody.unit_duration) for i in range(len(midi_pitches))]
+
+    parts = []
+    prev = 0
+    for i, p in enumerate(midi_pitches):
+        start_delta = lead_ticks if i == 0 else 0
+        parts.append(encode_varint(start_delta))
+        parts.append(bytes((on, p, velocity)))
+        parts.append(encode_varint(ends[i] - prev))
+        parts.append(bytes((off, p, 0)))
+        prev = ends[i]
+    return b"".join(parts), prev
+
+
+def midi_bytes(melody: Melody, cfg: Optional[MidiRenderConfig] = None) -> bytes:
+    cfg = cfg or MidiRenderConfig()
+    events, _ = _melody_events(melody, cfg)
+    return _header(0, 1) + _track(
+        _TEMPO_EVENT + _program_change(0, cfg.instrument_program) + events + _END_OF_TRACK
+    )
+
+
 def write_midi(melody: Melody, path: str, cfg: Optional[MidiRenderConfig] = None) -> None:
+    with open(path, "wb") as f:
+        f.write(midi_bytes(melody, cfg))
+
+
+def write_midi_many(
+    melodies: Sequence[Melody],
+    paths: Sequence[str],
+    cfg: Optional[MidiRenderConfig] = None,
+) -> None:
+    """Wiele melodii, każda do osobnego pliku."""
+    if len(melodies) != len(paths):
+        raise ValueError("melodies and paths must have the same length.")
     cfg = cfg or MidiRenderConfig()
+    for melody, path in zip(melodies, paths):
+        write_midi(melody, path, cfg)
 
-    # 1) Mapowanie do bezpiecznego MIDI
-    midi_pitches = _shift_to_midi_range(melody.pitches, cfg)
 
-    # 2) Walidacja velocity
-    velocity = _clamp(int(cfg.velocity), 0, 127)
+def sequence_midi_bytes(
+    melodies: Sequence[Melody],
+    cfg: Optional[MidiRenderConfig] = None,
+    gap_s: float = 1.0,
+) -> Tuple[bytes, List[Tuple[float, float]]]:
+    """Melodie jako kolejne sekcje jednej ścieżki; zwraca (bajty, (start, koniec) w sekundach)."""
+    cfg = cfg or MidiRenderConfig()
+    gap = _seconds_to_ticks(gap_s)
+
+    parts = [_TEMPO_EVENT, _program_change(0, cfg.instrument_program)]
+    spans: List[Tuple[float, float]] = []
+    t = 0
+    for i, melody in enumerate(melodies):
+        lead = gap if i > 0 else 0
+        events, length = _melody_events(melody, cfg, lead_ticks=lead)
+        parts.append(events)
+        t += lead
+        spans.append((t / TICKS_PER_SECOND, (t + length) / TICKS_PER_SECOND))
+        t += length
+    parts.append(_END_OF_TRACK)
+    return _header(0, 1) + _track(b"".join(parts)), spans
+
+
+def write_midi_sequence(
+    melodies: Sequence[Melody],
+    path: str,
+    cfg: Optional[MidiRenderConfig] = None,
+    gap_s: float = 1.0,
+) -> List[Tuple[float, float]]:
+    """
+    Wszystkie melodie jedna po drugiej na jednej osi czasu, z przerwą gap_s.
+    Każda melodia jest osobno przesuwana do zakresu MIDI (_shift_to_midi_range).
+    Zwraca (start, koniec) każdej melodii w sekundach.
+    """
+    data, spans = sequence_midi_bytes(melodies, cfg, gap_s)
+    with open(path, "wb") as f:
+        f.write(data)
+    return spans
+
 
-    pm = pretty_midi.PrettyMIDI()
-    instr = pretty_midi.Instrument(program=int(cfg.instrument_program))
-
-    t = 0.0
-    dur = float(melody.unit_duration)
-
-    for p in midi_pitches:
-        # p już jest 0..127
-        note = pretty_midi.Note(
-            velocity=velocity,
-            pitch=int(p),
-            start=t,
-            end=t + dur,
-        )
-        instr.notes.append(note)
-        t += dur
-
-    pm.instruments.append(instr)
-    pm.write(path)
+def write_midi_tracks(
+    melodies: Sequence[Melody],
+    path: str,
+    cfg: Optional[MidiRenderConfig] = None,
+) -> None:
+    """
+    SMF format 1: ścieżka dyrygencka (tempo) + jedna ścieżka na melodię, wszystkie od t=0.
+    Kanały kolejno 0..15 z pominięciem 9 (perkusja GM).
+    """
+    cfg = cfg or MidiRenderConfig()
+    channels = [c for c in range(16) if c != 9]
+    tracks = [_track(_TEMPO_EVENT + _END_OF_TRACK)]
+    for i, melody in enumerate(melodies):
+        ch = channels[i % len(channels)]
+        events, _ = _melody_events(melody, cfg, channel=ch)
+        tracks.append(_track(_program_change(ch, cfg.instrument_program) + events + _END_OF_TRACK))
+    with open(path, "wb") as f:
+        f.write(_header(1, len(tracks)) + b"".join(tracks))
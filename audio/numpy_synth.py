@@ -0,0 +1,188 @@
+# audio/numpy_synth.py
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.melody import Melody
+from audio.midi_writer import MidiRenderConfig, _shift_to_midi_range, write_midi
+from audio.wav_io import pcm16_fmt_chunk, write_wav_bytes
+
+# Syntezator w procesie (bez fluidsynth / SF2): wavetable z kilku harmonicznych
+# + obwiednia ADSR, wszystko wektorowo w numpy. Do szybkich odsłuchów i na
+# headless workerach; brzmi jak organki, nie jak fortepian.
+
+_TABLE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class SynthConfig:
+    sample_rate: int = 44100
+    gain: float = 0.9
+    # amplitudy kolejnych harmonicznych (1 = podstawowa)
+    harmonics: Tuple[float, ...] = (1.0, 0.45, 0.25, 0.12, 0.06)
+    attack_s: float = 0.01
+    decay_s: float = 0.08
+    sustain: float = 0.7
+    release_s: float = 0.15
+    # ile ciszy + wybrzmienia po ostatniej nucie
+    tail_s: float = 0.5
+
+
+def _wavetable(harmonics: Tuple[float, ...]) -> np.ndarray:
+    ph = np.arange(_TABLE_SIZE, dtype=np.float64) * (2.0 * np.pi / _TABLE_SIZE)
+    table = np.zeros(_TABLE_SIZE, dtype=np.float64)
+    for k, a in enumerate(harmonics, start=1):
+        table += a * np.sin(k * ph)
+    peak = np.max(np.abs(table))
+    return (table / peak if peak > 0 else table).astype(np.float32)
+
+
+def _envelope(cfg: SynthConfig, note_len: int, rel_len: int) -> np.ndarray:
+    """ADSR dla jednej nuty: note_len próbek trzymania + rel_len próbek release."""
+    sr = cfg.sample_rate
+    a = min(note_len, max(1, int(cfg.attack_s * sr)))
+    d = min(note_len - a, int(cfg.decay_s * sr))
+    env = np.empty(note_len + rel_len, dtype=np.float32)
+    env[:a] = np.linspace(0.0, 1.0, a, endpoint=False)
+    env[a:a + d] = np.linspace(1.0, cfg.sustain, d, endpoint=False)
+    env[a + d:note_len] = cfg.sustain
+    level = env[note_len - 1] if note_len > 0 else 0.0
+    env[note_len:] = np.linspace(level, 0.0, rel_len, endpoint=False)
+    return env
+
+
+class NumpySynthRenderer:
+    """
+    Ten sam interfejs co SoundFontRenderer (cfg, render_melody_to_wav,
+    render_batch_to_wavs), ale bez procesów zewnętrznych i bez plików MIDI.
+    """
+
+    def __init__(self, cfg: Optional[SynthConfig] = None):
+        self.cfg = cfg or SynthConfig()
+        self._table = _wavetable(self.cfg.harmonics)
+
+    # ---------- synteza ----------
+
+    def n_samples(self, melody: Melody) -> int:
+        sr = self.cfg.sample_rate
+        return int(round(melody.n * melody.unit_duration * sr)) + int(round(self.cfg.tail_s * sr))
+
+    def render_into(self, melody: Melody, out: np.ndarray, midi_cfg: Optional[MidiRenderConfig] = None) -> int:
+        """
+        Renderuje melodię do gotowego bufora float32 (nadpisuje początek). Zwraca liczbę próbek.
+        Nuty mają równe długości, więc overlap-add robimy blokami po jednej nucie.
+        """
+        cfg = self.cfg
+        midi_cfg = midi_cfg or MidiRenderConfig()
+        sr = cfg.sample_rate
+
+        pitches = np.asarray(_shift_to_midi_range(melody.pitches, midi_cfg), dtype=np.float64)
+        freqs = 440.0 * np.power(2.0, (pitches - 69.0) / 12.0)
+        vel = min(127, max(0, int(midi_cfg.velocity))) / 127.0
+
+        L = max(1, int(round(melody.unit_duration * sr)))
+        R = int(round(cfg.release_s * sr))
+        n = melody.n
+        n_blocks = -(-(L + R) // L)
+        total = self.n_samples(melody)
+        # ostatni blok release może wystawać za `total` (obcinamy go w wyniku)
+        needed = max(total, (n + n_blocks - 1) * L)
+        if out.shape[0] < needed:
+            raise ValueError(f"Output buffer too short: {out.shape[0]} < {needed}")
+
+        # (n_notes, L + R): faza (w próbkach tablicy) -> indeks w tablicy falowej
+        step = freqs * (_TABLE_SIZE / sr)
+        idx = (np.outer(step, np.arange(L + R, dtype=np.float64))).astype(np.int32)
+        idx &= _TABLE_SIZE - 1
+        notes = self._table[idx]
+        # 0.5: zapas na nakładające się release sąsiednich nut
+        notes *= _envelope(cfg, L, R)[None, :] * 0.5
+
+        out[:needed] = 0.0
+        # blok 0: ciała nut leżą dokładnie obok siebie
+        out[:n * L] += notes[:, :L].reshape(-1)
+        # kolejne bloki: release nachodzi na następne nuty
+        for b in range(1, n_blocks):
+            seg = notes[:, b * L:(b + 1) * L]
+            w = seg.shape[1]
+            if w == 0:
+                break
+            view = out[b * L:b * L + n * L].reshape(n, L)
+            view[:, :w] += seg
+
+        out[:total] *= cfg.gain * vel
+        np.clip(out[:total], -1.0, 1.0, out=out[:total])
+        return total
+
+    def _buffer_len(self, melody: Melody) -> int:
+        # n_samples + zapas na ostatni blok release (reshape w render_into)
+        sr = self.cfg.sample_rate
+        return self.n_samples(melody) + int(round(melody.unit_duration * sr)) + int(round(self.cfg.release_s * sr))
+
+    def render(self, melody: Melody, midi_cfg: Optional[MidiRenderConfig] = None) -> np.ndarray:
+        buf = np.zeros(self._buffer_len(melody), dtype=np.float32)
+        total = self.render_into(melody, buf, midi_cfg)
+        return buf[:total]
+
+    def render_batch(
+        self,
+        melodies: Sequence[Melody],
+        midi_cfg: Optional[MidiRenderConfig] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cały wsad do jednej prealokowanej macierzy (B, T) float32.
+        Zwraca (bufor, długości w próbkach).
+        """
+        lens = [self.n_samples(m) for m in melodies]
+        out = np.zeros((len(melodies), max((self._buffer_len(m) for m in melodies), default=0)), dtype=np.float32)
+        for i, m in enumerate(melodies):
+            self.render_into(m, out[i], midi_cfg)
+        return out, np.asarray(lens, dtype=np.int64)
+
+    # ---------- zapis ----------
+
+    def write_wav(self, samples: np.ndarray, wav_path: str) -> None:
+        pcm = (samples * 32767.0).astype("<i2")
+        write_wav_bytes(wav_path, pcm16_fmt_chunk(1, self.cfg.sample_rate), memoryview(pcm).cast("B"))
+
+    def render_melody_to_wav(
+        self,
+        melody: Melody,
+        wav_path: str,
+        *,
+        midi_tmp_path: Optional[str] = None,
+        midi_cfg: Optional[MidiRenderConfig] = None,
+        keep_midi: bool = False,
+    ) -> None:
+        self.write_wav(self.render(melody, midi_cfg), wav_path)
+        # MIDI nie jest potrzebny do syntezy; zapisujemy go tylko na życzenie
+        if keep_midi and midi_tmp_path:
+            write_midi(melody, midi_tmp_path, cfg=midi_cfg)
+
+    def render_batch_to_wavs(
+        self,
+        melodies: Sequence[Melody],
+        wav_paths: Sequence[str],
+        *,
+        midi_tmp_path: Optional[str] = None,
+        midi_cfg: Optional[MidiRenderConfig] = None,
+        gap_s: float = 0.0,
+        keep_midi: bool = False,
+        chunk: int = 32,
+    ) -> List[int]:
+        # gap_s / midi_tmp_path: zgodność z SoundFontRenderer, tu niepotrzebne
+        if len(melodies) != len(wav_paths):
+            raise ValueError("melodies and wav_paths must have the same length.")
+        out: List[int] = []
+        # kawałkami, żeby bufor (B, T) nie rósł z rozmiarem całego wsadu
+        for i in range(0, len(melodies), chunk):
+            buf, lens = self.render_batch(melodies[i:i + chunk], midi_cfg)
+            for row, n, path in zip(buf, lens, wav_paths[i:i + chunk]):
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self.write_wav(row[:n], path)
+                out.append(int(n))
+        return out
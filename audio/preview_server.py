@@ -0,0 +1,286 @@
+# audio/preview_server.py
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from core.io import SearchResult, load_result_json
+from core.melody import Melody
+from audio.midi_writer import MidiRenderConfig, midi_bytes
+from audio.render_cache import RenderCache, render_key
+
+# Lokalny serwis odsłuchu: HTTP na localhost (albo gniazdo Unix).
+#   GET  /health
+#   GET  /render?path=results/elites/run3/elite_....json&format=wav|mid
+#   POST /render?format=wav|mid   body: {"path": ...} | {"melody": {...}} | {"pitches": [...], ...}
+# Równoczesne żądania WAV są zbierane w jeden wsad renderera; gotowe WAV-y
+# trzymamy w LRU w pamięci i w cache na dysku (ten sam co render_elites_batch).
+
+
+@dataclass(frozen=True)
+class PreviewConfig:
+    # ile czekać na kolejne żądania do wsadu i ile max w jednym wsadzie
+    batch_window_ms: float = 15.0
+    batch_max: int = 32
+    # LRU w pamięci (bajty WAV)
+    memory_cache_bytes: int = 256 * 1024 * 1024
+    # katalog, poza który nie wolno czytać plików elite_*.json
+    root_dir: str = "."
+
+
+class LRUBytes:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._d: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        v = self._d.get(key)
+        if v is not None:
+            self._d.move_to_end(key)
+        return v
+
+    def put(self, key: str, value: bytes) -> None:
+        old = self._d.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        if len(value) > self.max_bytes:
+            return
+        self._d[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, v = self._d.popitem(last=False)
+            self.size -= len(v)
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class PreviewService:
+    def __init__(
+        self,
+        renderer,
+        cache: RenderCache,
+        midi_cfg: Optional[MidiRenderConfig] = None,
+        cfg: Optional[PreviewConfig] = None,
+    ):
+        self.renderer = renderer
+        self.cache = cache
+        self.midi_cfg = midi_cfg or MidiRenderConfig()
+        self.cfg = cfg or PreviewConfig()
+        self.memory = LRUBytes(self.cfg.memory_cache_bytes)
+        self._queue: Optional[asyncio.Queue] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._batcher: Optional[asyncio.Task] = None
+        self.stats = {"requests": 0, "memory_hits": 0, "disk_hits": 0, "rendered": 0, "batches": 0}
+
+    # ---------- wejście ----------
+
+    def _resolve_path(self, path: str) -> str:
+        root = os.path.realpath(self.cfg.root_dir)
+        real = os.path.realpath(path if os.path.isabs(path) else os.path.join(root, path))
+        if os.path.commonpath([root, real]) != root:
+            raise HttpError(403, f"path outside root: {path}")
+        if not os.path.isfile(real):
+            raise HttpError(404, f"not found: {path}")
+        return real
+
+    def melody_from_request(self, query: Dict[str, str], body: bytes) -> Melody:
+        data: dict = {}
+        if body:
+            try:
+                data = json.loads(body.decode("utf-8"))
+            except ValueError as ex:
+                raise HttpError(400, f"invalid JSON: {ex}")
+            if not isinstance(data, dict):
+                raise HttpError(400, f"expected a JSON object, got {type(data).__name__}")
+        path = data.get("path") or query.get("path")
+        try:
+            if path:
+                return load_result_json(self._resolve_path(path)).melody
+            if "melody" in data:
+                return SearchResult.from_dict({"score": 0.0, "passed": True, **data}).melody
+            if "pitches" in data:
+                return Melody(tuple(int(p) for p in data["pitches"]), float(data.get("unit_duration", 0.25)))
+        except (KeyError, TypeError, ValueError) as ex:
+            raise HttpError(400, f"bad melody: {ex}")
+        raise HttpError(400, "expected 'path', 'melody' or 'pitches'")
+
+    # ---------- renderowanie ----------
+
+    async def render_wav(self, melody: Melody) -> bytes:
+        self.stats["requests"] += 1
+        key = render_key(melody, self.midi_cfg, self.renderer.cfg)
+
+        hit = self.memory.get(key)
+        if hit is not None:
+            self.stats["memory_hits"] += 1
+            return hit
+
+        loop = asyncio.get_running_loop()
+        if self.cache.has(key):
+            data = await loop.run_in_executor(None, _read_file, self.cache.wav_path(key))
+            self.stats["disk_hits"] += 1
+            self.memory.put(key, data)
+            return data
+
+        # to samo w locie -> czekamy na ten sam render
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = loop.create_future()
+            self._inflight[key] = fut
+            await self._ensure_batcher().put((key, melody))
+        return await asyncio.shield(fut)
+
+    def _ensure_batcher(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.get_running_loop().create_task(self._batch_loop())
+        return self._queue
+
+    async def _batch_loop(self) -> None:
+        q = self._queue
+        window = self.cfg.batch_window_ms / 1000.0
+        while True:
+            batch: List[Tuple[str, Melody]] = [await q.get()]
+            deadline = asyncio.get_running_loop().time() + window
+            while len(batch) < self.cfg.batch_max:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._render_batch(batch)
+
+    def _render_batch_sync(self, batch: List[Tuple[str, Melody]]) -> List[bytes]:
+        tmps = [self.cache.tmp_path(k, ".wav") for k, _ in batch]
+        try:
+            self.renderer.render_batch_to_wavs(
+                [m for _, m in batch],
+                tmps,
+                midi_tmp_path=self.cache.tmp_path(batch[0][0], ".batch.mid"),
+                midi_cfg=self.midi_cfg,
+            )
+            out = []
+            for (k, _), tmp in zip(batch, tmps):
+                self.cache.commit(k, tmp)
+                out.append(_read_file(self.cache.wav_path(k)))
+            return out
+        finally:
+            for p in tmps:
+                if os.path.exists(p):
+                    os.remove(p)
+
+    async def _render_batch(self, batch: List[Tuple[str, Melody]]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            datas = await loop.run_in_executor(None, self._render_batch_sync, batch)
+        except Exception as ex:
+            for k, _ in batch:
+                fut = self._inflight.pop(k, None)
+                if fut is not None and not fut.done():
+                    fut.set_exception(ex)
+            return
+        self.stats["batches"] += 1
+        self.stats["rendered"] += len(batch)
+        for (k, _), data in zip(batch, datas):
+            self.memory.put(k, data)
+            fut = self._inflight.pop(k, None)
+            if fut is not None and not fut.done():
+                fut.set_result(data)
+
+    # ---------- HTTP ----------
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, ctype, payload = await self._dispatch(reader)
+        except HttpError as ex:
+            status, ctype, payload = ex.status, "text/plain; charset=utf-8", str(ex).encode("utf-8")
+        except Exception as ex:  # błąd renderera itp. -> 500, serwer działa dalej
+            status, ctype, payload = 500, "text/plain; charset=utf-8", f"{type(ex).__name__}: {ex}".encode("utf-8")
+
+        reason = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found"}.get(status, "Error")
+        head = (
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {ctype}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("ascii")
+        try:
+            writer.write(head + payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader: asyncio.StreamReader) -> Tuple[int, str, bytes]:
+        try:
+            raw = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            raise HttpError(400, "bad request")
+        lines = raw.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "bad request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        body = b""
+        try:
+            n = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HttpError(400, f"bad Content-Length: {headers['content-length']}")
+        if n < 0:
+            raise HttpError(400, f"bad Content-Length: {n}")
+        if n:
+            try:
+                body = await reader.readexactly(n)
+            except asyncio.IncompleteReadError:
+                raise HttpError(400, "body shorter than Content-Length")
+
+        url = urlsplit(target)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/health":
+            return 200, "application/json", json.dumps({"ok": True, **self.stats}).encode("utf-8")
+        if url.path != "/render" or method not in ("GET", "POST"):
+            raise HttpError(404, f"no route: {method} {url.path}")
+
+        melody = self.melody_from_request(query, body)
+        fmt = query.get("format", "wav")
+        if fmt == "mid":
+            return 200, "audio/midi", midi_bytes(melody, self.midi_cfg)
+        if fmt == "wav":
+            return 200, "audio/wav", await self.render_wav(melody)
+        raise HttpError(400, f"unknown format: {fmt}")
+
+
+async def serve(
+    service: PreviewService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_socket: Optional[str] = None,
+) -> None:
+    if unix_socket:
+        server = await asyncio.start_unix_server(service.handle, path=unix_socket)
+    else:
+        server = await asyncio.start_server(service.handle, host=host, port=port)
+    async with server:
+        await server.serve_forever()
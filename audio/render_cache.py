@@ -0,0 +1,82 @@
+# audio/render_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from dataclasses import asdict, is_dataclass
+from typing import Optional
+
+from core.melody import Melody
+from audio.midi_writer import MidiRenderConfig
+
+
+def render_key(melody: Melody, midi_cfg, renderer_cfg) -> str:
+    """
+    Klucz treści: melodia + konfiguracja MIDI + konfiguracja renderera.
+    Ta sama melodia z tymi samymi ustawieniami -> ten sam plik w cache.
+    """
+    def cfg_dict(c):
+        if c is None:
+            return None
+        return {"type": c.__class__.__name__, **(asdict(c) if is_dataclass(c) else dict(c.__dict__))}
+
+    blob = json.dumps(
+        {
+            "pitches": list(melody.pitches),
+            "unit_duration": melody.unit_duration,
+            # None = domyślna konfiguracja, tak jak w write_midi
+            "midi": cfg_dict(midi_cfg or MidiRenderConfig()),
+            "renderer": cfg_dict(renderer_cfg),
+        },
+        sort_keys=True,
+    ).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class RenderCache:
+    """
+    Cache adresowany treścią: <cache_dir>/<key>.wav (+ <key>.mid).
+    Zapis przez plik tymczasowy + os.replace, więc równoległe wątki/procesy
+    nigdy nie zobaczą połówki pliku.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def wav_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def mid_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mid")
+
+    def tmp_path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.tmp-{os.getpid()}-{threading.get_ident()}{ext}")
+
+    def has(self, key: str) -> bool:
+        p = self.wav_path(key)
+        return os.path.isfile(p) and os.path.getsize(p) > 44  # więcej niż sam nagłówek WAV
+
+    def commit(self, key: str, tmp_wav: str, tmp_mid: Optional[str] = None) -> None:
+        if tmp_mid is not None and os.path.isfile(tmp_mid):
+            os.replace(tmp_mid, self.mid_path(key))
+        os.replace(tmp_wav, self.wav_path(key))
+
+    def materialize(self, key: str, wav_path: str, mid_path: Optional[str] = None) -> None:
+        link_or_copy(self.wav_path(key), wav_path)
+        if mid_path is not None and os.path.isfile(self.mid_path(key)):
+            link_or_copy(self.mid_path(key), mid_path)
@@ -0,0 +1,33 @@
+# audio/renderers.py
+from __future__ import annotations
+
+from typing import Optional
+
+RENDER_BACKENDS = ("fluidsynth", "synth")
+
+
+def make_renderer(
+    backend: str,
+    *,
+    sf2_path: Optional[str] = None,
+    sample_rate: int = 44100,
+    gain: float = 0.9,
+    fluidsynth_exe: Optional[str] = None,
+):
+    """
+    "fluidsynth": SoundFontRenderer (zewnętrzny fluidsynth + SF2),
+    "synth": NumpySynthRenderer (w procesie, bez zależności zewnętrznych).
+    Oba mają ten sam interfejs: cfg, render_melody_to_wav, render_batch_to_wavs.
+    """
+    if backend == "fluidsynth":
+        from audio.soundfont_renderer import SoundFontRenderer, SoundFontConfig
+        if not sf2_path:
+            raise ValueError("fluidsynth backend needs sf2_path.")
+        return SoundFontRenderer(
+            SoundFontConfig(sf2_path=str(sf2_path), sample_rate=sample_rate, gain=gain),
+            fluidsynth_exe=fluidsynth_exe,
+        )
+    if backend == "synth":
+        from audio.numpy_synth import NumpySynthRenderer, SynthConfig
+        return NumpySynthRenderer(SynthConfig(sample_rate=sample_rate, gain=gain))
+    raise ValueError(f"Unknown render backend: {backend} (expected one of {RENDER_BACKENDS})")
@@ -2,12 +2,21 @@
 from __future__ import annotations
 
 import os
+import shutil
 import subprocess
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional, Sequence
 
 from core.melody import Melody
-from audio.midi_writer import write_midi, MidiRenderConfig
+from audio.midi_writer import write_midi, write_midi_sequence, MidiRenderConfig
+from audio.wav_io import split_wav
+
+# stara domyślna ścieżka (Windows); na Linuksie zwykle wystarczy fluidsynth w PATH
+_DEFAULT_FLUIDSYNTH_EXE = r"C:\tools\fluidsynth\bin\fluidsynth.exe"
+
+
+def find_fluidsynth() -> str:
+    return os.environ.get("FLUIDSYNTH_EXE") or shutil.which("fluidsynth") or _DEFAULT_FLUIDSYNTH_EXE
 
 
 @dataclass(frozen=True)
@@ -20,8 +29,8 @@ class SoundFontConfig:
 class SoundFontRenderer:
     def __init__(self, cfg: SoundFontConfig, fluidsynth_exe: Optional[str] = None):
         self.cfg = cfg
-        # u Ciebie działa alias -> więc to jest OK:
-        self.fluidsynth_exe = fluidsynth_exe or r"C:\tools\fluidsynth\bin\fluidsynth.exe"
+        # jawna ścieżka > $FLUIDSYNTH_EXE > fluidsynth w PATH > stara ścieżka Windows
+        self.fluidsynth_exe = fluidsynth_exe or find_fluidsynth()
 
         if not os.path.isfile(self.fluidsynth_exe):
             raise FileNotFoundError(f"fluidsynth.exe not found: {self.fluidsynth_exe}")
@@ -46,6 +55,43 @@ class SoundFontRenderer:
             except OSError:
                 pass
 
+    def render_batch_to_wavs(
+        self,
+        melodies: Sequence[Melody],
+        wav_paths: Sequence[str],
+        *,
+        midi_tmp_path: str,
+        midi_cfg: Optional[MidiRenderConfig] = None,
+        gap_s: float = 1.0,
+        keep_midi: bool = False,
+    ) -> List[int]:
+        """
+        Jedno wywołanie FluidSynth dla N melodii: wszystkie na jednej osi czasu
+        (przerwa gap_s mieści wybrzmienie), potem WAV cięty po znanych offsetach.
+        Kawałek i-ty to [start_i, start_{i+1}), ostatni do końca pliku.
+        Zwraca długości kawałków w próbkach.
+        """
+        if len(melodies) != len(wav_paths):
+            raise ValueError("melodies and wav_paths must have the same length.")
+        if not melodies:
+            return []
+
+        spans = write_midi_sequence(melodies, midi_tmp_path, cfg=midi_cfg, gap_s=gap_s)
+        batch_wav = os.path.splitext(midi_tmp_path)[0] + ".batch.wav"
+        try:
+            self.render_midi_to_wav(midi_tmp_path, batch_wav)
+            bounds = [
+                (spans[i][0], spans[i + 1][0] if i + 1 < len(spans) else -1.0)
+                for i in range(len(spans))
+            ]
+            return split_wav(batch_wav, bounds, wav_paths)
+        finally:
+            for p in ([batch_wav] if keep_midi else [batch_wav, midi_tmp_path]):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
     def render_midi_to_wav(self, midi_path: str, wav_path: str) -> None:
         cmd = [
             self.fluidsynth_exe,
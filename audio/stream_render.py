@@ -0,0 +1,106 @@
+# audio/stream_render.py
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import List, Optional
+
+from core.melody import Melody
+from audio.midi_writer import MidiRenderConfig
+from audio.render_cache import RenderCache, render_key
+
+
+class StreamingRenderer:
+    """
+    Renderuje melodie w tle do RenderCache, podczas gdy wyszukiwanie trwa.
+    offer() nigdy nie blokuje: przy pełnej kolejce melodia jest pomijana
+    (wyrenderuje się na końcu, jeśli nadal będzie w top). Dzięki temu
+    renderowanie nie spowalnia pętli wyszukiwania.
+    """
+
+    def __init__(
+        self,
+        renderer,
+        cache: RenderCache,
+        midi_cfg: Optional[MidiRenderConfig] = None,
+        *,
+        workers: int = 1,
+        queue_size: int = 32,
+    ):
+        self.renderer = renderer
+        self.cache = cache
+        self.midi_cfg = midi_cfg or MidiRenderConfig()
+        self._q: "queue.Queue[Optional[Melody]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.stats = {"offered": 0, "dropped": 0, "rendered": 0, "cached": 0, "failed": 0}
+        self.errors: List[str] = []
+        self._threads = [
+            threading.Thread(target=self._work, name=f"stream-render-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def offer(self, melody: Melody) -> bool:
+        self._count("offered")
+        try:
+            self._q.put_nowait(melody)
+            return True
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+    def _render(self, melody: Melody) -> None:
+        key = render_key(melody, self.midi_cfg, self.renderer.cfg)
+        if self.cache.has(key):
+            self._count("cached")
+            return
+        tmp_wav = self.cache.tmp_path(key, ".wav")
+        tmp_mid = self.cache.tmp_path(key, ".mid")
+        try:
+            self.renderer.render_melody_to_wav(
+                melody,
+                wav_path=tmp_wav,
+                midi_tmp_path=tmp_mid,
+                midi_cfg=self.midi_cfg,
+                keep_midi=True,
+            )
+            self.cache.commit(key, tmp_wav, tmp_mid)
+            self._count("rendered")
+        finally:
+            for p in (tmp_wav, tmp_mid):
+                if os.path.exists(p):
+                    os.remove(p)
+
+    def _work(self) -> None:
+        while True:
+            melody = self._q.get()
+            try:
+                if melody is None:
+                    return
+                self._render(melody)
+            except Exception as ex:  # jeden zły render nie zatrzymuje strumienia
+                self._count("failed")
+                with self._lock:
+                    self.errors.append(f"{type(ex).__name__}: {ex}")
+            finally:
+                self._q.task_done()
+
+    def close(self, wait: bool = True) -> None:
+        """Kończy wątki; wait=True dokańcza to, co już jest w kolejce."""
+        if not wait:
+            while True:
+                try:
+                    self._q.get_nowait()
+                    self._q.task_done()
+                except queue.Empty:
+                    break
+        for _ in self._threads:
+            self._q.put(None)
+        for t in self._threads:
+            t.join()
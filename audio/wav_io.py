@@ -0,0 +1,103 @@
+# audio/wav_io.py
+from __future__ import annotations
+
+import mmap
+import struct
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class WavInfo:
+    fmt_chunk: bytes  # surowa zawartość chunka "fmt " (PCM / float / extensible - bez zmian)
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def n_frames(self) -> int:
+        return self.data_size // self.frame_bytes
+
+
+def read_wav_info(buf) -> WavInfo:
+    """Parsuje nagłówek RIFF/WAVE z bufora (bytes / mmap)."""
+    if bytes(buf[0:4]) != b"RIFF" or bytes(buf[8:12]) != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file.")
+    pos = 12
+    fmt = None
+    total = len(buf)
+    while pos + 8 <= total:
+        cid = bytes(buf[pos:pos + 4])
+        (size,) = struct.unpack("<I", buf[pos + 4:pos + 8])
+        body = pos + 8
+        if cid == b"fmt ":
+            fmt = bytes(buf[body:body + size])
+        elif cid == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk.")
+            channels, sample_rate = struct.unpack("<HI", fmt[2:8])
+            (bits,) = struct.unpack("<H", fmt[14:16])
+            # część programów zostawia 0 / 0xFFFFFFFF przy strumieniowym zapisie
+            if size == 0 or body + size > total:
+                size = total - body
+            return WavInfo(fmt, channels, sample_rate, bits, body, size)
+        pos = body + size + (size & 1)  # chunki wyrównane do 2 bajtów
+    raise ValueError("WAV without data chunk.")
+
+
+def write_wav_bytes(path: str, fmt_chunk: bytes, data) -> None:
+    """Zapisuje WAV z gotowym chunkiem fmt i danymi (bytes / memoryview - bez kopiowania)."""
+    n = len(data)
+    with open(path, "wb") as f:
+        f.write(b"RIFF")
+        f.write(struct.pack("<I", 4 + (8 + len(fmt_chunk)) + (8 + n) + (n & 1)))
+        f.write(b"WAVE")
+        f.write(b"fmt ")
+        f.write(struct.pack("<I", len(fmt_chunk)))
+        f.write(fmt_chunk)
+        f.write(b"data")
+        f.write(struct.pack("<I", n))
+        f.write(data)
+        if n & 1:
+            f.write(b"\0")
+
+
+def pcm16_fmt_chunk(channels: int, sample_rate: int) -> bytes:
+    block = channels * 2
+    return struct.pack("<HHIIHH", 1, channels, sample_rate, sample_rate * block, block, 16)
+
+
+def split_wav(src_path: str, bounds_s: Sequence[Tuple[float, float]], dst_paths: Sequence[str]) -> List[int]:
+    """
+    Tnie jeden WAV na kawałki [start, end) w sekundach (end < 0 => do końca pliku).
+    Plik jest mapowany w pamięci, a kawałki zapisywane jako widoki memoryview,
+    więc dane audio nie są kopiowane w RAM. Zwraca długości kawałków w ramkach.
+    """
+    if len(bounds_s) != len(dst_paths):
+        raise ValueError("bounds_s and dst_paths must have the same length.")
+    lengths: List[int] = []
+    with open(src_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            info = read_wav_info(mm)
+            view = memoryview(mm)
+            try:
+                fb = info.frame_bytes
+                for (start, end), dst in zip(bounds_s, dst_paths):
+                    a = min(info.n_frames, max(0, int(round(start * info.sample_rate))))
+                    b = info.n_frames if end < 0 else min(info.n_frames, int(round(end * info.sample_rate)))
+                    b = max(a, b)
+                    chunk = view[info.data_offset + a * fb: info.data_offset + b * fb]
+                    try:
+                        write_wav_bytes(dst, info.fmt_chunk, chunk)
+                    finally:
+                        chunk.release()
+                    lengths.append(b - a)
+            finally:
+                view.release()
+    return lengths
@@ -0,0 +1,245 @@
+# core/elite_store.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .io import SearchResult, load_result_json
+
+# Wspólna baza elit ze wszystkich runów (SQLite), z indeksami po score,
+# koszykach deskryptora, runie i hashu konfiguracji. Zamiast otwierać tysiące
+# plików JSON: jedno zapytanie SQL.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    config_hash TEXT NOT NULL,
+    created_utc TEXT,
+    meta_json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS elites (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    file TEXT,
+    score REAL NOT NULL,
+    n_notes INTEGER NOT NULL,
+    ambitus INTEGER NOT NULL,
+    cell_key TEXT NOT NULL,
+    cell_rank INTEGER,
+    ambitus_bin INTEGER,
+    turn_rate_bin INTEGER,
+    pc_bin INTEGER,
+    cvt_cell INTEGER,
+    result_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_elites_score ON elites(score DESC);
+CREATE INDEX IF NOT EXISTS ix_elites_cell ON elites(ambitus_bin, turn_rate_bin, pc_bin);
+CREATE INDEX IF NOT EXISTS ix_elites_ambitus ON elites(ambitus, score DESC);
+CREATE INDEX IF NOT EXISTS ix_elites_cvt ON elites(cvt_cell);
+CREATE INDEX IF NOT EXISTS ix_elites_run ON elites(run_id);
+CREATE INDEX IF NOT EXISTS ix_elites_config ON elites(config_hash, score DESC);
+"""
+
+# pola run_meta, które zmieniają się między runami tej samej konfiguracji
+_VOLATILE_META = ("created_utc", "run_dir", "run_id", "python", "search", "emitters")
+
+
+def config_hash(run_meta: Optional[dict]) -> str:
+    stable = {k: v for k, v in (run_meta or {}).items() if k not in _VOLATILE_META}
+    blob = json.dumps(stable, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()[:16]
+
+
+# filtr zapytania -> warunek SQL (jeden parametr)
+_FILTERS: Dict[str, str] = {
+    "min_score": "score >= ?",
+    "max_score": "score <= ?",
+    "min_ambitus": "ambitus >= ?",
+    "max_ambitus": "ambitus <= ?",
+    "n_notes": "n_notes = ?",
+    "run_id": "run_id = ?",
+    "config_hash": "config_hash = ?",
+    "ambitus_bin": "ambitus_bin = ?",
+    "turn_rate_bin": "turn_rate_bin = ?",
+    "pc_bin": "pc_bin = ?",
+    "min_pc_bin": "pc_bin >= ?",
+    "max_pc_bin": "pc_bin <= ?",
+    "cvt_cell": "cvt_cell = ?",
+    "max_cell_rank": "cell_rank <= ?",
+}
+
+_FILTER_TYPES = {
+    "run_id": str,
+    "config_hash": str,
+    "min_score": float,
+    "max_score": float,
+}
+
+
+def canonical_run_id(run_dir: str) -> str:
+    # ten sam run niezależnie od zapisu ścieżki (względna / bezwzględna / symlink)
+    return os.path.realpath(run_dir)
+
+
+def parse_query(s: str) -> Dict[str, Any]:
+    """'max_ambitus=10,min_score=4.5' -> {'max_ambitus': 10, 'min_score': 4.5}"""
+    out: Dict[str, Any] = {}
+    for part in filter(None, (p.strip() for p in s.split(","))):
+        if "=" not in part:
+            raise ValueError(f"Bad query term (expected key=value): {part}")
+        k, v = (x.strip() for x in part.split("=", 1))
+        if k not in _FILTERS:
+            raise ValueError(f"Unknown query field: {k} (known: {', '.join(sorted(_FILTERS))})")
+        out[k] = _FILTER_TYPES.get(k, int)(v)
+    return out
+
+
+class EliteStore:
+    def __init__(self, path: str):
+        self.path = path
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "EliteStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------- zapis ----------
+
+    def replace_run(
+        self,
+        run_id: str,
+        run_meta: Optional[dict],
+        items: Iterable[Tuple[SearchResult, Optional[str]]],
+    ) -> int:
+        """
+        Zapisuje (SearchResult, nazwa pliku) jednego runu w jednej transakcji.
+        Poprzednie wiersze runu są usuwane (migawki nadpisują się nawzajem).
+        """
+        run_id = canonical_run_id(run_id)
+        chash = config_hash(run_meta)
+        rows = []
+        for sr, fname in items:
+            d = sr.to_dict()
+            meta = d.get("meta") or {}
+            desc = dict(meta.get("descriptor") or {})
+            # meta runu trzymamy raz, w tabeli runs
+            meta.pop("run", None)
+            cell_key = [desc[k] for k in sorted(desc) if k not in ("cell_rank", "centroid")]
+            rows.append((
+                run_id,
+                chash,
+                fname,
+                float(sr.score),
+                sr.melody.n,
+                sr.melody.ambitus(),
+                json.dumps(cell_key),
+                desc.get("cell_rank"),
+                desc.get("ambitus_bin"),
+                desc.get("turn_rate_bin"),
+                desc.get("pc_bin"),
+                desc.get("cvt_cell"),
+                json.dumps(d, ensure_ascii=False),
+            ))
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs(run_id, config_hash, created_utc, meta_json) VALUES (?, ?, ?, ?)",
+                (
+                    run_id,
+                    chash,
+                    (run_meta or {}).get("created_utc") or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    json.dumps(run_meta or {}, ensure_ascii=False, default=str),
+                ),
+            )
+            self.conn.execute("DELETE FROM elites WHERE run_id = ?", (run_id,))
+            self.conn.executemany(
+                "INSERT INTO elites(run_id, config_hash, file, score, n_notes, ambitus, cell_key, cell_rank,"
+                " ambitus_bin, turn_rate_bin, pc_bin, cvt_cell, result_json)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def import_run_dir(self, run_dir: str) -> int:
+        """Import istniejącego runu z dysku (index.json + elite_*.json)."""
+        with open(os.path.join(run_dir, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        items = []
+        run_meta: Optional[dict] = None
+        for it in index:
+            sr = load_result_json(os.path.join(run_dir, it["file"]))
+            if run_meta is None:
+                run_meta = (sr.meta or {}).get("run") or {}
+            items.append((sr, it["file"]))
+        return self.replace_run(run_dir, run_meta, items)
+
+    # ---------- odczyt ----------
+
+    def import_base_dir(self, base_dir: str) -> int:
+        """Import wszystkich runN z katalogu bazowego (np. results/elites)."""
+        n = 0
+        for name in sorted(os.listdir(base_dir)):
+            d = os.path.join(base_dir, name)
+            if name.lower().startswith("run") and os.path.isfile(os.path.join(d, "index.json")):
+                n += self.import_run_dir(d)
+        return n
+
+    def query(self, *, order_by: str = "score", limit: Optional[int] = 100, **filters: Any) -> List[SearchResult]:
+        """
+        Np. store.query(max_ambitus=10, min_score=4.0, limit=20).
+        Dostępne filtry: patrz _FILTERS. Wynik: SearchResult z meta
+        uzupełnionym o run_id, config_hash i file.
+        """
+        where, params = [], []
+        for k, v in filters.items():
+            if v is None:
+                continue
+            if k not in _FILTERS:
+                raise ValueError(f"Unknown query field: {k}")
+            if k == "run_id":
+                v = canonical_run_id(v)
+            where.append(_FILTERS[k])
+            params.append(v)
+        if order_by not in ("score", "-score", "ambitus", "run_id"):
+            raise ValueError(f"Unsupported order_by: {order_by}")
+        order = "score ASC" if order_by == "-score" else ("score DESC" if order_by == "score" else order_by)
+
+        sql = "SELECT run_id, config_hash, file, result_json FROM elites"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        out = []
+        for run_id, chash, fname, blob in self.conn.execute(sql, params):
+            sr = SearchResult.from_dict(json.loads(blob))
+            sr.meta.update({"run_id": run_id, "config_hash": chash, "file": fname})
+            out.append(sr)
+        return out
+
+    def runs(self) -> List[dict]:
+        cur = self.conn.execute(
+            "SELECT r.run_id, r.config_hash, r.created_utc, COUNT(e.id), MAX(e.score)"
+            " FROM runs r LEFT JOIN elites e ON e.run_id = r.run_id GROUP BY r.run_id ORDER BY r.created_utc"
+        )
+        return [
+            {"run_id": r, "config_hash": c, "created_utc": t, "n_elites": n, "best_score": b}
+            for r, c, t, n, b in cur
+        ]
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import os
 import json
+import struct
 from dataclasses import asdict, dataclass
-from typing import Any, Dict, Tuple, Optional, List
+from typing import Any, Dict, Tuple, Optional, List, Iterable, Iterator, Sequence
 
 from .melody import Melody
 
@@ -55,3 +57,254 @@ def load_result_json(path: str) -> SearchResult:
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
     return SearchResult.from_dict(data)
+
+
+# ---------- binarny log kandydatów ----------
+#
+# Plik: MAGIC + varint(len) + nagłówek JSON ({"version", "columns"}),
+# potem rekordy: varint(len) + payload. Payload:
+#   bajt flag (bit0: interwały 4-bitowe, bit1: są kolumny statystyk)
+#   zigzag-varint start pitch, varint liczba interwałów,
+#   interwały (4 bity na interwał z zakresu -8..7 albo zigzag-varinty),
+#   float32 unit_duration, float32 score, [float32 * len(columns)]
+# Melodia 32-nutowa: ~27 B zamiast ~1 KB JSON-a.
+
+LOG_MAGIC = b"MLOG"
+LOG_VERSION = 1
+
+_F_PACKED4 = 1
+_F_STATS = 2
+
+_F32 = struct.Struct("<f")
+_F32x2 = struct.Struct("<ff")
+
+
+def zigzag(v: int) -> int:
+    return -2 * v - 1 if v < 0 else 2 * v
+
+
+def unzigzag(u: int) -> int:
+    return (u >> 1) ^ -(u & 1)
+
+
+def _put_varint(out: bytearray, u: int) -> None:
+    while u >= 0x80:
+        out.append((u & 0x7F) | 0x80)
+        u >>= 7
+    out.append(u)
+
+
+def _get_varint(buf, pos: int) -> Tuple[int, int]:
+    shift = 0
+    u = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        u |= (b & 0x7F) << shift
+        if b < 0x80:
+            return u, pos
+        shift += 7
+
+
+def encode_candidate(melody: Melody, score: float, stats: Optional[Sequence[float]] = None) -> bytes:
+    p = melody.pitches
+    ints = [p[i + 1] - p[i] for i in range(len(p) - 1)]
+    packed = all(-8 <= d <= 7 for d in ints)
+
+    out = bytearray()
+    out.append((_F_PACKED4 if packed else 0) | (_F_STATS if stats else 0))
+    _put_varint(out, zigzag(p[0]))
+    _put_varint(out, len(ints))
+    if packed:
+        # dwa interwały na bajt (młodsza połówka = wcześniejszy)
+        for i in range(0, len(ints), 2):
+            lo = ints[i] & 0xF
+            hi = (ints[i + 1] & 0xF) if i + 1 < len(ints) else 0
+            out.append(lo | (hi << 4))
+    else:
+        for d in ints:
+            _put_varint(out, zigzag(d))
+    out += _F32x2.pack(melody.unit_duration, score)
+    if stats:
+        out += struct.pack(f"<{len(stats)}f", *stats)
+    return bytes(out)
+
+
+def decode_candidate(buf, n_columns: int = 0) -> Tuple[Melody, float, Tuple[float, ...]]:
+    flags = buf[0]
+    u, pos = _get_varint(buf, 1)
+    pitch = unzigzag(u)
+    n_ints, pos = _get_varint(buf, pos)
+
+    pitches = [pitch]
+    if flags & _F_PACKED4:
+        for i in range(n_ints):
+            nib = (buf[pos + (i >> 1)] >> ((i & 1) * 4)) & 0xF
+            pitch += nib - 16 if nib >= 8 else nib
+            pitches.append(pitch)
+        pos += (n_ints + 1) >> 1
+    else:
+        for _ in range(n_ints):
+            u, pos = _get_varint(buf, pos)
+            pitch += unzigzag(u)
+            pitches.append(pitch)
+
+    unit, score = _F32x2.unpack_from(buf, pos)
+    pos += _F32x2.size
+    stats: Tuple[float, ...] = ()
+    if flags & _F_STATS:
+        stats = struct.unpack_from(f"<{n_columns}f", buf, pos)
+    return Melody(tuple(pitches), unit), score, stats
+
+
+def frame_candidates(items: Iterable[Tuple[Melody, float, Optional[Sequence[float]]]]) -> Tuple[bytes, int]:
+    """Rekordy gotowe do dopisania (varint długości + payload), np. kodowane w procesie roboczym."""
+    rec = bytearray()
+    n = 0
+    for melody, score, stats in items:
+        payload = encode_candidate(melody, score, stats)
+        _put_varint(rec, len(payload))
+        rec += payload
+        n += 1
+    return bytes(rec), n
+
+
+@dataclass(frozen=True)
+class CandidateRecord:
+    melody: Melody
+    score: float
+    stats: Tuple[float, ...] = ()
+
+
+def _read_log_header(f) -> Dict[str, Any]:
+    magic = f.read(len(LOG_MAGIC))
+    if magic != LOG_MAGIC:
+        raise ValueError("Not a candidate log (bad magic).")
+    head = f.read(10)
+    n, pos = _get_varint(head, 0)
+    f.seek(len(LOG_MAGIC) + pos)
+    header = json.loads(f.read(n).decode("utf-8"))
+    if header.get("version") != LOG_VERSION:
+        raise ValueError(f"Unsupported candidate log version: {header.get('version')}")
+    return header
+
+
+class CandidateLogWriter:
+    """
+    Log tylko do dopisywania. Istniejący plik jest kontynuowany (kolumny muszą
+    się zgadzać); urwany ostatni rekord (np. po zabitym runie) jest obcinany
+    przed dopisywaniem, inaczej nowe rekordy byłyby czytane jako jego ciąg dalszy.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str] = (), buffer_bytes: int = 1 << 20):
+        self.path = path
+        self.columns = tuple(columns)
+        self.n_written = 0
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            with open(path, "r+b") as f:
+                cols = tuple(_read_log_header(f).get("columns", ()))
+                if cols != self.columns:
+                    raise ValueError(f"Column mismatch in {path}: {cols} != {self.columns}")
+                valid_end = f.tell()
+                for valid_end, _ in _iter_frames(f, valid_end):
+                    pass
+                f.truncate(valid_end)
+            self._f = open(path, "ab", buffering=buffer_bytes)
+        else:
+            d = os.path.dirname(path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._f = open(path, "wb", buffering=buffer_bytes)
+            head = bytearray(LOG_MAGIC)
+            blob = json.dumps({"version": LOG_VERSION, "columns": list(self.columns)}).encode("utf-8")
+            _put_varint(head, len(blob))
+            self._f.write(bytes(head) + blob)
+
+    def append(self, melody: Melody, score: float, stats: Optional[Sequence[float]] = None) -> None:
+        if stats is not None and len(stats) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} stat columns, got {len(stats)}.")
+        payload = encode_candidate(melody, score, stats)
+        rec = bytearray()
+        _put_varint(rec, len(payload))
+        rec += payload
+        self._f.write(rec)
+        self.n_written += 1
+
+    def append_many(self, items: Iterable[Tuple[Melody, float]]) -> None:
+        """Rekordy bez statystyk - tylko dla logu bez kolumn (inaczej append / append_framed)."""
+        if self.columns:
+            raise ValueError(f"Log {self.path} has stat columns {self.columns}; use append() with stats.")
+        rec = bytearray()
+        n = 0
+        for melody, score in items:
+            payload = encode_candidate(melody, score)
+            _put_varint(rec, len(payload))
+            rec += payload
+            n += 1
+        self._f.write(rec)
+        self.n_written += n
+
+    def append_framed(self, blob: bytes, n: int) -> None:
+        """Dopisz rekordy z frame_candidates (kolumny statystyk muszą pasować do nagłówka)."""
+        self._f.write(blob)
+        self.n_written += n
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "CandidateLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def is_candidate_log(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(LOG_MAGIC)) == LOG_MAGIC
+
+
+def read_candidate_log_columns(path: str) -> Tuple[str, ...]:
+    with open(path, "rb") as f:
+        return tuple(_read_log_header(f).get("columns", ()))
+
+
+def _iter_frames(f, data_start: int, chunk_bytes: int = 1 << 20) -> Iterator[Tuple[int, memoryview]]:
+    """(offset końca rekordu, payload) dla kolejnych pełnych rekordów; urwany ostatni jest pomijany."""
+    offset = data_start  # offset w pliku początku buf[pos:]
+    buf = b""
+    pos = 0
+    while True:
+        data = f.read(chunk_bytes)
+        if not data:
+            return
+        offset += pos
+        buf = buf[pos:] + data
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            # varint długości może być urwany na granicy kawałka
+            try:
+                n, start = _get_varint(buf, pos)
+            except IndexError:
+                break
+            if start + n > end:
+                break
+            yield offset + start + n, memoryview(buf)[start:start + n]
+            pos = start + n
+
+
+def iter_candidate_log(path: str, chunk_bytes: int = 1 << 20) -> Iterator[CandidateRecord]:
+    """Strumieniowo, kawałkami po chunk_bytes; cały plik nigdy nie jest w pamięci."""
+    with open(path, "rb") as f:
+        n_cols = len(_read_log_header(f).get("columns", ()))
+        for _, payload in _iter_frames(f, f.tell(), chunk_bytes):
+            yield CandidateRecord(*decode_candidate(payload, n_cols))
+
+
+def iter_candidate_melodies(path: str) -> Iterator[Melody]:
+    for rec in iter_candidate_log(path):
+        yield rec.melody
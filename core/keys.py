@@ -0,0 +1,98 @@
+# core/keys.py
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Sequence, Tuple
+
+# Dopasowanie tonacji (Krumhansl-Schmuckler): korelacja Pearsona histogramu klas
+# wysokości z 24 obróconymi profilami Krumhansla-Kesslera (12 dur, 12 moll).
+# Profile są standaryzowane raz (średnia 0, norma 1), więc po standaryzacji
+# histogramu korelacja to zwykły iloczyn skalarny; dla wsadu: jedno mnożenie
+# (B x 12) @ (12 x 24). Siła = najlepsza korelacja, niejednoznaczność = druga
+# najlepsza / najlepsza (0 = jednoznaczna tonacja, 1 = dwie równie dobre).
+
+KK_MAJOR: Tuple[float, ...] = (6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88)
+KK_MINOR: Tuple[float, ...] = (6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17)
+
+PITCH_NAMES = ("C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B")
+# indeks tonacji: 0..11 dur od C, 12..23 moll od C
+KEY_NAMES: Tuple[str, ...] = tuple(PITCH_NAMES) + tuple(f"{p}m" for p in PITCH_NAMES)
+
+
+def _standardize(v: Sequence[float]) -> Tuple[float, ...]:
+    m = sum(v) / len(v)
+    c = [x - m for x in v]
+    norm = math.sqrt(sum(x * x for x in c))
+    return tuple(x / norm for x in c) if norm > 0 else tuple(0.0 for _ in c)
+
+
+def _rotate(profile: Sequence[float], tonic: int) -> Tuple[float, ...]:
+    # wartość profilu dla klasy pc w tonacji o toniku `tonic`
+    return tuple(profile[(pc - tonic) % 12] for pc in range(12))
+
+
+# 24 kolumny (po 12 wartości): standaryzowane profile kolejnych tonacji
+KEY_PROFILES: Tuple[Tuple[float, ...], ...] = tuple(
+    _standardize(_rotate(base, tonic)) for base in (KK_MAJOR, KK_MINOR) for tonic in range(12)
+)
+
+
+@dataclass(frozen=True)
+class KeyFit:
+    key: int
+    strength: float
+    ambiguity: float
+
+    @property
+    def name(self) -> str:
+        return KEY_NAMES[self.key]
+
+
+def _fit_from_correlations(r: Sequence[float]) -> KeyFit:
+    best = max(range(24), key=r.__getitem__)
+    r1 = r[best]
+    r2 = max(r[k] for k in range(24) if k != best)
+    amb = min(1.0, max(0.0, r2 / r1)) if r1 > 0 else 1.0
+    return KeyFit(key=best, strength=float(r1), ambiguity=float(amb))
+
+
+def key_correlations(hist: Sequence[int]) -> Tuple[float, ...]:
+    if len(hist) != 12:
+        raise ValueError(f"Expected a 12-bin pitch-class histogram, got {len(hist)} bins")
+    h = _standardize(hist)
+    return tuple(sum(a * b for a, b in zip(h, prof)) for prof in KEY_PROFILES)
+
+
+@lru_cache(maxsize=1 << 16)
+def key_fit(hist: Tuple[int, ...]) -> KeyFit:
+    """Dla pojedynczej melodii (filtry / scorery); wspólny cache w procesie."""
+    return _fit_from_correlations(key_correlations(hist))
+
+
+def key_fit_batch(hists):
+    """
+    hists: (B, 12) -> (key, strength, ambiguity), każde o kształcie (B,).
+    Jedno mnożenie macierzy dla całego wsadu (np. klucze nisz CVT).
+    """
+    import numpy as np  # numpy potrzebny tylko w ścieżce wsadowej
+
+    H = np.asarray(hists, dtype=np.float64)
+    if H.ndim != 2 or H.shape[1] != 12:
+        raise ValueError(f"Expected (B, 12) pitch-class histograms, got shape {H.shape}")
+    H = H - H.mean(axis=1, keepdims=True)
+    norm = np.linalg.norm(H, axis=1, keepdims=True)
+    H = np.divide(H, norm, out=np.zeros_like(H), where=norm > 0)
+    R = H @ np.asarray(KEY_PROFILES).T  # (B, 24)
+
+    top2 = np.partition(R, -2, axis=1)[:, -2:]
+    r1, r2 = top2[:, 1], top2[:, 0]
+    amb = np.ones_like(r1)
+    pos = r1 > 0
+    amb[pos] = np.clip(r2[pos] / r1[pos], 0.0, 1.0)
+    return np.argmax(R, axis=1), r1, amb
+
+
+# cechy dla core.stats.STAT_FEATURES (i deskryptora CVT, który liczy je wsadowo)
+KEY_FEATURES: Tuple[str, ...] = ("key_strength", "key_ambiguity")
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Dict, Tuple
 
 
 @dataclass(frozen=True)
@@ -35,3 +35,31 @@ class Melody:
     def transpose_to_first(self, target: int = 0) -> "Melody":
         shift = target - self.pitches[0]
         return Melody(tuple(p + shift for p in self.pitches), self.unit_duration)
+
+    def inversion(self) -> "Melody":
+        # interwały z przeciwnym znakiem, ta sama pierwsza nuta
+        p0 = self.pitches[0]
+        return Melody(tuple(2 * p0 - p for p in self.pitches), self.unit_duration)
+
+    def retrograde(self) -> "Melody":
+        # od tyłu, przesunięta tak, żeby zaczynała się od tej samej nuty
+        shift = self.pitches[0] - self.pitches[-1]
+        return Melody(tuple(p + shift for p in reversed(self.pitches)), self.unit_duration)
+
+
+# warianty symetrii: nazwa -> (odwrócona kolejność interwałów, zanegowane interwały)
+SYMMETRY_TRANSFORMS: Dict[str, Tuple[bool, bool]] = {
+    "I": (False, True),    # inwersja
+    "R": (True, True),     # rak (retrogradacja)
+    "RI": (True, False),   # rak inwersji
+}
+
+
+def symmetry_variant(melody: Melody, kind: str) -> Melody:
+    if kind == "I":
+        return melody.inversion()
+    if kind == "R":
+        return melody.retrograde()
+    if kind == "RI":
+        return melody.retrograde().inversion()
+    raise ValueError(f"Unknown symmetry variant: {kind} (known: {', '.join(SYMMETRY_TRANSFORMS)})")
@@ -0,0 +1,99 @@
+# core/ngrams.py
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Set
+
+# Wspólne jądro n-gramów nad krótkimi ciągami liczb całkowitych (kontur,
+# interwały). Okno kodujemy kroczącym wielomianem o podstawie 2**bits:
+#   h = ((h << bits) | (v & digit_mask)) & window_mask
+# Dla wartości z zakresu [-2**(bits-1), 2**(bits-1)) kod jest dokładny (bez
+# kolizji), więc liczniki są identyczne jak na krotkach, ale bez tworzenia
+# krotki/zbioru dla każdego okna.
+
+CONTOUR_BITS = 2    # -1, 0, 1
+INTERVAL_BITS = 8   # |interwał| < 128 (zakres MIDI)
+
+
+def contour(intervals: Sequence[int]) -> List[int]:
+    return [0 if d == 0 else (1 if d > 0 else -1) for d in intervals]
+
+
+def rolling_codes(seq: Sequence[int], n: int, bits: int = INTERVAL_BITS) -> List[int]:
+    """Kod każdego okna seq[i:i+n] (len(seq) - n + 1 wartości)."""
+    if n <= 0 or len(seq) < n:
+        return []
+    digit = (1 << bits) - 1
+    mask = (1 << (bits * n)) - 1
+    out: List[int] = []
+    h = 0
+    for i, v in enumerate(seq):
+        h = ((h << bits) | (v & digit)) & mask
+        if i >= n - 1:
+            out.append(h)
+    return out
+
+
+def ngram_set(seq: Sequence[int], n: int, bits: int = INTERVAL_BITS) -> Set[int]:
+    return set(rolling_codes(seq, n, bits))
+
+
+def ngram_counts(
+    seq: Sequence[int],
+    n: int,
+    bits: int = INTERVAL_BITS,
+    *,
+    ignore_all_same: bool = False,
+    min_nonzero: int = 0,
+) -> Dict[int, int]:
+    """
+    Liczność każdego n-gramu (kod okna -> ile razy). Reguły filtrowania okien
+    liczone w O(1) na okno:
+      ignore_all_same - pomiń okna ze wszystkimi równymi wartościami
+                        (długość bieżącej serii >= n),
+      min_nonzero     - pomiń okna z mniej niż min_nonzero wartościami != 0
+                        (sumy prefiksowe).
+    """
+    L = len(seq)
+    if n <= 0 or L < n:
+        return {}
+    digit = (1 << bits) - 1
+    mask = (1 << (bits * n)) - 1
+
+    # nz[j] = liczba niezerowych w seq[:j]
+    nz = [0] * (L + 1)
+    counts: Dict[int, int] = {}
+    h = 0
+    run = 0
+    prev = None
+    for j, v in enumerate(seq):
+        h = ((h << bits) | (v & digit)) & mask
+        nz[j + 1] = nz[j] + (v != 0)
+        run = run + 1 if v == prev else 1
+        prev = v
+        if j < n - 1:
+            continue
+        if ignore_all_same and run >= n:
+            continue
+        if min_nonzero and nz[j + 1] - nz[j + 1 - n] < min_nonzero:
+            continue
+        counts[h] = counts.get(h, 0) + 1
+    return counts
+
+
+def max_ngram_count(
+    seq: Sequence[int],
+    n: int,
+    bits: int = INTERVAL_BITS,
+    *,
+    ignore_all_same: bool = False,
+    min_nonzero: int = 0,
+) -> int:
+    counts = ngram_counts(seq, n, bits, ignore_all_same=ignore_all_same, min_nonzero=min_nonzero)
+    return max(counts.values(), default=0)
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
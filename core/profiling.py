@@ -0,0 +1,123 @@
+# core/profiling.py
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+
+# Profil faz runu: czasy (inkluzywne - faza zagnieżdżona liczy się też w
+# zewnętrznej), szczyt pamięci per faza i próbki pamięci w trakcie
+# (tracemalloc). Wynik: JSON w katalogu runu, porównywalny między commitami;
+# wybrane fazy (np. main_loop) opcjonalnie pod cProfile -> profile.pstats.
+# Mierzony jest tylko proces główny (ewaluacja w procesach roboczych nie).
+
+PROFILE_JSON = "profile.json"
+PROFILE_PSTATS = "profile.pstats"
+
+
+def git_revision(cwd: str = ".") -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=cwd, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None if out.returncode == 0 else None
+
+
+class PhaseProfiler:
+    def __init__(self, trace_memory: bool = True, cprofile_phases: Tuple[str, ...] = ()):
+        self.trace_memory = trace_memory
+        self.cprofile_phases = tuple(cprofile_phases)
+        self._cprofile = cProfile.Profile() if self.cprofile_phases else None
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.samples: List[Dict[str, Any]] = []
+        self._t0 = time.perf_counter()
+        self._started_tracemalloc = False
+        # otwarte fazy: [pamięć na starcie, szczyt w trakcie]; szczyt runu osobno,
+        # bo tracemalloc.reset_peak przy wejściu w fazę zeruje licznik globalny
+        self._open: List[List[int]] = []
+        self._run_peak = 0
+
+    def start(self) -> None:
+        self._t0 = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self) -> None:
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _fold_peak(self) -> int:
+        # bieżący szczyt tracemalloc -> otwarte fazy i szczyt runu
+        cur, peak = tracemalloc.get_traced_memory()
+        for frame in self._open:
+            frame[1] = max(frame[1], peak)
+        self._run_peak = max(self._run_peak, peak)
+        return cur
+
+    @contextmanager
+    def phase(self, name: str):
+        # peak_growth_mb: własny szczyt fazy ponad pamięć z jej startu (max po wywołaniach)
+        st = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0, "peak_growth_mb": 0.0})
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            cur = self._fold_peak()
+            tracemalloc.reset_peak()
+            self._open.append([cur, cur])
+        prof = self._cprofile if name in self.cprofile_phases else None
+        t0 = time.perf_counter()
+        if prof is not None:
+            prof.enable()
+        try:
+            yield
+        finally:
+            if prof is not None:
+                prof.disable()
+            st["seconds"] += time.perf_counter() - t0
+            st["calls"] += 1
+            if tracing and tracemalloc.is_tracing():
+                self._fold_peak()
+                start, peak = self._open.pop()
+                st["peak_growth_mb"] = max(st["peak_growth_mb"], (peak - start) / 2**20)
+            elif tracing:
+                self._open.pop()
+
+    def sample(self, **fields: Any) -> None:
+        row: Dict[str, Any] = {"t": time.perf_counter() - self._t0, **fields}
+        if tracemalloc.is_tracing():
+            cur = self._fold_peak()
+            row["current_mb"] = cur / 2**20
+            row["peak_mb"] = self._run_peak / 2**20
+        self.samples.append(row)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "wall_s": time.perf_counter() - self._t0,
+            "trace_memory": self.trace_memory,
+            "cprofile_phases": list(self.cprofile_phases),
+            "run_peak_mb": self._run_peak / 2**20 if self.trace_memory else None,
+            "phases": self.phases,
+            "samples": self.samples,
+        }
+
+    def save(self, out_dir: str, extra: Optional[Dict[str, Any]] = None) -> str:
+        """profile.json (+ profile.pstats, jeśli był cProfile); zwraca ścieżkę JSON."""
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(os.path.join(out_dir, PROFILE_PSTATS))
+        path = os.path.join(out_dir, PROFILE_JSON)
+        data = {"git_revision": git_revision(), **(extra or {}), **self.summary()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+
+def maybe_phase(profiler: Optional[PhaseProfiler], name: str):
+    return profiler.phase(name) if profiler is not None else nullcontext()
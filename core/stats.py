@@ -1,6 +1,8 @@
+import math
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Callable, Dict, Tuple
 from .melody import Melody
+from .keys import key_fit
 
 
 def _sgn(v: int) -> int:
@@ -71,3 +73,86 @@ class MelodyStats:
             small_ratio=small / (n - 1),
             large_ratio=large / (n - 1),
         )
+
+    def for_variant(self, variant: Melody, *, reverse: bool, negate: bool, modulo: int = 12) -> "MelodyStats":
+        """
+        Statystyki wariantu symetrii (inwersja / rak) wyprowadzone z oryginału:
+        ambitus, zwroty i udziały małych/dużych kroków się nie zmieniają,
+        interwały tylko odwracamy/negujemy; liczymy od nowa tylko histogram klas.
+        """
+        intervals = self.intervals[::-1] if reverse else self.intervals
+        if negate:
+            intervals = tuple(-d for d in intervals)
+        hist = [0] * modulo
+        for p in variant.pitches:
+            hist[p % modulo] += 1
+        sorted_hist = sorted(hist, reverse=True)
+        return MelodyStats(
+            n=self.n,
+            intervals=intervals,
+            abs_intervals=self.abs_intervals[::-1] if reverse else self.abs_intervals,
+            turns=self.turns,
+            ambitus=self.ambitus,
+            pitch_class_hist=tuple(hist),
+            top1_ratio=sorted_hist[0] / self.n,
+            top3_ratio=sum(sorted_hist[:3]) / self.n,
+            small_ratio=self.small_ratio,
+            large_ratio=self.large_ratio,
+        )
+
+
+# ---------- cechy skalarne (do deskryptorów / kolumn cech) ----------
+
+def turn_rate(stats: MelodyStats) -> float:
+    return stats.turns / max(1, stats.n - 2)
+
+
+def used_pitch_classes(stats: MelodyStats) -> float:
+    return float(sum(1 for c in stats.pitch_class_hist if c > 0))
+
+
+def mean_abs_interval(stats: MelodyStats) -> float:
+    return sum(stats.abs_intervals) / max(1, len(stats.abs_intervals))
+
+
+def interval_entropy(stats: MelodyStats) -> float:
+    counts: Dict[int, int] = {}
+    for d in stats.intervals:
+        counts[d] = counts.get(d, 0) + 1
+    m = len(stats.intervals)
+    H = 0.0
+    for c in counts.values():
+        p = c / m
+        H -= p * math.log2(p)
+    return H
+
+
+def climax_position(stats: MelodyStats) -> float:
+    # pierwsze maksimum wysokości, odtworzone z interwałów (pitch[0] = 0)
+    best_i, best, cur = 0, 0, 0
+    for i, d in enumerate(stats.intervals, start=1):
+        cur += d
+        if cur > best:
+            best_i, best = i, cur
+    return best_i / max(1, stats.n - 1)
+
+
+STAT_FEATURES: Dict[str, Callable[[MelodyStats], float]] = {
+    "ambitus": lambda s: float(s.ambitus),
+    "turn_rate": turn_rate,
+    "pc_used": used_pitch_classes,
+    "top1_ratio": lambda s: s.top1_ratio,
+    "top3_ratio": lambda s: s.top3_ratio,
+    "small_ratio": lambda s: s.small_ratio,
+    "large_ratio": lambda s: s.large_ratio,
+    "mean_abs_interval": mean_abs_interval,
+    "interval_entropy": interval_entropy,
+    "climax_position": climax_position,
+    # dopasowanie do tonacji (core.keys)
+    "key_strength": lambda s: key_fit(s.pitch_class_hist).strength,
+    "key_ambiguity": lambda s: key_fit(s.pitch_class_hist).ambiguity,
+}
+
+
+def stats_features(stats: MelodyStats, names: Tuple[str, ...]) -> Tuple[float, ...]:
+    return tuple(float(STAT_FEATURES[n](stats)) for n in names)
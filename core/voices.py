@@ -0,0 +1,43 @@
+# core/voices.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+from .melody import Melody
+
+# Dwa głosy nuta przeciw nucie (1:1): ta sama liczba nut, wysokości w tym samym
+# układzie odniesienia (interwał pionowy = upper - lower; ujemny = skrzyżowanie).
+
+
+@dataclass(frozen=True)
+class TwoVoice:
+    upper: Melody
+    lower: Melody
+
+    def __post_init__(self) -> None:
+        if self.upper.n != self.lower.n:
+            raise ValueError(f"Voices must have equal length: {self.upper.n} != {self.lower.n}")
+
+    @property
+    def n(self) -> int:
+        return self.upper.n
+
+    @staticmethod
+    def with_counter(cantus: Melody, counter: Melody, counter_below: bool = True) -> "TwoVoice":
+        return TwoVoice(upper=cantus, lower=counter) if counter_below else TwoVoice(upper=counter, lower=cantus)
+
+    def vertical_intervals(self) -> Tuple[int, ...]:
+        return tuple(u - l for u, l in zip(self.upper.pitches, self.lower.pitches))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "upper": {"pitches": list(self.upper.pitches), "unit_duration": self.upper.unit_duration},
+            "lower": {"pitches": list(self.lower.pitches), "unit_duration": self.lower.unit_duration},
+        }
+
+    @staticmethod
+    def from_dict(d: Dict[str, Any]) -> "TwoVoice":
+        def mel(v: Dict[str, Any]) -> Melody:
+            return Melody(tuple(v["pitches"]), float(v.get("unit_duration", 0.25)))
+        return TwoVoice(upper=mel(d["upper"]), lower=mel(d["lower"]))
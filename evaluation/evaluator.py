@@ -1,10 +1,10 @@
 # evaluation/evaluator.py
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Dict, Any
+from dataclasses import dataclass, is_dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
-from core.melody import Melody
+from core.melody import Melody, SYMMETRY_TRANSFORMS, symmetry_variant
 from core.stats import MelodyStats
 from core.io import SearchResult  # jeśli SearchResult jest gdzie indziej, popraw import
 
@@ -13,13 +13,46 @@ class MelodyEvaluator:
     def __init__(self, filters, scorers):
         self.filters = list(filters)
         self.scorers = list(scorers)
+        self._units: Tuple[Tuple[int, ...], list] = ((), [])
+
+    def _unit_scorers(self) -> list:
+        # kopie scorerów z wagą 1 (odświeżane, gdy ktoś podmieni self.scorers)
+        ids = tuple(map(id, self.scorers))
+        if self._units[0] != ids:
+            self._units = (ids, [unit_weight(s) for s in self.scorers])
+        return self._units[1]
 
     def evaluate(self, melody: Melody) -> SearchResult:
-        stats = MelodyStats.compute(melody)
+        return self._evaluate(melody, MelodyStats.compute(melody))
+
+    def evaluate_symmetry_class(
+        self,
+        melody: Melody,
+        kinds: Sequence[str] = ("I", "R", "RI"),
+    ) -> List[Tuple[SearchResult, MelodyStats]]:
+        """
+        Oryginał + jego warianty symetrii (bez powtórzeń), z wynikami i statystykami.
+        Filtry/scorery z symmetry_invariant=True liczone raz na całą klasę,
+        statystyki wariantów wyprowadzone z oryginału (MelodyStats.for_variant).
+        """
+        base = MelodyStats.compute(melody)
+        shared: Dict[Tuple[str, int], Any] = {}
+        out = [(self._evaluate(melody, base, shared), base)]
+        seen = {melody.pitches}
+        for kind in kinds:
+            variant = symmetry_variant(melody, kind)
+            if variant.pitches in seen:
+                continue
+            seen.add(variant.pitches)
+            reverse, negate = SYMMETRY_TRANSFORMS[kind]
+            stats = base.for_variant(variant, reverse=reverse, negate=negate)
+            out.append((self._evaluate(variant, stats, shared), stats))
+        return out
 
+    def _evaluate(self, melody: Melody, stats: MelodyStats, shared: Optional[dict] = None) -> SearchResult:
         filter_trace: List[Dict[str, Any]] = []
-        for flt in self.filters:
-            passed, reason = flt.check(melody, stats)
+        for i, flt in enumerate(self.filters):
+            passed, reason = _shared(shared, ("f", i), flt, lambda: flt.check(melody, stats))
             filter_trace.append({
                 "type": flt.__class__.__name__,
                 "passed": bool(passed),
@@ -39,12 +72,15 @@ class MelodyEvaluator:
 
         score_breakdown: List[Dict[str, Any]] = []
         total = 0.0
-        for scr in self.scorers:
-            val = float(scr.score(melody, stats))
+        # wartość = waga * surowy wynik; surowy zostaje w rozbiciu (przeważanie bez ponownej oceny)
+        for i, (scr, unit) in enumerate(zip(self.scorers, self._unit_scorers())):
+            raw = float(_shared(shared, ("s", i), scr, lambda: unit.score(melody, stats)))
+            val = scorer_weight(scr) * raw
             total += val
             score_breakdown.append({
                 "type": scr.__class__.__name__,
                 "value": val,
+                "raw": raw,
                 "params": {k: v for k, v in scr.__dict__.items() if not k.startswith("_")},
             })
 
@@ -59,6 +95,26 @@ class MelodyEvaluator:
         )
 
 
+def scorer_weight(scorer) -> float:
+    return float(getattr(scorer, "weight", 1.0))
+
+
+def unit_weight(scorer):
+    """Ten sam scorer z wagą 1 (scorery są liniowe w wadze: score = weight * f)."""
+    if scorer_weight(scorer) == 1.0 or not is_dataclass(scorer) or not hasattr(scorer, "weight"):
+        return scorer
+    return replace(scorer, weight=1.0)
+
+
+def _shared(shared: Optional[dict], key: Tuple[str, int], obj, compute: Callable[[], Any]) -> Any:
+    # wynik niezmienniczy względem symetrii: liczony raz dla całej klasy wariantów
+    if shared is None or not getattr(obj, "symmetry_invariant", False):
+        return compute()
+    if key not in shared:
+        shared[key] = compute()
+    return shared[key]
+
+
 def _stats_to_meta(stats: MelodyStats) -> dict:
     # minimalnie użyteczne rzeczy do debugowania
     return {
@@ -1,11 +1,14 @@
 from dataclasses import dataclass
-from typing import Tuple
+from typing import ClassVar, Tuple
 from core.melody import Melody
 from core.stats import MelodyStats
+from core.keys import key_fit
 
 
 class Filter:
     name: str
+    # wynik taki sam dla inwersji / raka melodii (MelodyEvaluator.evaluate_symmetry_class)
+    symmetry_invariant: ClassVar[bool] = False
 
     def check(self, melody: Melody, stats: MelodyStats) -> Tuple[bool, str]:
         raise NotImplementedError
@@ -14,6 +17,7 @@ class Filter:
 @dataclass(frozen=True)
 class MaxStepFilter(Filter):
     name: str = "MaxStepFilter"
+    symmetry_invariant: ClassVar[bool] = True
     max_abs_step: int = 7
 
     def check(self, melody: Melody, stats: MelodyStats):
@@ -25,6 +29,7 @@ class MaxStepFilter(Filter):
 @dataclass(frozen=True)
 class AmbitusFilter(Filter):
     name: str = "AmbitusFilter"
+    symmetry_invariant: ClassVar[bool] = True
     max_ambitus: int = 14
 
     def check(self, melody: Melody, stats: MelodyStats):
@@ -36,6 +41,7 @@ class AmbitusFilter(Filter):
 @dataclass(frozen=True)
 class TurnsRateFilter(Filter):
     name: str = "TurnsRateFilter"
+    symmetry_invariant: ClassVar[bool] = True
     max_rate: float = 0.40
 
     def check(self, melody: Melody, stats: MelodyStats):
@@ -54,3 +60,20 @@ class PitchClassConcentrationFilter(Filter):
         if stats.top3_ratio < self.min_top3_ratio:
             return False, "pitch classes too flat"
         return True, ""
+
+
+@dataclass(frozen=True)
+class KeyFitFilter(Filter):
+    name: str = "KeyFitFilter"
+    # korelacja z najlepiej pasującą tonacją (core.keys), -1..1
+    min_strength: float = 0.5
+    # druga najlepsza / najlepsza; 1.0 = bez limitu
+    max_ambiguity: float = 1.0
+
+    def check(self, melody: Melody, stats: MelodyStats):
+        fit = key_fit(stats.pitch_class_hist)
+        if fit.strength < self.min_strength:
+            return False, "weak key fit"
+        if fit.ambiguity > self.max_ambiguity:
+            return False, "ambiguous key"
+        return True, ""
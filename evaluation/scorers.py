@@ -1,11 +1,15 @@
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import ClassVar, Dict, Tuple
 from core.melody import Melody
 from core.stats import MelodyStats
+from core.keys import key_fit
+from core.ngrams import CONTOUR_BITS, contour, max_ngram_count
 import math
 
 class Scorer:
     name: str
+    # wynik taki sam dla inwersji / raka melodii (MelodyEvaluator.evaluate_symmetry_class)
+    symmetry_invariant: ClassVar[bool] = False
 
     def score(self, melody: Melody, stats: MelodyStats) -> float:
         raise NotImplementedError
@@ -14,6 +18,7 @@ class Scorer:
 @dataclass(frozen=True)
 class BellCurveIntervalScorer(Scorer):
     name: str = "BellCurveIntervalScorer"
+    symmetry_invariant: ClassVar[bool] = True
     target: float = 2.5
     width: float = 1.2
     weight: float = 1.0
@@ -30,6 +35,7 @@ from typing import Dict, Tuple
 @dataclass(frozen=True)
 class MotifNGramScorer(Scorer):
     name: str = "MotifNGramScorer"
+    symmetry_invariant: ClassVar[bool] = True
     ngram: int = 4
     min_repeats: int = 2
     weight: float = 1.0
@@ -39,27 +45,16 @@ class MotifNGramScorer(Scorer):
     ignore_all_same: bool = True    # ignoruj (0,0,0,0), (-1,-1,-1,-1), (1,1,1,1)
 
     def score(self, melody: Melody, stats: MelodyStats) -> float:
-        def sgn(v: int) -> int:
-            return 0 if v == 0 else (1 if v > 0 else -1)
-
-        contour = [sgn(d) for d in stats.intervals]
-        counts: Dict[Tuple[int, ...], int] = {}
-
-        for i in range(len(contour) - self.ngram + 1):
-            g = tuple(contour[i:i + self.ngram])
-
-            # 1) ignoruj n-gramy "wszystko takie samo"
-            if self.ignore_all_same and len(set(g)) == 1:
-                continue
-
-            # 2) ignoruj n-gramy zbyt "płaskie" (za mało niezerowych)
-            nonzero = sum(1 for x in g if x != 0)
-            if nonzero < self.min_nonzero_in_ngram:
-                continue
-
-            counts[g] = counts.get(g, 0) + 1
-
-        best = max(counts.values(), default=0)
+        # kontur (-1/0/1) -> liczności n-gramów przez kroczący kod okna (core.ngrams):
+        # 1) ignoruj n-gramy "wszystko takie samo": (0,0,0,0), (-1,-1,-1,-1), (1,1,1,1)
+        # 2) ignoruj n-gramy zbyt "płaskie" (za mało niezerowych) - wymuś “ruch” w motywie
+        best = max_ngram_count(
+            contour(stats.intervals),
+            self.ngram,
+            CONTOUR_BITS,
+            ignore_all_same=self.ignore_all_same,
+            min_nonzero=self.min_nonzero_in_ngram,
+        )
         if best >= self.min_repeats:
             return self.weight * (best - self.min_repeats + 1)
         return 0.0
@@ -88,6 +83,7 @@ class ClimaxPlacementScorer(Scorer):
 @dataclass(frozen=True)
 class EndNearStartScorer(Scorer):
     name: str = "EndNearStartScorer"
+    symmetry_invariant: ClassVar[bool] = True
     tolerance: int = 2  # półtony
     weight: float = 0.8
 
@@ -102,6 +98,7 @@ class EndNearStartScorer(Scorer):
 @dataclass(frozen=True)
 class TurnsTargetScorer(Scorer):
     name: str = "TurnsTargetScorer"
+    symmetry_invariant: ClassVar[bool] = True
     target: float = 0.25   # 0.20–0.35 zwykle brzmi “melodyjnie”
     width: float = 0.12
     weight: float = 1.0
@@ -116,6 +113,7 @@ class TurnsTargetScorer(Scorer):
 @dataclass(frozen=True)
 class IntervalEntropyScorer(Scorer):
     name: str = "IntervalEntropyScorer"
+    symmetry_invariant: ClassVar[bool] = True
     weight: float = 1.0
     target_bits: float = 2.2   # 2.0–2.6 sensowny zakres
     width: float = 1.0         # jak mocno kara odchylenia
@@ -155,4 +153,20 @@ class PitchClassTop3TargetScorer(Scorer):
         top3 = sum(sorted(hist, reverse=True)[:3])
         ratio = top3 / n
         x = (ratio - self.target) / self.width
-        return self.weight * (1.0 - x*x)
\ No newline at end of file
+        return self.weight * (1.0 - x*x)
+
+
+@dataclass(frozen=True)
+class KeyFitScorer(Scorer):
+    name: str = "KeyFitScorer"
+    # kara tylko poniżej celu (silniejsza tonacja nie szkodzi)
+    target: float = 0.75
+    width: float = 0.25
+    # odjęte za niejednoznaczność (0..1) - np. dur vs równoległy moll
+    ambiguity_penalty: float = 0.0
+    weight: float = 1.0
+
+    def score(self, melody: Melody, stats: MelodyStats) -> float:
+        fit = key_fit(stats.pitch_class_hist)
+        x = min(0.0, fit.strength - self.target) / self.width
+        return self.weight * (1.0 - x * x - self.ambiguity_penalty * fit.ambiguity)
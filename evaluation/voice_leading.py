@@ -0,0 +1,234 @@
+# evaluation/voice_leading.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from core.io import SearchResult
+from core.melody import Melody
+from core.voices import TwoVoice
+from evaluation.evaluator import scorer_weight, unit_weight
+
+# Prowadzenie głosów dla dwóch głosów 1:1, liczone wektorowo dla całego wsadu
+# kandydatów naraz: macierze (B, N) wysokości obu głosów -> interwały pionowe,
+# ruchy, równoległe kwinty/oktawy, skrzyżowania, udział konsonansów.
+# Filtry i scorery działają na VoicePairStats (tablice (B,)), nie per melodia.
+
+# klasy interwałów pionowych: pryma/oktawa, tercje, kwinta, seksty (kwarta w 2 głosach = dysonans)
+CONSONANT_IC: Tuple[int, ...] = (0, 3, 4, 7, 8, 9)
+PERFECT_IC: Tuple[int, ...] = (0, 7)
+
+
+@dataclass(frozen=True)
+class VoicePairStats:
+    n: int
+    parallel_perfect: np.ndarray   # liczba równoległych kwint / oktaw (i prym)
+    crossings: np.ndarray          # nuty z górnym głosem poniżej dolnego
+    consonant_ratio: np.ndarray    # udział konsonansów wśród interwałów pionowych
+    contrary_ratio: np.ndarray     # udział ruchu przeciwnego wśród kroków
+    max_spacing: np.ndarray        # największa odległość głosów (półtony)
+
+    def row(self, i: int) -> Dict[str, float]:
+        return {
+            "parallel_perfect": int(self.parallel_perfect[i]),
+            "crossings": int(self.crossings[i]),
+            "consonant_ratio": float(self.consonant_ratio[i]),
+            "contrary_ratio": float(self.contrary_ratio[i]),
+            "max_spacing": int(self.max_spacing[i]),
+        }
+
+
+def voice_pair_stats(upper, lower) -> VoicePairStats:
+    """upper, lower: (N,) albo (B, N); jeden głos może być wspólny (broadcast)."""
+    U, L = np.broadcast_arrays(np.atleast_2d(np.asarray(upper, dtype=np.int64)),
+                               np.atleast_2d(np.asarray(lower, dtype=np.int64)))
+    n = U.shape[1]
+    if n < 2:
+        raise ValueError("Voices must have at least 2 notes")
+    V = U - L
+    ic = np.abs(V) % 12
+    perfect = np.isin(ic, PERFECT_IC)
+
+    motion = np.diff(U, axis=1) * np.diff(L, axis=1)
+    same_dir = motion > 0
+    # ta sama doskonała konsonansa dwa razy z rzędu, oba głosy w tę samą stronę
+    parallel = perfect[:, 1:] & perfect[:, :-1] & (ic[:, 1:] == ic[:, :-1]) & same_dir
+
+    return VoicePairStats(
+        n=n,
+        parallel_perfect=parallel.sum(axis=1),
+        crossings=(V < 0).sum(axis=1),
+        consonant_ratio=np.isin(ic, CONSONANT_IC).mean(axis=1),
+        contrary_ratio=(motion < 0).mean(axis=1),
+        max_spacing=np.abs(V).max(axis=1),
+    )
+
+
+# ---------- filtry ----------
+
+class VoiceFilter:
+    name: str
+
+    def check_batch(self, st: VoicePairStats) -> Tuple[np.ndarray, str]:
+        """(maska przechodzących (B,), powód odrzucenia)."""
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class ParallelPerfectFilter(VoiceFilter):
+    name: str = "ParallelPerfectFilter"
+    max_count: int = 0
+
+    def check_batch(self, st: VoicePairStats):
+        return st.parallel_perfect <= self.max_count, "parallel fifths/octaves"
+
+
+@dataclass(frozen=True)
+class VoiceCrossingFilter(VoiceFilter):
+    name: str = "VoiceCrossingFilter"
+    max_crossings: int = 0
+
+    def check_batch(self, st: VoicePairStats):
+        return st.crossings <= self.max_crossings, "voice crossing"
+
+
+@dataclass(frozen=True)
+class MaxSpacingFilter(VoiceFilter):
+    name: str = "MaxSpacingFilter"
+    max_spacing: int = 19  # do duodecymy
+
+    def check_batch(self, st: VoicePairStats):
+        return st.max_spacing <= self.max_spacing, "voices too far apart"
+
+
+# ---------- scorery ----------
+
+class VoiceScorer:
+    name: str
+
+    def score_batch(self, st: VoicePairStats) -> np.ndarray:
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class ConsonanceMixScorer(VoiceScorer):
+    name: str = "ConsonanceMixScorer"
+    # trochę dysonansów (przejściowych) jest pożądane, nie zero
+    target: float = 0.8
+    width: float = 0.15
+    weight: float = 1.0
+
+    def score_batch(self, st: VoicePairStats) -> np.ndarray:
+        x = (st.consonant_ratio - self.target) / self.width
+        return self.weight * (1.0 - x * x)
+
+
+@dataclass(frozen=True)
+class ContraryMotionScorer(VoiceScorer):
+    name: str = "ContraryMotionScorer"
+    target: float = 0.5
+    width: float = 0.25
+    weight: float = 0.8
+
+    def score_batch(self, st: VoicePairStats) -> np.ndarray:
+        # kara tylko poniżej celu
+        x = np.minimum(0.0, st.contrary_ratio - self.target) / self.width
+        return self.weight * (1.0 - x * x)
+
+
+# ---------- ewaluator kontrapunktu ----------
+
+def _params(obj) -> Dict[str, Any]:
+    return {k: v for k, v in obj.__dict__.items() if not k.startswith("_")}
+
+
+class CounterLineEvaluator:
+    """
+    Ocena linii kontrapunktu (kandydat = Melody drugiego głosu) względem stałego
+    cantus: najpierw zwykły ewaluator melodyczny na samej linii, potem filtry i
+    scorery prowadzenia głosów wektorowo dla wszystkich linii, które przeszły.
+    Interfejs jak MelodyEvaluator (evaluate, filters, scorers) + evaluate_many,
+    więc działa z MapElites bez zmian (mutowana jest tylko linia kontrapunktu).
+    """
+
+    def __init__(
+        self,
+        cantus: Melody,
+        melodic,
+        voice_filters: Sequence[VoiceFilter] = (),
+        voice_scorers: Sequence[VoiceScorer] = (),
+        counter_below: bool = True,
+    ):
+        self.cantus = cantus
+        self.melodic = melodic
+        self.voice_filters = list(voice_filters)
+        self.voice_scorers = list(voice_scorers)
+        self.counter_below = counter_below
+        self._cantus = np.asarray(cantus.pitches, dtype=np.int64)
+
+    @property
+    def filters(self) -> list:
+        return list(self.melodic.filters) + self.voice_filters
+
+    @property
+    def scorers(self) -> list:
+        return list(self.melodic.scorers) + self.voice_scorers
+
+    def pair(self, counter: Melody) -> TwoVoice:
+        return TwoVoice.with_counter(self.cantus, counter, self.counter_below)
+
+    def evaluate(self, melody: Melody) -> SearchResult:
+        return self.evaluate_many([melody])[0]
+
+    def evaluate_many(self, melodies: Sequence[Melody]) -> List[SearchResult]:
+        for m in melodies:
+            if m.n != self.cantus.n:
+                raise ValueError(f"Counter-line has {m.n} notes, cantus has {self.cantus.n}")
+        results: List[SearchResult] = [self.melodic.evaluate(m) for m in melodies]
+        idx = [i for i, r in enumerate(results) if r.passed]
+        if not idx:
+            return results
+
+        C = np.array([melodies[i].pitches for i in idx], dtype=np.int64)
+        st = voice_pair_stats(self._cantus, C) if self.counter_below else voice_pair_stats(C, self._cantus)
+        checks = [flt.check_batch(st) for flt in self.voice_filters]
+        raws = [unit_weight(sc).score_batch(st) for sc in self.voice_scorers]
+
+        for row, i in enumerate(idx):
+            res = results[i]
+            trace = list(res.filter_trace)
+            meta = dict(res.meta or {}, voices=st.row(row))
+            reason = None
+            # jak MelodyEvaluator: ślad do pierwszego odrzucenia
+            for flt, (mask, why) in zip(self.voice_filters, checks):
+                passed = bool(mask[row])
+                trace.append({
+                    "type": flt.__class__.__name__,
+                    "passed": passed,
+                    "reason": "" if passed else why,
+                    "params": _params(flt),
+                })
+                if not passed:
+                    reason = why
+                    break
+            if reason is not None:
+                results[i] = SearchResult(
+                    melody=res.melody, score=float("-inf"), passed=False, reason=reason,
+                    score_breakdown=[], filter_trace=trace, meta=meta,
+                )
+                continue
+
+            breakdown = list(res.score_breakdown)
+            total = res.score
+            for sc, r in zip(self.voice_scorers, raws):
+                raw = float(r[row])
+                val = scorer_weight(sc) * raw
+                total += val
+                breakdown.append({"type": sc.__class__.__name__, "value": val, "raw": raw, "params": _params(sc)})
+            results[i] = SearchResult(
+                melody=res.melody, score=total, passed=True, reason="",
+                score_breakdown=breakdown, filter_trace=trace, meta=meta,
+            )
+        return results
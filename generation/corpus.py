@@ -0,0 +1,234 @@
+# generation/corpus.py
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from audio.midi_reader import monophonic_lines, read_midi_file
+from core.io import CandidateLogWriter, frame_candidates, iter_candidate_log, read_candidate_log_columns
+from core.melody import Melody
+from core.stats import MelodyStats, STAT_FEATURES, stats_features
+
+# Korpus MIDI -> zbiór okien melodii: pliki parsowane w puli procesów (wsady po
+# kilka plików, ograniczona liczba wsadów w locie = ograniczona pamięć), z każdej
+# ścieżki/kanału linia "skyline", z niej okna po n_notes nut z krokiem hop.
+# Procesy robocze liczą też MelodyStats i kodują rekordy (core.io), proces
+# główny tylko dopisuje bajty do logu. Rekord: melodia (wysokości MIDI), score
+# = NaN (brak oceny), kolumny = cechy z core.stats.STAT_FEATURES.
+# Z logu: warm start MapElites (warm_start=(ścieżka,)), próbka (sample_dataset),
+# kalibracja celów scorerów (calibrate_scorers).
+
+MIDI_EXTENSIONS = (".mid", ".midi", ".smf")
+DATASET_COLUMNS: Tuple[str, ...] = tuple(STAT_FEATURES)
+
+
+@dataclass(frozen=True)
+class CorpusConfig:
+    n_notes: int = 32
+    hop: int = 8
+    # okna ze skokiem większym niż max_leap to zwykle przeskok między frazami / głosami
+    max_leap: int = 12
+    min_distinct: int = 3
+    max_windows_per_file: int = 2000
+    skip_drums: bool = True
+    workers: int = max(1, (os.cpu_count() or 2) - 1)
+    files_per_task: int = 16
+
+
+def iter_midi_files(root: str) -> Iterator[str]:
+    if os.path.isfile(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(MIDI_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def line_windows(line: Sequence[int], cfg: CorpusConfig) -> Iterator[Tuple[int, ...]]:
+    n = cfg.n_notes
+    for i in range(0, len(line) - n + 1, max(1, cfg.hop)):
+        w = tuple(line[i:i + n])
+        if len(set(w)) < cfg.min_distinct:
+            continue
+        if any(abs(w[k + 1] - w[k]) > cfg.max_leap for k in range(n - 1)):
+            continue
+        yield w
+
+
+def file_windows(path: str, cfg: CorpusConfig) -> List[Tuple[int, ...]]:
+    _, notes = read_midi_file(path)
+    seen = set()
+    out: List[Tuple[int, ...]] = []
+    for line in monophonic_lines(notes, skip_drums=cfg.skip_drums):
+        for w in line_windows(line, cfg):
+            # powtórzenia (refreny, kopie ścieżek) tylko raz na plik
+            if w in seen:
+                continue
+            seen.add(w)
+            out.append(w)
+            if len(out) >= cfg.max_windows_per_file:
+                return out
+    return out
+
+
+def ingest_files(paths: Sequence[str], cfg: CorpusConfig) -> Tuple[bytes, int, int, List[Tuple[str, str]]]:
+    """(zakodowane rekordy, liczba okien, pliki OK, [(plik, błąd)]) dla wsadu plików."""
+    items = []
+    ok = 0
+    failed: List[Tuple[str, str]] = []
+    for path in paths:
+        try:
+            windows = file_windows(path, cfg)
+        except (OSError, ValueError) as ex:
+            failed.append((path, f"{type(ex).__name__}: {ex}"))
+            continue
+        ok += 1
+        for w in windows:
+            m = Melody(w)
+            items.append((m, math.nan, stats_features(MelodyStats.compute(m), DATASET_COLUMNS)))
+    blob, n = frame_candidates(items)
+    return blob, n, ok, failed
+
+
+def _tasks(root: str, size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for path in iter_midi_files(root):
+        batch.append(path)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_corpus(
+    root: str,
+    out_path: str,
+    cfg: Optional[CorpusConfig] = None,
+    log: Callable[[str], None] = print,
+    log_every_s: float = 10.0,
+) -> Dict[str, Any]:
+    """Parsuje wszystkie pliki MIDI spod root do logu out_path (+ out_path.json z podsumowaniem)."""
+    cfg = cfg or CorpusConfig()
+    t0 = time.monotonic()
+    summary: Dict[str, Any] = {"root": root, "config": asdict(cfg), "files_ok": 0, "windows": 0, "failed": []}
+    next_log = t0 + log_every_s
+
+    def merge(result) -> None:
+        nonlocal next_log
+        blob, n, ok, failed = result
+        writer.append_framed(blob, n)
+        summary["windows"] += n
+        summary["files_ok"] += ok
+        summary["failed"].extend(failed)
+        if time.monotonic() >= next_log:
+            next_log = time.monotonic() + log_every_s
+            log(f"{summary['files_ok']} files, {summary['windows']} windows, "
+                f"{len(summary['failed'])} failed ({time.monotonic() - t0:.0f}s)")
+
+    # nowy zbiór: log nie jest kontynuowany (podsumowanie dotyczy jednego przebiegu)
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    with CandidateLogWriter(out_path, DATASET_COLUMNS) as writer:
+        tasks = _tasks(root, cfg.files_per_task)
+        if cfg.workers <= 1:
+            for paths in tasks:
+                merge(ingest_files(paths, cfg))
+        else:
+            with ProcessPoolExecutor(max_workers=cfg.workers) as ex:
+                pending = set()
+                for paths in tasks:
+                    pending.add(ex.submit(ingest_files, paths, cfg))
+                    # ograniczona liczba wsadów w locie -> stała pamięć
+                    if len(pending) >= 2 * cfg.workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for f in done:
+                            merge(f.result())
+                for f in pending:
+                    merge(f.result())
+
+    summary["elapsed_s"] = time.monotonic() - t0
+    summary["bytes"] = os.path.getsize(out_path)
+    with open(out_path + ".json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+# ---------- próbka / kalibracja ----------
+
+def _reservoir(it, k: int, seed: int) -> list:
+    rng = random.Random(seed)
+    out: list = []
+    for i, x in enumerate(it):
+        if i < k:
+            out.append(x)
+        else:
+            j = rng.randrange(i + 1)
+            if j < k:
+                out[j] = x
+    return out
+
+
+def sample_dataset(path: str, out_path: str, k: int, seed: int = 0) -> int:
+    """Losowe k okien (reservoir) do mniejszego logu, np. jako warm start MapElites."""
+    columns = read_candidate_log_columns(path)
+    recs = _reservoir(iter_candidate_log(path), k, seed)
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    with CandidateLogWriter(out_path, columns) as w:
+        w.append_framed(*frame_candidates((r.melody, r.score, r.stats or None) for r in recs))
+    return len(recs)
+
+
+# scorer -> {parametr: (cecha, statystyka)}; "width" = odporne odchylenie (IQR / 1.349)
+CALIBRATION: Dict[str, Dict[str, Tuple[str, str]]] = {
+    "BellCurveIntervalScorer": {"target": ("mean_abs_interval", "median"), "width": ("mean_abs_interval", "width")},
+    "IntervalEntropyScorer": {"target_bits": ("interval_entropy", "median"), "width": ("interval_entropy", "width")},
+    "TurnsTargetScorer": {"target": ("turn_rate", "median"), "width": ("turn_rate", "width")},
+    "PitchClassTop3TargetScorer": {"target": ("top3_ratio", "median"), "width": ("top3_ratio", "width")},
+    "ClimaxPlacementScorer": {"low": ("climax_position", "q25"), "high": ("climax_position", "q75")},
+    "KeyFitScorer": {"target": ("key_strength", "median")},
+}
+
+
+def _summary_stat(values: List[float], kind: str) -> float:
+    q1, q2, q3 = statistics.quantiles(values, n=4)
+    if kind == "median":
+        return q2
+    if kind == "q25":
+        return q1
+    if kind == "q75":
+        return q3
+    if kind == "width":
+        return max((q3 - q1) / 1.349, 1e-3)
+    raise ValueError(f"Unknown statistic: {kind}")
+
+
+def calibrate_scorers(path: str, sample: int = 200_000, seed: int = 0) -> Dict[str, Any]:
+    """Cele scorerów z rozkładów cech korpusu (na próbce o ograniczonym rozmiarze)."""
+    columns = read_candidate_log_columns(path)
+    rows = _reservoir((r.stats for r in iter_candidate_log(path) if r.stats), sample, seed)
+    if len(rows) < 2:
+        raise ValueError(f"Not enough windows with stats in {path}")
+    col = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+
+    params: Dict[str, Dict[str, float]] = {}
+    for scorer, spec in CALIBRATION.items():
+        if all(feat in col for feat, _ in spec.values()):
+            params[scorer] = {p: round(_summary_stat(col[feat], kind), 4) for p, (feat, kind) in spec.items()}
+    return {"dataset": path, "n_samples": len(rows), "params": params}
+
+
+def calibrated_scorers(scorers: Sequence, params: Dict[str, Dict[str, float]]) -> list:
+    """Kopie scorerów z parametrami z calibrate_scorers()["params"] (po nazwie klasy)."""
+    return [replace(sc, **params[sc.__class__.__name__]) if sc.__class__.__name__ in params else sc
+            for sc in scorers]
@@ -0,0 +1,71 @@
+# scripts/ingest_midi.py
+from __future__ import annotations
+
+import os
+import json
+import argparse
+
+from generation.corpus import CorpusConfig, calibrate_scorers, ingest_corpus, sample_dataset
+
+
+def main() -> None:
+    # python -m scripts.ingest_midi ingest data/midi --out data/corpus.mlog --n 32 --hop 8
+    # python -m scripts.ingest_midi sample data/corpus.mlog --out data/seed.mlog --k 5000
+    # python -m scripts.ingest_midi calibrate data/corpus.mlog --out data/calibration.json
+    # warm start: MapElitesConfig(warm_start=("data/seed.mlog",))
+
+    ap = argparse.ArgumentParser(description="Ingest a MIDI corpus into a melody-window dataset.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    a = sub.add_parser("ingest", help="pliki .mid spod katalogu -> log okien (core.io)")
+    a.add_argument("root")
+    a.add_argument("--out", required=True)
+    a.add_argument("--n", type=int, default=32, help="długość okna (liczba nut)")
+    a.add_argument("--hop", type=int, default=8)
+    a.add_argument("--max-leap", type=int, default=12)
+    a.add_argument("--max-windows-per-file", type=int, default=2000)
+    a.add_argument("--keep-drums", action="store_true")
+    a.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    a.add_argument("--files-per-task", type=int, default=16)
+
+    s = sub.add_parser("sample", help="losowa próbka okien (np. do warm startu)")
+    s.add_argument("dataset")
+    s.add_argument("--out", required=True)
+    s.add_argument("--k", type=int, default=5000)
+    s.add_argument("--seed", type=int, default=0)
+
+    c = sub.add_parser("calibrate", help="cele scorerów z rozkładów cech korpusu")
+    c.add_argument("dataset")
+    c.add_argument("--out", default=None, help="JSON z parametrami (domyślnie tylko wypisz)")
+    c.add_argument("--sample", type=int, default=200_000)
+    c.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.cmd == "ingest":
+        cfg = CorpusConfig(
+            n_notes=args.n,
+            hop=args.hop,
+            max_leap=args.max_leap,
+            max_windows_per_file=args.max_windows_per_file,
+            skip_drums=not args.keep_drums,
+            workers=args.workers,
+            files_per_task=args.files_per_task,
+        )
+        summary = ingest_corpus(args.root, args.out, cfg)
+        print(f"{summary['files_ok']} files -> {summary['windows']} windows "
+              f"({summary['bytes'] / 1e6:.1f} MB, {summary['elapsed_s']:.1f}s), "
+              f"{len(summary['failed'])} failed; summary: {args.out}.json")
+    elif args.cmd == "sample":
+        n = sample_dataset(args.dataset, args.out, args.k, seed=args.seed)
+        print(f"Sampled {n} windows to: {args.out}")
+    else:
+        calib = calibrate_scorers(args.dataset, sample=args.sample, seed=args.seed)
+        print(json.dumps(calib["params"], indent=2))
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(calib, f, ensure_ascii=False, indent=2)
+            print("Saved calibration to:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# scripts/preview_server.py
+from __future__ import annotations
+
+import asyncio
+import argparse
+
+from audio.midi_writer import MidiRenderConfig
+from audio.renderers import RENDER_BACKENDS, make_renderer
+from audio.render_cache import RenderCache
+from audio.preview_server import PreviewConfig, PreviewService, serve
+
+
+def main() -> None:
+    # python -m scripts.preview_server
+    # python -m scripts.preview_server --backend fluidsynth --sf2 soundfonts/piano.sf2 --port 8765
+    #
+    # curl "http://127.0.0.1:8765/render?path=results/elites/run3/elite_a07_t05_pc07_k00.json" -o a.wav
+    # curl -X POST "http://127.0.0.1:8765/render?format=mid" -d '{"pitches": [0, 2, 4, 5, 7]}' -o a.mid
+
+    ap = argparse.ArgumentParser(description="Local preview server: melody JSON / elite file -> WAV/MIDI.")
+    ap.add_argument("--backend", choices=RENDER_BACKENDS, default="synth")
+    ap.add_argument("--sf2", default="soundfonts/piano.sf2")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--unix-socket", default=None, help="słuchaj na gnieździe Unix zamiast TCP")
+    ap.add_argument("--cache-dir", default="results/.render_cache")
+    ap.add_argument("--root", default=".", help="pliki 'path' tylko spod tego katalogu")
+    ap.add_argument("--batch-window-ms", type=float, default=15.0)
+    ap.add_argument("--memory-mb", type=int, default=256)
+    args = ap.parse_args()
+
+    renderer = make_renderer(args.backend, sf2_path=args.sf2, gain=1.0)
+    service = PreviewService(
+        renderer,
+        RenderCache(args.cache_dir),
+        midi_cfg=MidiRenderConfig(instrument_program=0, velocity=120),
+        cfg=PreviewConfig(
+            batch_window_ms=args.batch_window_ms,
+            memory_cache_bytes=args.memory_mb * 1024 * 1024,
+            root_dir=args.root,
+        ),
+    )
+
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"Preview server ({args.backend}) on {where}")
+    try:
+        asyncio.run(serve(service, host=args.host, port=args.port, unix_socket=args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
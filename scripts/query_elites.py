@@ -0,0 +1,58 @@
+# scripts/query_elites.py
+from __future__ import annotations
+
+import os
+import argparse
+import json
+
+from core.elite_store import EliteStore, parse_query
+
+
+def main() -> None:
+    # python -m scripts.query_elites --import results/elites
+    # python -m scripts.query_elites --query "max_ambitus=10" --limit 20
+    # python -m scripts.query_elites --query "pc_bin=7,min_score=4" --json > picked.json
+    # python -m scripts.query_elites --runs
+
+    ap = argparse.ArgumentParser(description="Query the elite store (SQLite) across all runs.")
+    ap.add_argument("--db", default="results/elites/elites.sqlite")
+    ap.add_argument("--import", dest="import_dirs", nargs="*", default=[],
+                    help="zaimportuj runN albo katalog bazowy z runami (index.json + elite_*.json)")
+    ap.add_argument("--query", default="", help='np. "max_ambitus=10,min_score=4.5"')
+    ap.add_argument("--order", default="score", choices=("score", "-score", "ambitus", "run_id"))
+    ap.add_argument("--limit", type=int, default=20)
+    ap.add_argument("--json", action="store_true", help="wypisz pełne SearchResult jako JSON")
+    ap.add_argument("--runs", action="store_true", help="lista runów w bazie")
+    args = ap.parse_args()
+
+    with EliteStore(args.db) as store:
+        for d in args.import_dirs:
+            if os.path.isfile(os.path.join(d, "index.json")):
+                n = store.import_run_dir(d)
+            else:
+                n = store.import_base_dir(d)
+            print(f"Imported {n} elites from {d}")
+
+        if args.runs:
+            for r in store.runs():
+                print(f"{r['run_id']:<32} {r['config_hash']} {r['created_utc'] or '-':<22} "
+                      f"n={r['n_elites']:<5} best={r['best_score'] if r['best_score'] is not None else '-'}")
+            return
+
+        if args.import_dirs and not args.query:
+            return
+
+        results = store.query(order_by=args.order, limit=args.limit, **parse_query(args.query))
+
+    if args.json:
+        print(json.dumps([r.to_dict() for r in results], ensure_ascii=False, indent=2))
+        return
+
+    for r in results:
+        d = r.meta.get("descriptor", {})
+        cell = " ".join(f"{k}={v}" for k, v in d.items() if k != "centroid")
+        print(f"{r.score:8.4f}  amb={r.melody.ambitus():<3} {cell:<48} {r.meta['run_id']}/{r.meta['file']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,112 @@
 # scripts/render_elites_batch.py
 from __future__ import annotations
 
+import os
 import sys
-import json
+import argparse
 from pathlib import Path
 
-from core.io import load_result_json
 from core.runs import latest_run_dir
+from core.elite_store import EliteStore, parse_query
 from audio.midi_writer import MidiRenderConfig
-from audio.soundfont_renderer import SoundFontRenderer, SoundFontConfig
+from audio.renderers import RENDER_BACKENDS, make_renderer
+from audio.render_cache import RenderCache
+from audio.batch_render import index_render_jobs, render_jobs, result_render_jobs
 
 
 def main() -> None:
     # użycie:
-    # python -m scripts.render_elites_batch [run_dir_or_base] [sf2] [limit]
+    # python -m scripts.render_elites_batch [run_dir_or_base] [sf2] [limit] [--workers N] [--batch N] [--force]
     #
     # Przykłady:
     # python -m scripts.render_elites_batch results/elites soundfonts/piano.sf2 60
-    # python -m scripts.render_elites_batch results/elites/run3 soundfonts/piano.sf2 80
-
-    arg0 = sys.argv[1] if len(sys.argv) > 1 else "results/elites"
-    sf2_path = sys.argv[2] if len(sys.argv) > 2 else "soundfonts/piano.sf2"
-    limit = int(sys.argv[3]) if len(sys.argv) > 3 else 80
+    # python -m scripts.render_elites_batch results/elites/run3 soundfonts/piano.sf2 80 --workers 8
+    # python -m scripts.render_elites_batch results/elites/run3 soundfonts/piano.sf2 300 --workers 4 --batch 75
+    # python -m scripts.render_elites_batch results/elites/run3 - 300 --backend synth --batch 100
+    # python -m scripts.render_elites_batch - soundfonts/piano.sf2 40 --db results/elites/elites.sqlite --query "max_ambitus=10"
+
+    ap = argparse.ArgumentParser(description="Render top elites of a run to MIDI + WAV.")
+    ap.add_argument("run", nargs="?", default="results/elites")
+    ap.add_argument("sf2", nargs="?", default="soundfonts/piano.sf2")
+    ap.add_argument("limit", nargs="?", type=int, default=80)
+    ap.add_argument("--backend", choices=RENDER_BACKENDS, default="fluidsynth",
+                    help="synth = syntezator numpy w procesie (bez fluidsynth/SF2)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                    help="ile równoległych procesów FluidSynth")
+    ap.add_argument("--cache-dir", default=None,
+                    help="cache WAV/MIDI adresowany treścią (domyślnie <base>/.render_cache)")
+    ap.add_argument("--force", action="store_true", help="renderuj ponownie mimo trafienia w cache")
+    ap.add_argument("--batch", type=int, default=0,
+                    help="ile melodii na jedno wywołanie FluidSynth (0 = każda osobno)")
+    ap.add_argument("--gap", type=float, default=1.0,
+                    help="przerwa między melodiami w trybie --batch [s] (mieści wybrzmienie)")
+    ap.add_argument("--db", default=None,
+                    help="baza elit (SQLite); z --query wybiera elity ze wszystkich runów zamiast index.json")
+    ap.add_argument("--query", default="",
+                    help='filtry, np. "max_ambitus=10,min_score=4.5,n_notes=32"')
+    ap.add_argument("--out", default="results/query_renders",
+                    help="katalog wyjściowy w trybie --db")
+    args = ap.parse_args()
+
+    if args.db:
+        run_dir = Path(args.out)
+        mids_dir = run_dir / "mids"
+        wavs_dir = run_dir / "wavs"
+        with EliteStore(args.db) as store:
+            results = store.query(limit=args.limit, **parse_query(args.query))
+        jobs = result_render_jobs(results, str(mids_dir), str(wavs_dir))
+    else:
+        p = Path(args.run)
 
-    p = Path(arg0)
+        # jeśli user podał base ("results/elites"), bierz najnowszy runN
+        # jeśli podał już run ("results/elites/run7"), użyj go wprost
+        if p.name.lower().startswith("run") and p.is_dir():
+            run_dir = p
+        else:
+            run_dir = latest_run_dir(str(p))
 
-    # jeśli user podał base ("results/elites"), bierz najnowszy runN
-    # jeśli podał już run ("results/elites/run7"), użyj go wprost
-    if p.name.lower().startswith("run") and p.is_dir():
-        run_dir = p
-    else:
-        run_dir = latest_run_dir(str(p))
+        mids_dir = run_dir / "mids"
+        wavs_dir = run_dir / "wavs"
 
-    index_path = run_dir / "index.json"
-    if not index_path.exists():
-        raise FileNotFoundError(f"index.json not found in: {run_dir}")
+        # top-N po score z index.json
+        jobs = index_render_jobs(str(run_dir), args.limit, str(mids_dir), str(wavs_dir))
 
-    mids_dir = run_dir / "mids"
-    wavs_dir = run_dir / "wavs"
     mids_dir.mkdir(parents=True, exist_ok=True)
     wavs_dir.mkdir(parents=True, exist_ok=True)
 
-    renderer = SoundFontRenderer(
-        SoundFontConfig(sf2_path=str(sf2_path), gain=1.0)
-    )
+    renderer = make_renderer(args.backend, sf2_path=args.sf2, gain=1.0)
 
     midi_cfg = MidiRenderConfig(instrument_program=0, velocity=120)
 
-    with open(index_path, "r", encoding="utf-8") as f:
-        items = json.load(f)
-
-    # renderuj top-N po score
-    items = sorted(items, key=lambda x: x["score"], reverse=True)[:limit]
-
-    rendered = 0
-    for it in items:
-        json_file = run_dir / it["file"]
-        res = load_result_json(str(json_file))
-
-        stem = json_file.stem
-        mid_path = mids_dir / f"{stem}.mid"
-        wav_path = wavs_dir / f"{stem}.wav"
-
-        renderer.render_melody_to_wav(
-            res.melody,
-            wav_path=str(wav_path),
-            midi_tmp_path=str(mid_path),  # tu zapisujemy finalny MIDI
-            midi_cfg=midi_cfg,
-            keep_midi=True,
-        )
+    # cache współdzielony przez wszystkie runy w katalogu bazowym
+    cache = RenderCache(args.cache_dir or str(run_dir.parent / ".render_cache"))
+
+    def report(o) -> None:
+        if o.status == "failed":
+            print(f"FAILED {o.name}: {o.error}", file=sys.stderr)
+
+    outcomes = render_jobs(
+        renderer,
+        jobs,
+        midi_cfg=midi_cfg,
+        workers=args.workers,
+        cache=cache,
+        force=args.force,
+        on_done=report,
+        batch_size=args.batch,
+        gap_s=args.gap,
+    )
 
-        rendered += 1
+    counts = {s: sum(1 for o in outcomes if o.status == s) for s in ("rendered", "cached", "failed")}
 
     print("Run:", run_dir)
-    print("Rendered:", rendered)
+    print("Rendered:", counts["rendered"], "| cached:", counts["cached"], "| failed:", counts["failed"])
     print("MIDs ->", mids_dir)
     print("WAVs ->", wavs_dir)
 
+    if counts["failed"]:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,111 @@
+# scripts/rescore_archive.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from dataclasses import asdict, replace
+from pathlib import Path
+
+import numpy as np
+
+from core.runs import latest_run_dir
+from search.map_elites import DescriptorConfig
+from search.feature_store import FeatureTable, new_weights, qd_score, rebin, rescore, select_per_cell
+
+
+def main() -> None:
+    # python -m scripts.rescore_archive results/elites/run7 --weight MotifNGramScorer=1.5 --weight EndNearStartScorer=0
+    # python -m scripts.rescore_archive results/elites --turn-rate-step 0.1 --max-ambitus-bin 16 --top 30
+
+    ap = argparse.ArgumentParser(description="Re-weight scorers / re-bin descriptors of a saved archive (no search).")
+    ap.add_argument("run", nargs="?", default="results/elites")
+    ap.add_argument("--weight", action="append", default=[], metavar="SCORER=W",
+                    help="nowa waga scorera (typ klasy), można powtarzać")
+    ap.add_argument("--max-ambitus-bin", type=int, default=None)
+    ap.add_argument("--turn-rate-step", type=float, default=None)
+    ap.add_argument("--max-turn-rate", type=float, default=None)
+    ap.add_argument("--per-cell", type=int, default=None, help="domyślnie jak w runie")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--out", default=None, help="zapisz nowy ranking (domyślnie <run>/rescored_index.json)")
+    args = ap.parse_args()
+
+    p = Path(args.run)
+    run_dir = p if (p / "index.json").is_file() else latest_run_dir(str(p))
+
+    table = FeatureTable.load(str(run_dir))
+
+    overrides = {}
+    for item in args.weight:
+        name, _, value = item.partition("=")
+        overrides[name.strip()] = float(value)
+
+    changes = {
+        "max_ambitus_bin": args.max_ambitus_bin,
+        "turn_rate_step": args.turn_rate_step,
+        "max_turn_rate": args.max_turn_rate,
+    }
+    changes = {k: v for k, v in changes.items() if v is not None}
+    # archiwum CVT: tylko przeważanie, komórki zostają z runu
+    if table.cvt is not None and changes:
+        ap.error("CVT archive: re-binning is not supported, only --weight / --per-cell")
+    desc = DescriptorConfig(**table.descriptor) if table.descriptor else DescriptorConfig()
+    desc = replace(desc, **changes)
+    per_cell = args.per_cell or table.per_cell
+
+    try:
+        weights = new_weights(table, overrides)
+    except KeyError as ex:
+        ap.error(str(ex))
+
+    t0 = time.perf_counter()
+    scores = rescore(table, weights)
+    keys = table.cells if table.cvt is not None else rebin(table, desc)
+    idx, ranks = select_per_cell(keys, scores, per_cell)
+    ms = (time.perf_counter() - t0) * 1000.0
+
+    n_cells = len({tuple(k) for k in keys[idx].tolist()})
+    print(f"Run: {run_dir} | elites: {table.n} | rescored in {ms:.2f} ms")
+    print(f"Weights: {dict(zip(table.scorer_types, weights.round(4).tolist()))}")
+    print(f"Descriptor: {'CVT (cells from run)' if table.cvt is not None else desc} | per_cell={per_cell}")
+    # próg z runu tylko przy tych samych wagach; po przeważeniu skala score jest inna
+    same_weights = bool(np.array_equal(weights, table.weights))
+    floor = table.qd_floor if same_weights and table.qd_floor is not None else (float(scores.min()) if table.n else 0.0)
+    qd = qd_score(scores[idx], ranks, floor)
+    print(f"Cells: {n_cells} | kept: {len(idx)} | QD score: {qd:.3f} (floor {floor:.3f})")
+
+    out = []
+    for i, r in zip(idx.tolist(), ranks.tolist()):
+        if table.cvt is not None:
+            cell = {"cvt_cell": int(keys[i][0])}
+            stem = f"c{cell['cvt_cell']:04d}"
+        else:
+            a, t, pc = keys[i].tolist()
+            cell = {"ambitus_bin": a, "turn_rate_bin": t, "pc_bin": pc}
+            stem = f"a{a:02d}_t{t:02d}_pc{pc:02d}"
+        out.append({
+            "score": float(scores[i]),
+            "old_score": float(table.scores[i]),
+            **cell,
+            "stem": stem,
+            "cell_rank": r,
+            "file": table.files[i],
+            "melody": {"pitches": table.pitches[i], "unit_duration": table.unit_duration[i]},
+        })
+
+    for it in out[: args.top]:
+        print(f"{it['score']:9.4f} (was {it['old_score']:9.4f})  {it['stem']}_k{it['cell_rank']:02d}  {it['file'] or '-'}")
+
+    out_path = args.out or os.path.join(str(run_dir), "rescored_index.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"weights": dict(zip(table.scorer_types, weights.tolist())),
+                   "descriptor": asdict(desc) if table.cvt is None else None, "cvt": table.cvt,
+                   "qd_score": qd, "qd_floor": floor,
+                   "per_cell": per_cell, "items": out},
+                  f, ensure_ascii=False, indent=2)
+    print("Saved:", out_path)
+
+
+if __name__ == "__main__":
+    main()
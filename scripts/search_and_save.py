@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import os
 import time
-from typing import Optional, Tuple
+import argparse
 
 from core.io import SearchResult, save_result_json
 from evaluation.filters import (
@@ -16,9 +17,34 @@ from evaluation.scorers import (
 )
 from evaluation.evaluator import MelodyEvaluator
 from generation.random_walk import random_walk
+from search.random_search import RandomSearch, RandomSearchConfig, write_top_k
+
+
+def parse_args():
+    # python -m scripts.search_and_save
+    # python -m scripts.search_and_save --tries 2000000 --workers 8 --top-k 50
+    # python -m scripts.search_and_save --seconds 60 --tries 0 --workers 8
+    ap = argparse.ArgumentParser(description="Random-walk search baseline (parallel, top-k).")
+    ap.add_argument("--tries", type=int, default=20000, help="budżet ewaluacji (0 = bez limitu, wtedy --seconds)")
+    ap.add_argument("--seconds", type=float, default=None, help="budżet czasu")
+    ap.add_argument("--n", type=int, default=32)
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    ap.add_argument("--chunk", type=int, default=2000, help="melodii na wsad (jeden wsad = jedno ziarno)")
+    ap.add_argument("--top-k", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=1337)
+    ap.add_argument("--out", default="results/best.json")
+    ap.add_argument("--top-k-out", default="results/random_top_k.json",
+                    help="bieżący top-k, nadpisywany co --snapshot-every sekund")
+    ap.add_argument("--snapshot-every", type=float, default=5.0)
+    args = ap.parse_args()
+    if not args.tries and args.seconds is None:
+        ap.error("no budget: give --tries > 0 and/or --seconds")
+    return args
 
 
 def main() -> None:
+    args = parse_args()
+
     evaluator = MelodyEvaluator(
         filters=[
             MaxStepFilter(max_abs_step=7),
@@ -32,49 +58,51 @@ def main() -> None:
         ],
     )
 
-    best: Optional[Tuple[float, SearchResult]] = None
-    tried = 20000
-    n = 32
-
-    for _ in range(tried):
-        m = random_walk(n=n, start=60).transpose_to_first(0)
-        res = evaluator.evaluate(m)
-        if not res.passed:
-            continue
-
-        sr = SearchResult(
-            melody=m,
-            score=res.score,
-            passed=res.passed,
-            reason=res.reason,
-            score_breakdown=tuple(res.score_breakdown),
-            filter_trace=tuple(res.filter_trace),
-            meta={
-                "tried": tried,
-                "n": n,
-                "timestamp": time.time(),
-            },
-        )
+    cfg = RandomSearchConfig(
+        n_notes=args.n,
+        start=60,
+        top_k=args.top_k,
+        chunk_size=args.chunk,
+        workers=args.workers,
+        seed=args.seed,
+        max_evaluations=args.tries or None,
+        max_seconds=args.seconds,
+    )
+    search = RandomSearch(evaluator, cfg)
+    search.add_progress_listener(lambda s: write_top_k(args.top_k_out, s), every_s=args.snapshot_every)
 
-        if best is None or sr.score > best[0]:
-            best = (sr.score, sr)
+    top = search.run()
+    summary = search.summary()
+    write_top_k(args.top_k_out, search)
+    print(f"Stop: {summary['stop_reason']} | {summary['evaluations']} evaluations "
+          f"({summary['passed']} passed) in {summary['elapsed_s']:.1f}s = {summary['evals_per_s']:.0f} evals/s")
 
-    if best is None:
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    if not top:
         # Zapisz też “porażkę”, żeby pipeline był deterministyczny.
         out = SearchResult(
-            melody=random_walk(n=n, start=60).transpose_to_first(0),
+            melody=random_walk(n=args.n, start=60).transpose_to_first(0),
             score=float("-inf"),
             passed=False,
             reason="No melody passed filters",
-            meta={"tried": tried, "n": n, "timestamp": time.time()},
+            meta={"tried": summary["evaluations"], "n": args.n, "timestamp": time.time()},
         )
-        save_result_json("results/best.json", out)
-        print("No melody passed. Wrote results/best.json anyway.")
+        save_result_json(args.out, out)
+        print(f"No melody passed. Wrote {args.out} anyway.")
         return
 
-    _, sr = best
-    save_result_json("results/best.json", sr)
-    print("Wrote results/best.json")
+    best = top[0]
+    sr = SearchResult(
+        melody=best.melody,
+        score=best.score,
+        passed=True,
+        reason="",
+        score_breakdown=best.score_breakdown,
+        filter_trace=best.filter_trace,
+        meta={**best.meta, "tried": summary["evaluations"], "timestamp": time.time(), "search": summary},
+    )
+    save_result_json(args.out, sr)
+    print(f"Wrote {args.out} (top-{len(top)} -> {args.top_k_out})")
     print("Best score:", sr.score)
     print("Melody:", sr.melody.pitches)
 
@@ -0,0 +1,93 @@
+# scripts/search_counterline.py
+from __future__ import annotations
+
+import os
+import json
+import random
+import argparse
+from dataclasses import replace
+
+from core.io import load_result_json
+from core.runs import next_run_dir
+from evaluation.voice_leading import (
+    CounterLineEvaluator,
+    ParallelPerfectFilter,
+    VoiceCrossingFilter,
+    MaxSpacingFilter,
+    ConsonanceMixScorer,
+    ContraryMotionScorer,
+)
+from search.map_elites import MapElites, default_emitters
+from scripts.search_map_elites import RANDOM_SEED, build_config, build_evaluator, to_dict
+
+
+def main() -> None:
+    # python -m scripts.search_counterline --cantus results/elites/run7/elite_a09_t05_pc07_k00.json
+    # python -m scripts.search_counterline --cantus <elite.json> --above --offset 7 --iterations 40000
+
+    ap = argparse.ArgumentParser(description="MAP-Elites search for a counter-line against a fixed elite.")
+    ap.add_argument("--cantus", required=True, help="plik elite_*.json (głos stały)")
+    ap.add_argument("--above", action="store_true", help="kontrapunkt nad cantus (domyślnie pod)")
+    ap.add_argument("--offset", type=int, default=12, help="odległość pierwszej nuty kontrapunktu od cantus")
+    ap.add_argument("--init-random", type=int, default=3000)
+    ap.add_argument("--iterations", type=int, default=60000)
+    ap.add_argument("--batch", type=int, default=128, help="wsad (prowadzenie głosów liczone wektorowo na wsad)")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    ap.add_argument("--base", default="results/counter")
+    args = ap.parse_args()
+
+    cantus = load_result_json(args.cantus).melody
+    counter_below = not args.above
+    evaluator = CounterLineEvaluator(
+        cantus,
+        build_evaluator(),
+        voice_filters=[ParallelPerfectFilter(max_count=0), VoiceCrossingFilter(max_crossings=0), MaxSpacingFilter()],
+        voice_scorers=[ConsonanceMixScorer(), ContraryMotionScorer()],
+        counter_below=counter_below,
+    )
+    start = cantus.pitches[0] + (-args.offset if counter_below else args.offset)
+    cfg = replace(
+        build_config(),
+        n_notes=cantus.n,
+        start_pitch=start,
+        init_random=args.init_random,
+        iterations=args.iterations,
+        batch_size=args.batch,
+        workers=args.workers,
+        # linie kontrapunktu nie mieszają się z melodiami we wspólnej bazie elit
+        elite_store=None,
+    )
+
+    run_dir = next_run_dir(args.base)
+    random.seed(RANDOM_SEED)
+    run_meta = {
+        "run_dir": str(run_dir),
+        "seed": RANDOM_SEED,
+        "cantus": {"file": args.cantus, "pitches": list(cantus.pitches), "counter_below": counter_below},
+        "map_elites_config": to_dict(cfg),
+        "evaluator": {
+            "filters": [{"type": f.__class__.__name__, "params": to_dict(f)} for f in evaluator.filters],
+            "scorers": [{"type": s.__class__.__name__, "params": to_dict(s)} for s in evaluator.scorers],
+        },
+    }
+
+    # mutowana jest tylko linia kontrapunktu; cantus siedzi w ewaluatorze
+    me = MapElites(evaluator, cfg, emitters=default_emitters())
+    archive = me.run(snapshot_dir=str(run_dir), run_meta=run_meta)
+    run_meta["search"] = me.run_summary()
+    print(f"Stop: {me.stop_reason} after {me.n_evaluations} evaluations ({me.elapsed():.1f}s), "
+          f"{len(archive)} niches")
+
+    index = me.save_archive(str(run_dir), run_meta=run_meta)
+    # pary gotowe do odsłuchu / dalszej obróbki (głos górny + dolny)
+    pairs = []
+    for it in index:
+        counter = load_result_json(os.path.join(str(run_dir), it["file"])).melody
+        pairs.append({"file": it["file"], "score": it["score"], **evaluator.pair(counter).to_dict()})
+    with open(run_dir / "pairs.json", "w", encoding="utf-8") as f:
+        json.dump(pairs, f, ensure_ascii=False, indent=2)
+    print("Saved counter-lines to:", run_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 # scripts/search_map_elites.py
 from __future__ import annotations
 
+import os
 import time
 import random
+import argparse
 import platform
 import sys
 import re
 
 RANDOM_SEED = 1337
+DEFAULT_ELITE_STORE = "results/elites/elites.sqlite"
 
 from evaluation.filters import (
     MaxStepFilter,
@@ -26,11 +29,15 @@ from evaluation.scorers import (
 )
 from evaluation.evaluator import MelodyEvaluator
 
-from search.map_elites import MapElites, MapElitesConfig, MutationConfig, DescriptorConfig
+from search.map_elites import MapElites, MapElitesConfig, MutationConfig, DescriptorConfig, default_emitters
+from search.multi_length import MultiLengthRun, length_configs, length_dir
 
 from core.runs import next_run_dir
+from core.profiling import PhaseProfiler, maybe_phase
 
-from dataclasses import asdict, is_dataclass
+from search.streaming import attach_stable_stream
+
+from dataclasses import asdict, is_dataclass, replace
 
 def to_dict(x):
     if is_dataclass(x):
@@ -44,8 +51,56 @@ def to_dict(x):
         return {k: to_dict(v) for k, v in x.__dict__.items() if not k.startswith("_")}
     return x
 
-def main() -> None:
-    evaluator = MelodyEvaluator(
+def parse_args():
+    # python -m scripts.search_map_elites
+    # python -m scripts.search_map_elites --profile
+    # python -m scripts.search_map_elites --profile --cprofile --profile-every 2000
+    # python -m scripts.search_map_elites --lengths 16,24,32,64
+    # python -m scripts.search_map_elites --elite-store            (-> results/elites/elites.sqlite)
+    ap = argparse.ArgumentParser(description="MAP-Elites melody search.")
+    ap.add_argument("--render-stream", action="store_true",
+                    help="renderuj ustabilizowane top elity w tle podczas wyszukiwania")
+    ap.add_argument("--backend", default="fluidsynth", help="fluidsynth | synth (z --render-stream)")
+    ap.add_argument("--sf2", default="soundfonts/piano.sf2")
+    ap.add_argument("--render-workers", type=int, default=1)
+    ap.add_argument("--render-queue", type=int, default=32,
+                    help="rozmiar kolejki renderowania (pełna kolejka = pomijamy, nie czekamy)")
+    ap.add_argument("--stream-every", type=int, default=5000,
+                    help="co ile ewaluacji sprawdzać, które top elity się ustabilizowały")
+    ap.add_argument("--profile", action="store_true",
+                    help="czasy faz + próbki pamięci (tracemalloc) -> <run>/profile.json")
+    ap.add_argument("--cprofile", action="store_true",
+                    help="pętla główna pod cProfile -> <run>/profile.pstats (włącza --profile)")
+    ap.add_argument("--profile-every", type=int, default=5000,
+                    help="co ile ewaluacji próbka pamięci / rozmiaru archiwum")
+    ap.add_argument("--no-tracemalloc", action="store_true",
+                    help="wyłącz tracemalloc (spowalnia run i zawyża czasy faz)")
+    ap.add_argument("--lengths", default=None,
+                    help="kilka długości w jednym runie, np. 16,24,32,64 (wspólna pula; <run>/n16/, ...)")
+    ap.add_argument("--elite-store", nargs="?", const=DEFAULT_ELITE_STORE, default=None, metavar="SQLITE",
+                    help=f"dopisz run do wspólnej bazy elit (domyślnie {DEFAULT_ELITE_STORE})")
+    args = ap.parse_args()
+    args.profile = args.profile or args.cprofile
+    if args.render_stream:
+        # moduły audio tylko z --render-stream (import kosztuje każdy run)
+        from audio.renderers import RENDER_BACKENDS
+        if args.backend not in RENDER_BACKENDS:
+            ap.error(f"--backend: expected one of {', '.join(RENDER_BACKENDS)}, got {args.backend}")
+    if args.lengths is not None:
+        try:
+            args.lengths = [int(x) for x in args.lengths.split(",") if x.strip()]
+        except ValueError:
+            ap.error(f"--lengths expects comma-separated integers: {args.lengths}")
+        if not args.lengths:
+            ap.error("--lengths is empty")
+        if args.profile:
+            ap.error("--profile is not supported with --lengths (phases of interleaved runs overlap)")
+    return args
+
+
+def build_evaluator() -> MelodyEvaluator:
+    # wspólne z scripts/sweep_map_elites (baza, którą sweep modyfikuje)
+    return MelodyEvaluator(
         filters=[
             MaxStepFilter(max_abs_step=7),
             AmbitusFilter(max_ambitus=14),
@@ -63,7 +118,9 @@ def main() -> None:
         ],
     )
 
-    cfg = MapElitesConfig(
+
+def build_config() -> MapElitesConfig:
+    return MapElitesConfig(
         n_notes=32,
         start_pitch=0,
         init_random=5000,
@@ -81,8 +138,37 @@ def main() -> None:
             turn_rate_step=0.05,
         ),
         max_elites_to_save=20,
+        batch_size=64,
+        workers=max(1, (os.cpu_count() or 2) - 1),
     )
 
+
+def run_multi_length(args, evaluator, cfg: MapElitesConfig, run_dir, run_meta: dict, streamer=None) -> None:
+    runs = MultiLengthRun(evaluator, length_configs(cfg, args.lengths), emitters_factory=default_emitters)
+    if streamer is not None:
+        for me in runs.runs.values():
+            attach_stable_stream(
+                me, streamer.offer, top_k=cfg.max_elites_to_save, every_evaluations=args.stream_every,
+            )
+
+    runs.run(str(run_dir), run_meta=run_meta)
+    for n, me in runs.runs.items():
+        print(f"n={n:>3}: {len(me.archive)} niches, stop: {me.stop_reason} after "
+              f"{me.n_evaluations} evaluations ({me.elapsed():.1f}s)")
+
+    runs.save(str(run_dir), run_meta=run_meta)
+    print("Saved elites to:", ", ".join(str(run_dir / length_dir(n)) for n in runs.runs))
+    print("Combined index:", run_dir / "index.json")
+
+
+def main() -> None:
+    args = parse_args()
+
+    evaluator = build_evaluator()
+    cfg = build_config()
+    if args.elite_store:
+        cfg = replace(cfg, elite_store=args.elite_store)
+
     timestamp_utc = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
     evaluator_meta = {
@@ -108,14 +194,90 @@ def main() -> None:
         "evaluator": evaluator_meta,
     }
 
-    me = MapElites(evaluator, cfg)
-    archive = me.run()
-    print("Archive size (filled niches):", len(archive))
+    streamer = None
+    if args.render_stream:
+        from audio.midi_writer import MidiRenderConfig
+        from audio.renderers import make_renderer
+        from audio.render_cache import RenderCache
+        from audio.stream_render import StreamingRenderer
+        from audio.batch_render import index_render_jobs, render_jobs
+
+        midi_cfg = MidiRenderConfig(instrument_program=0, velocity=120)
+        renderer = make_renderer(args.backend, sf2_path=args.sf2, gain=1.0)
+        # ten sam cache co domyślnie w render_elites_batch
+        cache = RenderCache(str(run_dir.parent / ".render_cache"))
+        streamer = StreamingRenderer(
+            renderer, cache, midi_cfg, workers=args.render_workers, queue_size=args.render_queue,
+        )
+
+    profiler = None
+    if args.lengths:
+        run_multi_length(args, evaluator, cfg, run_dir, run_meta, streamer)
+    else:
+        me = MapElites(evaluator, cfg, emitters=default_emitters())
+
+        if args.profile:
+            profiler = PhaseProfiler(
+                trace_memory=not args.no_tracemalloc,
+                cprofile_phases=("main_loop",) if args.cprofile else (),
+            )
+            me.profiler = profiler
+            me.add_progress_listener(
+                lambda m: profiler.sample(
+                    evaluations=m.n_evaluations,
+                    coverage=len(m.archive),
+                    elites=sum(len(c) for c in m.archive.values()),
+                ),
+                every_evaluations=args.profile_every,
+            )
+            profiler.start()
+
+        if streamer is not None:
+            attach_stable_stream(
+                me, streamer.offer, top_k=cfg.max_elites_to_save, every_evaluations=args.stream_every,
+            )
+
+        # przy przekroczeniu budżetu / Ctrl+C archiwum i tak ląduje w run_dir
+        archive = me.run(snapshot_dir=str(run_dir), run_meta=run_meta)
+        print("Archive size (filled niches):", len(archive))
+
+        run_meta["search"] = me.run_summary()
+        print(f"Stop: {me.stop_reason} after {me.n_evaluations} evaluations ({me.elapsed():.1f}s)")
+        for st in run_meta["search"]["emitters"]:
+            print(f"  {st['emitter']:>15}: inserted {st['inserted']}/{st['proposed']}")
+
+        me.save_archive(str(run_dir), run_meta=run_meta)
+        print("Saved elites to:", run_dir)
+        print("Index:", run_dir / "index.json")
 
-    me.save_archive(str(run_dir), run_meta=run_meta)
-    print("Saved elites to:", run_dir)
-    print("Index:", run_dir / "index.json")
+    if streamer is not None:
+        with maybe_phase(profiler, "render"):
+            # dokończ kolejkę, potem dorenderuj tylko to, czego nie ma jeszcze w cache
+            streamer.close(wait=True)
+            print("Streamed renders:", streamer.stats)
+            jobs = index_render_jobs(
+                str(run_dir), cfg.max_elites_to_save, str(run_dir / "mids"), str(run_dir / "wavs"),
+            )
+            (run_dir / "mids").mkdir(exist_ok=True)
+            (run_dir / "wavs").mkdir(exist_ok=True)
+            outcomes = render_jobs(renderer, jobs, midi_cfg=midi_cfg, workers=args.render_workers, cache=cache)
+            for st in ("rendered", "cached", "failed"):
+                print(f"  final {st}: {sum(1 for o in outcomes if o.status == st)}")
+            for o in outcomes:
+                if o.status == "failed":
+                    print(f"FAILED {o.name}: {o.error}", file=sys.stderr)
 
+    if profiler is not None:
+        profiler.stop()
+        extra = {"run_meta": run_meta, "workers": cfg.workers}
+        if cfg.workers > 1:
+            # czasy "evaluate" = czekanie na pulę; CPU i pamięć procesów roboczych poza profilem
+            extra["note"] = "main process only: evaluation in worker processes is not covered (workers > 1)"
+        path = profiler.save(str(run_dir), extra=extra)
+        print("Profile:", path)
+        for name, st in profiler.phases.items():
+            print(f"  {name:>12}: {st['seconds']:.2f}s in {st['calls']} calls, "
+                  f"peak +{st['peak_growth_mb']:.1f} MB")
 
 
 if __name__ == "__main__":
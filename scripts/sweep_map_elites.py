@@ -0,0 +1,116 @@
+# scripts/sweep_map_elites.py
+from __future__ import annotations
+
+import os
+import json
+import time
+import argparse
+from dataclasses import replace
+
+from core.runs import next_run_dir
+from search.sweep import (
+    METRICS, HalvingConfig, Range, format_table, grid_space, is_weight_path, random_space, successive_halving,
+    summary_rows,
+)
+from scripts.search_map_elites import RANDOM_SEED, build_config, build_evaluator, to_dict
+
+
+def _value(s: str):
+    for cast in (int, float):
+        try:
+            return cast(s)
+        except ValueError:
+            pass
+    return s
+
+
+def _grid_arg(items):
+    # "mutation.motif_prob=0.2,0.35,0.5"
+    out = {}
+    for it in items:
+        path, _, vals = it.partition("=")
+        out[path.strip()] = [_value(v.strip()) for v in vals.split(",") if v.strip()]
+    return out
+
+
+def _random_arg(items):
+    # "scorer.MotifNGramScorer.weight=0.4:1.6"  (zakres)  |  "batch_size=32,64,128"  (wybór)
+    out = {}
+    for it in items:
+        path, _, spec = it.partition("=")
+        if ":" in spec:
+            lo, hi = (_value(x) for x in spec.split(":", 1))
+            out[path.strip()] = Range(float(lo), float(hi), integer=isinstance(lo, int) and isinstance(hi, int))
+        else:
+            out[path.strip()] = [_value(v.strip()) for v in spec.split(",") if v.strip()]
+    return out
+
+
+def main() -> None:
+    # python -m scripts.sweep_map_elites --grid mutation.motif_prob=0.2,0.35,0.5 --grid scorer.MotifNGramScorer.weight=0.4,0.8,1.6
+    # python -m scripts.sweep_map_elites --random scorer.IntervalEntropyScorer.weight=0.5:2 \
+    #     --random descriptor.turn_rate_step=0.05,0.1 --n-random 27 --min-iterations 3000 --eta 3 --rungs 3
+
+    ap = argparse.ArgumentParser(description="Parameter sweep for MAP-Elites with successive halving.")
+    ap.add_argument("--grid", action="append", default=[], metavar="PATH=V1,V2,...")
+    ap.add_argument("--random", action="append", default=[], metavar="PATH=LO:HI|V1,V2,...")
+    ap.add_argument("--n-random", type=int, default=0)
+    ap.add_argument("--min-iterations", type=int, default=2000)
+    ap.add_argument("--init-random", type=int, default=1000, help="losowe próby na start każdej próby")
+    ap.add_argument("--eta", type=int, default=3)
+    ap.add_argument("--rungs", type=int, default=3)
+    ap.add_argument("--metric", choices=METRICS, default=None,
+                    help="domyślnie qd_score; ref_qd_score, jeśli sweep zmienia wagi scorerów")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    ap.add_argument("--base", default="results/sweeps")
+    ap.add_argument("--seed", type=int, default=RANDOM_SEED)
+    args = ap.parse_args()
+
+    configs = []
+    if args.grid:
+        configs += grid_space(_grid_arg(args.grid))
+    if args.random:
+        configs += random_space(_random_arg(args.random), args.n_random or 8, seed=args.seed)
+    if not configs:
+        ap.error("nothing to sweep: give --grid and/or --random")
+    sweeps_weights = any(is_weight_path(p) for c in configs for p in c)
+    if args.metric is None:
+        args.metric = "ref_qd_score" if sweeps_weights else "qd_score"
+    elif args.metric == "qd_score" and sweeps_weights:
+        ap.error("--metric qd_score is not comparable across scorer weights; use ref_qd_score or coverage")
+
+    evaluator = build_evaluator()
+    # sweep nie zapisuje do wspólnej bazy elit (to nie są runy produkcyjne)
+    cfg = build_config()
+    cfg = replace(cfg, init_random=args.init_random, elite_store=None)
+
+    sweep_dir = next_run_dir(args.base)
+    hcfg = HalvingConfig(
+        min_iterations=args.min_iterations,
+        eta=args.eta,
+        max_rungs=args.rungs,
+        metric=args.metric,
+        workers=args.workers,
+        seed=args.seed,
+    )
+    print(f"Sweep: {len(configs)} configs -> {sweep_dir}")
+
+    run_meta = {
+        "created_utc": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "seed": args.seed,
+        "map_elites_config": to_dict(cfg),
+        "sweep_dir": str(sweep_dir),
+    }
+    trials = successive_halving(evaluator, cfg, configs, str(sweep_dir), hcfg, run_meta=run_meta)
+
+    rows = summary_rows(trials)
+    print()
+    print(format_table(rows))
+
+    with open(sweep_dir / "summary.json", "w", encoding="utf-8") as f:
+        json.dump({"halving": to_dict(hcfg), "trials": rows}, f, ensure_ascii=False, indent=2)
+    print("\nSummary:", sweep_dir / "summary.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# search/cvt.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.keys import KEY_FEATURES, key_fit_batch
+from core.stats import MelodyStats, STAT_FEATURES, stats_features
+
+# CVT-MAP-Elites: zamiast siatki (iloczyn liczby koszy po każdym wymiarze)
+# przestrzeń cech dzielimy na K komórek Voronoi wokół centroidów policzonych
+# raz (k-means na próbkach z hiperkostki) i trzymanych w cache na dysku.
+
+# (nazwa cechy z core.stats.STAT_FEATURES, min, max) -> normalizacja do [0, 1]
+DEFAULT_CVT_FEATURES: Tuple[Tuple[str, float, float], ...] = (
+    ("ambitus", 0.0, 24.0),
+    ("turn_rate", 0.0, 1.0),
+    ("pc_used", 1.0, 12.0),
+    ("interval_entropy", 0.0, 4.0),
+    ("climax_position", 0.0, 1.0),
+    ("small_ratio", 0.0, 1.0),
+)
+
+
+@dataclass(frozen=True)
+class CVTConfig:
+    features: Tuple[Tuple[str, float, float], ...] = DEFAULT_CVT_FEATURES
+    n_centroids: int = 1024
+    # próbki z hiperkostki do k-means (offline, raz na konfigurację)
+    n_samples: int = 100000
+    kmeans_iters: int = 25
+    seed: int = 0
+    cache_dir: str = "results/cvt_cache"
+    # ilu najbliższych centroidów traktujemy jako "sąsiadów" komórki
+    n_neighbours: int = 6
+
+    def __post_init__(self) -> None:
+        for name, lo, hi in self.features:
+            if name not in STAT_FEATURES:
+                raise ValueError(f"Unknown stats feature: {name}")
+            if hi <= lo:
+                raise ValueError(f"Empty range for feature {name}: [{lo}, {hi}]")
+
+    def cache_key(self) -> str:
+        # cache_dir i n_neighbours nie wpływają na centroidy
+        d = asdict(self)
+        d.pop("cache_dir")
+        d.pop("n_neighbours")
+        blob = json.dumps(d, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(blob).hexdigest()[:16]
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray, c_sq: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    # argmin ||x - c||^2 = argmin (||c||^2 - 2 x·c), kawałkami żeby nie alokować (N x K) naraz
+    out = np.empty(len(points), dtype=np.int64)
+    for i in range(0, len(points), chunk):
+        block = points[i:i + chunk]
+        out[i:i + chunk] = np.argmin(c_sq[None, :] - 2.0 * block @ centroids.T, axis=1)
+    return out
+
+
+def compute_centroids(cfg: CVTConfig) -> np.ndarray:
+    rng = np.random.default_rng(cfg.seed)
+    d = len(cfg.features)
+    samples = rng.random((cfg.n_samples, d))
+    centroids = samples[rng.choice(cfg.n_samples, size=cfg.n_centroids, replace=False)].copy()
+
+    for _ in range(cfg.kmeans_iters):
+        labels = _nearest(samples, centroids, (centroids ** 2).sum(axis=1))
+        counts = np.bincount(labels, minlength=cfg.n_centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, samples)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+
+    return centroids
+
+
+def load_or_compute_centroids(cfg: CVTConfig) -> np.ndarray:
+    path = os.path.join(cfg.cache_dir, f"cvt_{cfg.cache_key()}.npy")
+    if os.path.isfile(path):
+        return np.load(path)
+    centroids = compute_centroids(cfg)
+    os.makedirs(cfg.cache_dir, exist_ok=True)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, centroids)
+    os.replace(tmp, path)  # kilka procesów naraz nie zostawi połówki pliku
+    return centroids
+
+
+class CVTDescriptor:
+    """
+    Deskryptor CVT: klucz niszy to (indeks najbliższego centroidu,).
+    Ten sam interfejs co GridDescriptor w search.map_elites.
+    """
+
+    def __init__(self, cfg: CVTConfig, centroids: Optional[np.ndarray] = None):
+        self.cfg = cfg
+        self.names = tuple(name for name, _, _ in cfg.features)
+        self._lo = np.array([lo for _, lo, _ in cfg.features], dtype=np.float64)
+        self._span = np.array([hi - lo for _, lo, hi in cfg.features], dtype=np.float64)
+        self.centroids = load_or_compute_centroids(cfg) if centroids is None else centroids
+        self._c_sq = (self.centroids ** 2).sum(axis=1)
+        self._neighbours: Optional[Dict[int, Tuple[int, ...]]] = None
+        # cechy tonacji liczone wsadowo (jedno mnożenie macierzy), reszta per melodia
+        self._key_cols = [i for i, n in enumerate(self.names) if n in KEY_FEATURES]
+        self._plain_cols = [i for i, n in enumerate(self.names) if n not in KEY_FEATURES]
+        self._plain_names = tuple(self.names[i] for i in self._plain_cols)
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.centroids)
+
+    def normalize(self, feats: np.ndarray) -> np.ndarray:
+        return np.clip((feats - self._lo) / self._span, 0.0, 1.0)
+
+    def key(self, stats: MelodyStats) -> Tuple[int, ...]:
+        return self.keys([stats])[0]
+
+    def keys(self, stats_list: List[MelodyStats]) -> List[Tuple[int, ...]]:
+        if not stats_list:
+            return []
+        idx = _nearest(self.normalize(self.features(stats_list)), self.centroids, self._c_sq)
+        return [(int(i),) for i in idx]
+
+    def features(self, stats_list: List[MelodyStats]) -> np.ndarray:
+        if not self._key_cols:
+            return np.array([stats_features(s, self.names) for s in stats_list], dtype=np.float64)
+        feats = np.empty((len(stats_list), len(self.names)), dtype=np.float64)
+        if self._plain_cols:
+            feats[:, self._plain_cols] = [stats_features(s, self._plain_names) for s in stats_list]
+        _, strength, ambiguity = key_fit_batch([s.pitch_class_hist for s in stats_list])
+        for i in self._key_cols:
+            feats[:, i] = strength if self.names[i] == "key_strength" else ambiguity
+        return feats
+
+    def neighbours(self, key: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+        if self._neighbours is None:
+            k = min(self.cfg.n_neighbours, self.n_cells - 1)
+            d2 = self._c_sq[:, None] + self._c_sq[None, :] - 2.0 * self.centroids @ self.centroids.T
+            np.fill_diagonal(d2, np.inf)
+            nn = np.argsort(d2, axis=1)[:, :k]
+            self._neighbours = {i: tuple(int(j) for j in row) for i, row in enumerate(nn)}
+        return tuple((j,) for j in self._neighbours[key[0]])
+
+    def key_meta(self, key: Tuple[int, ...]) -> dict:
+        c = self.centroids[key[0]] * self._span + self._lo
+        return {
+            "cvt_cell": key[0],
+            "centroid": {name: float(v) for name, v in zip(self.names, c)},
+        }
+
+    def key_stem(self, key: Tuple[int, ...]) -> str:
+        return f"c{key[0]:04d}"
+
+    def __getstate__(self) -> dict:
+        # sąsiedzi to cache (K x K), nie wysyłamy ich do procesów roboczych
+        st = dict(self.__dict__)
+        st["_neighbours"] = None
+        return st
@@ -0,0 +1,121 @@
+# search/feature_store.py
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from search.map_elites import FEATURES_FILE, DescriptorConfig
+
+# Przeważanie i przekoszykowanie zapisanego archiwum bez ponownego
+# wyszukiwania: wszystko na kolumnach z features.json (jedno mnożenie macierzy
+# + jedno sortowanie), zamiast pełnego runu.
+
+
+@dataclass
+class FeatureTable:
+    scorer_types: List[str]
+    weights: np.ndarray        # (S,)
+    raw: np.ndarray            # (N, S) wartości scorerów bez wagi
+    feature_names: List[str]
+    features: np.ndarray       # (N, F)
+    scores: np.ndarray         # (N,) score z runu
+    pitches: List[List[int]]
+    unit_duration: List[float]
+    files: List[Optional[str]]
+    descriptor: Optional[dict]
+    per_cell: int
+    cells: np.ndarray          # (N, D) klucze nisz z runu
+    cvt: Optional[dict] = None  # archiwum CVT: komórki Voronoi, bez przekoszykowania
+    qd_floor: Optional[float] = None  # próg QD-score z runu (None: features.json sprzed progu)
+
+    @property
+    def n(self) -> int:
+        return len(self.pitches)
+
+    def feature(self, name: str) -> np.ndarray:
+        if name not in self.feature_names:
+            raise KeyError(f"Unknown feature: {name} (known: {', '.join(self.feature_names)})")
+        return self.features[:, self.feature_names.index(name)]
+
+    @staticmethod
+    def load(run_dir: str) -> "FeatureTable":
+        path = run_dir if run_dir.endswith(".json") else os.path.join(run_dir, FEATURES_FILE)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"{FEATURES_FILE} not found: {path} (run saved before feature columns?)")
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        n_s = len(d["scorers"])
+        n_f = len(d["feature_names"])
+        return FeatureTable(
+            scorer_types=[s["type"] for s in d["scorers"]],
+            weights=np.asarray([s["weight"] for s in d["scorers"]], dtype=np.float64),
+            raw=np.asarray(d["scorer_raw"], dtype=np.float64).reshape(-1, n_s),
+            feature_names=list(d["feature_names"]),
+            features=np.asarray(d["features"], dtype=np.float64).reshape(-1, n_f),
+            scores=np.asarray(d["score"], dtype=np.float64),
+            pitches=d["pitches"],
+            unit_duration=d["unit_duration"],
+            files=d["file"],
+            descriptor=d.get("descriptor"),
+            per_cell=int(d.get("per_cell", 1)),
+            cells=np.asarray(d["cell"], dtype=np.int64).reshape(len(d["cell"]), -1),
+            cvt=d.get("cvt"),
+            qd_floor=d.get("qd_floor"),
+        )
+
+
+def new_weights(table: FeatureTable, overrides: Dict[str, float]) -> np.ndarray:
+    """overrides: typ scorera -> nowa waga (wszystkie scorery danego typu)."""
+    w = table.weights.copy()
+    for name, value in overrides.items():
+        hits = [i for i, t in enumerate(table.scorer_types) if t == name]
+        if not hits:
+            raise KeyError(f"Unknown scorer: {name} (known: {', '.join(table.scorer_types)})")
+        w[hits] = value
+    return w
+
+
+def rescore(table: FeatureTable, weights: np.ndarray) -> np.ndarray:
+    return table.raw @ weights
+
+
+def rebin(table: FeatureTable, cfg: DescriptorConfig) -> np.ndarray:
+    """Wektorowy odpowiednik descriptor_from_stats: (N, 3) = (ambitus, turn-rate bin, liczba klas)."""
+    if table.cvt is not None:
+        raise ValueError("CVT archive: cells cannot be re-binned onto the grid descriptor (use table.cells)")
+    a = np.minimum(table.feature("ambitus"), cfg.max_ambitus_bin)
+    tr = np.clip(table.feature("turn_rate"), 0.0, cfg.max_turn_rate)
+    t = np.floor(tr / cfg.turn_rate_step + 1e-9)
+    pc = table.feature("pc_used")
+    return np.stack([a, t, pc], axis=1).astype(np.int64)
+
+
+def qd_score(scores: np.ndarray, ranks: np.ndarray, floor: float) -> float:
+    """Jak MapElites.qd_score: suma max(0, najlepszy w niszy - floor); ranks z select_per_cell."""
+    best = scores[ranks == 0]
+    return float(np.maximum(0.0, best - floor).sum())
+
+
+def select_per_cell(keys: np.ndarray, scores: np.ndarray, per_cell: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-`per_cell` w każdej niszy. Zwraca (indeksy posortowane malejąco po
+    score, ranga w niszy).
+    """
+    if len(scores) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # sortuj po kluczu niszy, w niszy malejąco po score
+    order = np.lexsort((-scores,) + tuple(keys[:, j] for j in reversed(range(keys.shape[1]))))
+    k = keys[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = np.any(k[1:] != k[:-1], axis=1)
+    starts = np.flatnonzero(first)
+    rank = np.arange(len(order)) - starts[np.cumsum(first) - 1]
+
+    keep = rank < per_cell
+    idx, rank = order[keep], rank[keep]
+    by_score = np.argsort(-scores[idx], kind="stable")
+    return idx[by_score], rank[by_score]
@@ -3,13 +3,27 @@ from __future__ import annotations
 
 import os
 import json
+import math
 import random
-from dataclasses import dataclass
-from typing import Dict, Tuple, Optional, List, Iterable
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, is_dataclass
+from typing import Callable, Dict, Tuple, Optional, List, Iterable, Iterator, NamedTuple, TYPE_CHECKING
 
 from core.melody import Melody
-from core.stats import MelodyStats
-from core.io import SearchResult, save_result_json
+from core.stats import MelodyStats, STAT_FEATURES, stats_features
+from core.ngrams import jaccard, ngram_set
+from core.io import (
+    SearchResult, save_result_json, load_result_json, CandidateLogWriter, is_candidate_log, iter_candidate_melodies,
+)
+from core.elite_store import EliteStore
+from core.profiling import PhaseProfiler, maybe_phase
+from search.minhash import MinHashLSH, LSH_INDEX_FILE
+from search.pareto import insert_into_front, may_enter_front
+
+if TYPE_CHECKING:
+    from search.cvt import CVTConfig
+    from search.surrogate import SurrogateConfig
 
 
 # ---------- pomocnicze: pitches <-> intervals ----------
@@ -82,10 +96,9 @@ def mutate_intervals(intervals: List[int], cfg: MutationConfig) -> List[int]:
 
     return out
 
-def interval_ngrams(intervals: List[int], n: int = 4) -> set[tuple[int, ...]]:
-    if len(intervals) < n:
-        return set()
-    return {tuple(intervals[i:i+n]) for i in range(len(intervals) - n + 1)}
+def interval_ngrams(intervals: List[int], n: int = 4) -> set[int]:
+    # kody okien (core.ngrams) zamiast krotek; równość kodów == równość n-gramów
+    return ngram_set(intervals, n)
 
 def novelty_against(elite: Elite, others: List[Elite], ngram_n: int = 4) -> float:
     ints = pitches_to_intervals(elite.melody.pitches)
@@ -95,12 +108,7 @@ def novelty_against(elite: Elite, others: List[Elite], ngram_n: int = 4) -> floa
     best = 0.0
     for o in others:
         B = interval_ngrams(pitches_to_intervals(o.melody.pitches), n=ngram_n)
-        if not B:
-            continue
-        inter = len(A & B)
-        union = len(A | B)
-        sim = inter / union if union else 0.0  # Jaccard similarity
-        best = max(best, sim)
+        best = max(best, jaccard(A, B))  # Jaccard similarity
     return 1.0 - best  # 1 = bardzo inne, 0 = bardzo podobne
 
 # ---------- opis niszy (descriptor) ----------
@@ -129,6 +137,34 @@ def descriptor_from_stats(stats: MelodyStats, cfg: DescriptorConfig) -> Tuple[in
     return (a, tbin, pcbin)
 
 
+class GridDescriptor:
+    """Siatka (ambitus, turn-rate bin, liczba klas wysokości) - opakowanie descriptor_from_stats."""
+
+    def __init__(self, cfg: DescriptorConfig):
+        self.cfg = cfg
+
+    def key(self, stats: MelodyStats) -> Tuple[int, ...]:
+        return descriptor_from_stats(stats, self.cfg)
+
+    def keys(self, stats_list: List[MelodyStats]) -> List[Tuple[int, ...]]:
+        return [descriptor_from_stats(s, self.cfg) for s in stats_list]
+
+    def neighbours(self, key: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+        out = []
+        for dim in range(len(key)):
+            for step in (-1, 1):
+                out.append(key[:dim] + (key[dim] + step,) + key[dim + 1:])
+        return tuple(out)
+
+    def key_meta(self, key: Tuple[int, ...]) -> dict:
+        a, t, pc = key
+        return {"ambitus_bin": a, "turn_rate_bin": t, "pc_bin": pc}
+
+    def key_stem(self, key: Tuple[int, ...]) -> str:
+        a, t, pc = key
+        return f"a{a:02d}_t{t:02d}_pc{pc:02d}"
+
+
 # ---------- MAP-Elites ----------
 
 @dataclass
@@ -147,8 +183,135 @@ class MapElitesConfig:
     # ile elit max zapisujemy (limit plików)
     max_elites_to_save: int = 300
 
+    # ile kandydatów na generację (1 = klasyczna pętla, jeden kandydat na krok)
+    batch_size: int = 1
+    # ile procesów do ewaluacji (1 = w tym samym procesie)
+    workers: int = 1
+
+    # budżety (None = bez limitu), liczone łącznie dla inicjalizacji i pętli
+    max_seconds: Optional[float] = None
+    max_evaluations: Optional[int] = None
+    # wczesne zatrzymanie: co `stagnation_window` ewaluacji pętli porównaj przyrost
+    # liczby nisz i QD-score (względnie) z poprzednim oknem; 0 = wyłączone
+    stagnation_window: int = 0
+    stagnation_min_coverage_gain: float = 0.002
+    stagnation_min_qd_gain: float = 0.002
+    # QD-score = suma max(0, score - floor) po niszach, więc nowa nisza nigdy go nie
+    # obniża (score bywają ujemne); None = najniższy score w archiwum przy pierwszym
+    # liczeniu, potem stały. Do porównań między runami ustaw wspólną wartość.
+    qd_score_floor: Optional[float] = None
+    # co ile sekund zapisywać migawkę archiwum podczas runu (jeśli podano snapshot_dir)
+    snapshot_every_s: Optional[float] = None
+
+    # warm start: katalogi runów (runN albo baza z wieloma runN) / pliki elite_*.json
+    # / features.json (całe archiwum runu) / binarne logi (np. korpus MIDI, generation.corpus);
+    # elity są re-ewaluowane bieżącym ewaluatorem i deskryptorem
+    warm_start: Tuple[str, ...] = ()
+    # ile losowych prób na start, jeśli warm start coś wstawił (None = init_random bez zmian)
+    warm_start_init_random: Optional[int] = 0
+
+    # tryb CVT-MAP-Elites: jeśli ustawione, zastępuje siatkę z `descriptor`
+    cvt: Optional["CVTConfig"] = None
+
+    # surogat (search.surrogate): pełna ewaluacja tylko dla dzieci, które wg modelu
+    # mają szansę wejść do archiwum; None = ewaluuj wszystko
+    surrogate: Optional["SurrogateConfig"] = None
+
+    # globalna deduplikacja (MinHash/LSH po 4-gramach interwałów):
+    # odrzuć kandydata, jeśli szacowany Jaccard z jakąkolwiek elitą >= próg; None = wyłączone
+    global_dedup_threshold: Optional[float] = None
+    lsh_num_perm: int = 32
+    lsh_bands: int = 8
+    # indeksy (pliki lsh_index.json albo katalogi runów) z poprzednich runów do deduplikacji
+    dedup_index_paths: Tuple[str, ...] = ()
+
+    # wspólna baza elit (SQLite, core.elite_store); save_archive dopisuje do niej run
+    elite_store: Optional[str] = None
+    # warianty symetrii ocenianie razem z kandydatem ("I", "R", "RI"); wspólne
+    # filtry/scorery liczone raz, warianty też trafiają do archiwum
+    symmetry_variants: Tuple[str, ...] = ()
+
+    # binarny log wszystkich ewaluowanych kandydatów (core.io, dopisywany); None = wyłączony
+    candidate_log: Optional[str] = None
+
+    # tryb wielokryterialny (search.pareto): nisza trzyma front Pareto po wartościach
+    # scorerów, najwyżej tylu elit (przycinanie crowding distance); None = top-3 po sumie
+    pareto_front_size: Optional[int] = None
+
+
+# kolumny cech całego archiwum (wartości per-scorer + statystyki) -> search.feature_store
+FEATURES_FILE = "features.json"
+FEATURE_COLUMNS: Tuple[str, ...] = tuple(STAT_FEATURES)
+
+
+EliteKey = Tuple[int, ...]  # siatka: (a, t, pc); CVT: (indeks centroidu,)
+
+
+def _elite_files(path: str) -> List[str]:
+    if os.path.isfile(path):
+        return [path]
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Warm start path not found: {path}")
+
+    index_path = os.path.join(path, "index.json")
+    if os.path.isfile(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            return [os.path.join(path, it["file"]) for it in json.load(f)]
+
+    names = sorted(os.listdir(path))
+    files = [os.path.join(path, n) for n in names if n.startswith("elite_") and n.endswith(".json")]
+    if files:
+        return files
+
+    # katalog bazowy (np. results/elites) -> wszystkie runN w środku
+    out: List[str] = []
+    for n in names:
+        sub = os.path.join(path, n)
+        if os.path.isdir(sub) and n.lower().startswith("run"):
+            out.extend(_elite_files(sub))
+    return out
+
 
-EliteKey = Tuple[int, int, int]
+def _warm_start_source(path: str) -> Iterable[Melody]:
+    # binarny log (core.io): log kandydatów albo korpus z generation.corpus
+    if os.path.isfile(path) and not path.endswith(".json") and is_candidate_log(path):
+        yield from iter_candidate_melodies(path)
+        return
+    # features.json = całe archiwum runu (także elity niezapisane jako pliki)
+    if os.path.basename(path) == FEATURES_FILE:
+        with open(path, "r", encoding="utf-8") as f:
+            cols = json.load(f)
+        for pitches, unit in zip(cols["pitches"], cols["unit_duration"]):
+            yield Melody(tuple(pitches), float(unit))
+        return
+    for fpath in _elite_files(path):
+        yield load_result_json(fpath).melody
+
+
+def load_warm_start_melodies(paths: Iterable[str], n_notes: int, start_pitch: int = 0) -> List[Melody]:
+    """
+    Melodie z zapisanych elit, przeniesione na start_pitch (jak w mutacjach),
+    bez duplikatów i tylko o długości n_notes.
+    """
+    seen = set()
+    out: List[Melody] = []
+    for path in paths:
+        for m in _warm_start_source(path):
+            if m.n != n_notes:
+                continue
+            ints = tuple(pitches_to_intervals(m.pitches))
+            if ints in seen:
+                continue
+            seen.add(ints)
+            out.append(Melody(intervals_to_pitches(start_pitch, list(ints)), m.unit_duration))
+    return out
+
+
+def make_descriptor(cfg: MapElitesConfig):
+    if cfg.cvt is not None:
+        from search.cvt import CVTDescriptor  # numpy potrzebny tylko w trybie CVT
+        return CVTDescriptor(cfg.cvt)
+    return GridDescriptor(cfg.descriptor)
 
 
 @dataclass
@@ -156,14 +319,395 @@ class Elite:
     melody: Melody
     score: float
     key: EliteKey
+    # wartości poszczególnych scorerów (cele trybu Pareto)
+    objectives: Tuple[float, ...] = ()
+    # te same wartości bez wagi (features.json -> przeważanie bez ponownej oceny)
+    raw: Tuple[float, ...] = ()
+    # cechy FEATURE_COLUMNS, liczone przy wstawieniu do archiwum
+    features: Tuple[float, ...] = ()
+
+
+# ---------- ewaluacja (także w procesach roboczych) ----------
+
+def evaluate_elite(
+    evaluator,
+    melody: Melody,
+    descriptor,
+    require_passed: bool = True,
+) -> Optional[Elite]:
+    return evaluate_elites(evaluator, [melody], descriptor, require_passed)[0]
+
+
+class _Passed(NamedTuple):
+    # ocenione, które przeszły; index -1 = wariant symetrii (dopisywany na końcu)
+    index: int
+    melody: Melody
+    score: float
+    stats: MelodyStats
+    objectives: Tuple[float, ...]
+    raw: Tuple[float, ...]
+
+
+def evaluate_elites(
+    evaluator,
+    melodies: List[Melody],
+    descriptor,
+    require_passed: bool = True,
+    symmetry: Tuple[str, ...] = (),
+) -> List[Optional[Elite]]:
+    """
+    Pierwsze len(melodies) pozycji odpowiada melodiom. Z `symmetry` (i ewaluatorem
+    z evaluate_symmetry_class) na końcu dochodzą elity wariantów symetrii.
+    """
+    out: List[Optional[Elite]] = [None] * len(melodies)
+    passed: List[_Passed] = []
+    use_symmetry = bool(symmetry) and hasattr(evaluator, "evaluate_symmetry_class")
+    # ewaluator wsadowy (np. CounterLineEvaluator: prowadzenie głosów wektorowo dla całego wsadu)
+    batch = evaluator.evaluate_many(melodies) if not use_symmetry and hasattr(evaluator, "evaluate_many") else None
+    for i, melody in enumerate(melodies):
+        if use_symmetry:
+            members = evaluator.evaluate_symmetry_class(melody, symmetry)
+        else:
+            res = batch[i] if batch is not None else evaluator.evaluate(melody)
+            # stats do descriptor
+            stats = res.stats if getattr(res, "stats", None) is not None else None
+            members = [(res, stats)]
+        for j, (res, stats) in enumerate(members):
+            if require_passed and not res.passed:
+                continue
+            if stats is None:
+                stats = MelodyStats.compute(res.melody)
+            bd = res.score_breakdown
+            objectives = tuple(float(b["value"]) for b in bd)
+            raw = tuple(float(b["raw"]) for b in bd) if all("raw" in b for b in bd) else ()
+            passed.append(_Passed(i if j == 0 else -1, res.melody, float(res.score), stats, objectives, raw))
+
+    # klucze nisz liczone wsadowo (CVT: jedno wektorowe wyszukanie centroidów)
+    keys = descriptor.keys([p.stats for p in passed])
+    for p, key in zip(passed, keys):
+        elite = Elite(melody=p.melody, score=p.score, key=key, objectives=p.objectives, raw=p.raw)
+        if p.index >= 0:
+            out[p.index] = elite
+        else:
+            out.append(elite)
+    return out
+
+
+# stan procesu roboczego: ustawiany raz przez initializer, żeby nie picklować
+# ewaluatora przy każdym wsadzie
+_WORKER: dict = {}
+
+
+def _worker_init(evaluator, descriptor, require_passed: bool, symmetry: Tuple[str, ...] = ()) -> None:
+    _WORKER["evaluator"] = evaluator
+    _WORKER["descriptor"] = descriptor
+    _WORKER["require_passed"] = require_passed
+    _WORKER["symmetry"] = symmetry
+
+
+def _worker_evaluate(melodies: List[Melody]) -> List[Optional[Elite]]:
+    return evaluate_elites(
+        _WORKER["evaluator"], melodies, _WORKER["descriptor"], _WORKER["require_passed"], _WORKER["symmetry"],
+    )
+
+
+def make_eval_pool(evaluator, cfg: MapElitesConfig, descriptor=None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=cfg.workers,
+        initializer=_worker_init,
+        initargs=(evaluator, descriptor or make_descriptor(cfg), cfg.require_passed, cfg.symmetry_variants),
+    )
+
+
+def _chunks(items: List, n_chunks: int) -> List[List]:
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size = math.ceil(len(items) / n_chunks)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ---------- emitery (źródła kandydatów) ----------
+
+@dataclass
+class InsertFeedback:
+    elite: Optional[Elite]  # None = nie przeszło filtrów
+    inserted: bool
+    new_cell: bool
+    # score - najlepszy w niszy przed wstawieniem (0.0 jeśli nisza była pusta / brak wstawienia)
+    improvement: float = 0.0
+
+
+class Emitter:
+    """
+    Źródło kandydatów dla MAP-Elites.
+    ask() proponuje n melodii, tell() dostaje informację zwrotną z archiwum
+    (w tej samej kolejności co propozycje) i aktualizuje stan emitera.
+    """
+    name: str = "Emitter"
+
+    def ask(self, me: "MapElites", n: int) -> List[Melody]:
+        raise NotImplementedError
+
+    def tell(self, me: "MapElites", candidates: List[Melody], feedback: List[InsertFeedback]) -> None:
+        pass
+
+
+class UniformEmitter(Emitter):
+    """Klasyczne MAP-Elites: losowy rodzic z losowej niszy + mutate_intervals."""
+    name = "uniform"
+
+    def ask(self, me: "MapElites", n: int) -> List[Melody]:
+        out = []
+        for _ in range(n):
+            parent = me._pick_parent()
+            out.append(me._random_candidate() if parent is None else me.mutate(parent.melody))
+        return out
+
+
+class RandomRestartEmitter(Emitter):
+    """
+    Losowy kierunek: trzyma "kotwicę" i mutuje wokół niej; udane dziecko staje się
+    nową kotwicą. Po `patience` generacjach bez wstawienia restart z losowej elity
+    (albo, z prawdopodobieństwem fresh_prob, z całkiem losowego kandydata).
+    """
+    name = "random_restart"
+
+    def __init__(self, patience: int = 3, fresh_prob: float = 0.2):
+        self.patience = patience
+        self.fresh_prob = fresh_prob
+        self._anchor: Optional[Melody] = None
+        self._stale = 0
+        self.restarts = 0
+
+    def _restart(self, me: "MapElites") -> None:
+        parent = me._pick_parent()
+        if parent is None or random.random() < self.fresh_prob:
+            self._anchor = me._random_candidate()
+        else:
+            self._anchor = parent.melody
+        self._stale = 0
+        self.restarts += 1
+
+    def ask(self, me: "MapElites", n: int) -> List[Melody]:
+        if self._anchor is None:
+            self._restart(me)
+        return [me.mutate(self._anchor) for _ in range(n)]
+
+    def tell(self, me: "MapElites", candidates: List[Melody], feedback: List[InsertFeedback]) -> None:
+        best: Optional[InsertFeedback] = None
+        for fb in feedback:
+            if fb.inserted and (best is None or fb.elite.score > best.elite.score):
+                best = fb
+        if best is not None:
+            self._anchor = best.elite.melody
+            self._stale = 0
+            return
+        self._stale += 1
+        if self._stale >= self.patience:
+            self._restart(me)
+
+
+class ImprovementEmitter(Emitter):
+    """
+    Nastawiony na poprawę: rodziców wybiera z nisz, które ostatnio się poprawiały
+    (waga ~ EMA poprawy), z domieszką losowych nisz (explore_prob).
+    Z wybranej niszy bierze najlepszą elitę.
+    """
+    name = "improvement"
+
+    def __init__(self, decay: float = 0.9, explore_prob: float = 0.25, max_tracked: int = 256):
+        self.decay = decay
+        self.explore_prob = explore_prob
+        self.max_tracked = max_tracked
+        self._gain: Dict[EliteKey, float] = {}
+
+    def ask(self, me: "MapElites", n: int) -> List[Melody]:
+        keys = [k for k in self._gain if k in me.archive]
+        weights = [self._gain[k] for k in keys]
+        out = []
+        for _ in range(n):
+            if not keys or random.random() < self.explore_prob:
+                parent = me._pick_parent()
+            else:
+                k = random.choices(keys, weights=weights)[0]
+                parent = me.archive[k][0]
+            out.append(me._random_candidate() if parent is None else me.mutate(parent.melody))
+        return out
+
+    def tell(self, me: "MapElites", candidates: List[Melody], feedback: List[InsertFeedback]) -> None:
+        for k in self._gain:
+            self._gain[k] *= self.decay
+        for fb in feedback:
+            if not fb.inserted:
+                continue
+            # nowa nisza liczy się jak poprawa o 1.0
+            gain = 1.0 if fb.new_cell else max(0.0, fb.improvement)
+            self._gain[fb.elite.key] = self._gain.get(fb.elite.key, 0.0) + gain + 1e-3
+        if len(self._gain) > self.max_tracked:
+            top = sorted(self._gain.items(), key=lambda kv: kv[1], reverse=True)[: self.max_tracked]
+            self._gain = dict(top)
+
+
+class NoveltyEmitter(Emitter):
+    """
+    Nastawiony na nowe nisze: rodziców bierze z "granicy" archiwum (nisze, które
+    mają pustego sąsiada w przestrzeni deskryptora) i mutuje mocniej (kilka rund mutacji).
+    """
+    name = "novelty"
+
+    def __init__(self, mutation_rounds: int = 2, refresh_every: int = 4):
+        self.mutation_rounds = mutation_rounds
+        self.refresh_every = refresh_every
+        self._frontier: List[EliteKey] = []
+        self._since_refresh = 0
+        self.new_cells = 0
+
+    def _refresh(self, me: "MapElites") -> None:
+        self._frontier = [
+            key for key in me.archive
+            if any(nb not in me.archive for nb in me.descriptor.neighbours(key))
+        ]
+        self._since_refresh = 0
+
+    def ask(self, me: "MapElites", n: int) -> List[Melody]:
+        if not self._frontier or self._since_refresh >= self.refresh_every:
+            self._refresh(me)
+        self._since_refresh += 1
+        keys = [k for k in self._frontier if k in me.archive]
+        out = []
+        for _ in range(n):
+            if keys:
+                parent = random.choice(me.archive[random.choice(keys)])
+            else:
+                parent = me._pick_parent()
+            if parent is None:
+                out.append(me._random_candidate())
+                continue
+            m = parent.melody
+            for _r in range(self.mutation_rounds):
+                m = me.mutate(m)
+            out.append(m)
+        return out
+
+    def tell(self, me: "MapElites", candidates: List[Melody], feedback: List[InsertFeedback]) -> None:
+        self.new_cells += sum(1 for fb in feedback if fb.new_cell)
+
+
+class EmitterScheduler:
+    """
+    Dzieli wsad generacji między emitery proporcjonalnie do ostatniej wydajności
+    (EMA odsetka wstawionych kandydatów). min_share gwarantuje, że żaden emiter
+    nie zostanie całkiem zagłodzony.
+    """
+
+    def __init__(self, emitters: List[Emitter], decay: float = 0.8, min_share: float = 0.1):
+        if not emitters:
+            raise ValueError("EmitterScheduler needs at least one emitter.")
+        self.emitters = list(emitters)
+        self.decay = decay
+        self.min_share = min_share
+        self.yield_ema = [1.0] * len(self.emitters)  # optymistyczny start
+        self.proposed = [0] * len(self.emitters)
+        self.inserted = [0] * len(self.emitters)
+
+    def allocate(self, batch_size: int) -> List[int]:
+        k = len(self.emitters)
+        total = sum(self.yield_ema)
+        shares = [
+            self.min_share / k + (1.0 - self.min_share) * (y / total if total > 0 else 1.0 / k)
+            for y in self.yield_ema
+        ]
+        raw = [s * batch_size for s in shares]
+        counts = [int(r) for r in raw]
+        # największe reszty dostają brakujące miejsca
+        rest = sorted(range(k), key=lambda i: raw[i] - counts[i], reverse=True)
+        for i in rest[: batch_size - sum(counts)]:
+            counts[i] += 1
+        return counts
+
+    def update(self, idx: int, n_proposed: int, n_inserted: int) -> None:
+        if n_proposed <= 0:
+            return
+        self.proposed[idx] += n_proposed
+        self.inserted[idx] += n_inserted
+        rate = n_inserted / n_proposed
+        self.yield_ema[idx] = self.decay * self.yield_ema[idx] + (1.0 - self.decay) * rate
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "emitter": em.name,
+                "proposed": self.proposed[i],
+                "inserted": self.inserted[i],
+                "yield_ema": self.yield_ema[i],
+            }
+            for i, em in enumerate(self.emitters)
+        ]
+
+
+def default_emitters() -> List[Emitter]:
+    return [ImprovementEmitter(), RandomRestartEmitter(), NoveltyEmitter()]
 
 
 class MapElites:
-    def __init__(self, evaluator, cfg: MapElitesConfig):
+    def __init__(
+        self,
+        evaluator,
+        cfg: MapElitesConfig,
+        emitters: Optional[List[Emitter]] = None,
+        pool: Optional[ProcessPoolExecutor] = None,
+    ):
         self.evaluator = evaluator
         self.cfg = cfg
         self.archive: Dict[EliteKey, List[Elite]] = {}
         self.per_cell: int = 3  # top-3 na niszę
+        self.pareto = cfg.pareto_front_size is not None
+        if self.pareto:
+            if cfg.pareto_front_size < 1:
+                raise ValueError(f"pareto_front_size must be >= 1: {cfg.pareto_front_size}")
+            if cfg.surrogate is not None:
+                # surogat przewiduje skalarny score, nie dominację
+                raise ValueError("surrogate is not supported with pareto_front_size")
+            self.per_cell = cfg.pareto_front_size
+        self.descriptor = make_descriptor(cfg)
+
+        # bez emiterów i bez wsadów: klasyczna pętla (ta sama sekwencja RNG co wcześniej)
+        if emitters is None and (cfg.batch_size > 1 or cfg.workers > 1):
+            emitters = [UniformEmitter()]
+        self.scheduler: Optional[EmitterScheduler] = EmitterScheduler(emitters) if emitters else None
+
+        # pula może być współdzielona z zewnątrz; własną zamykamy po run()
+        self._pool = pool
+        self._owns_pool = False
+
+        self.lsh: Optional[MinHashLSH] = None
+        self.dedup_rejected = 0
+
+        # stan budżetu / zatrzymania (resetowany w run())
+        self.n_evaluations = 0
+        self.stop_reason: Optional[str] = None
+        self._t_start = time.monotonic()
+        self._next_check: Optional[int] = None
+        self._last_check: Optional[Tuple[int, float]] = None
+        self._qd_floor: Optional[float] = cfg.qd_score_floor
+        self._snapshot_dir: Optional[str] = None
+        self._snapshot_meta: Optional[dict] = None
+        self._last_snapshot = self._t_start
+        self.warm_started = {"loaded": 0, "inserted": 0}
+        self._candidate_log: Optional[CandidateLogWriter] = None
+        self.symmetry_stats = {"offered": 0, "inserted": 0}
+        self.surrogate = None
+        if cfg.surrogate is not None:
+            from search.surrogate import Surrogate  # numpy potrzebny tylko z surogatem
+            self.surrogate = Surrogate(cfg.surrogate)
+        # profil faz (--profile); None = bez narzutu poza nullcontext
+        self.profiler: Optional[PhaseProfiler] = None
+
+        # słuchacze postępu: (fn(me), co ile ewaluacji, następny próg)
+        self._listeners: List[List] = []
+        if cfg.global_dedup_threshold is not None:
+            self.lsh = MinHashLSH(num_perm=cfg.lsh_num_perm, bands=cfg.lsh_bands, ngram_n=4)
+            for path in cfg.dedup_index_paths:
+                self.lsh.merge_file(path, frozen=True)
 
     def _random_candidate(self) -> Melody:
         mode = random.random()
@@ -209,52 +753,362 @@ class MapElites:
         return Melody(pitches)
 
     def _evaluate(self, melody: Melody) -> Optional[Elite]:
-        res = self.evaluator.evaluate(melody)
-        if self.cfg.require_passed and not res.passed:
-            return None
-
-        # stats do descriptor
-        stats = res.stats if getattr(res, "stats", None) is not None else MelodyStats.compute(melody)
-        key = descriptor_from_stats(stats, self.cfg.descriptor)
-        return Elite(melody=melody, score=float(res.score), key=key)
+        self.n_evaluations += 1
+        with maybe_phase(self.profiler, "evaluate"):
+            out = evaluate_elites(
+                self.evaluator, [melody], self.descriptor, self.cfg.require_passed, self.cfg.symmetry_variants,
+            )
+        self._offer_variants(out[1:])
+        if self._candidate_log is not None:
+            self._log_candidates([melody], out[:1])
+        if self.surrogate is not None:
+            self.surrogate.learn([melody], out[:1])
+        return out[0]
+
+    def _offer_variants(self, elites: List[Elite]) -> None:
+        # warianty symetrii: do archiwum bez informacji zwrotnej dla emiterów
+        for e in elites:
+            self.symmetry_stats["offered"] += 1
+            if self._insert_with_feedback(e).inserted:
+                self.symmetry_stats["inserted"] += 1
+
+    def _log_candidates(self, melodies: List[Melody], elites: List[Optional[Elite]]) -> None:
+        # odrzucone przez filtry -> score -inf
+        self._candidate_log.append_many(
+            (m, e.score if e is not None else float("-inf")) for m, e in zip(melodies, elites)
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = make_eval_pool(self.evaluator, self.cfg, self.descriptor)
+            self._owns_pool = True
+        return self._pool
+
+    def close(self) -> None:
+        if self._owns_pool and self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._owns_pool = False
+
+    def _evaluate_many(self, melodies: List[Melody]) -> List[Optional[Elite]]:
+        if not melodies:
+            return []
+        self.n_evaluations += len(melodies)
+        sym = self.cfg.symmetry_variants
+        with maybe_phase(self.profiler, "evaluate"):
+            if self.cfg.workers <= 1 and self._pool is None:
+                out = evaluate_elites(self.evaluator, melodies, self.descriptor, self.cfg.require_passed, sym)
+                extras = out[len(melodies):]
+                del out[len(melodies):]
+            else:
+                # kilka kawałków na proces, żeby wyrównać obciążenie
+                chunks = _chunks(melodies, max(1, self.cfg.workers) * 4)
+                out, extras = [], []
+                for chunk, part in zip(chunks, self._get_pool().map(_worker_evaluate, chunks)):
+                    out.extend(part[:len(chunk)])
+                    extras.extend(part[len(chunk):])
+        self._offer_variants(extras)
+        if self._candidate_log is not None:
+            self._log_candidates(melodies, out)
+        if self.surrogate is not None:
+            self.surrogate.learn(melodies, out)
+        return out
+
+    def mutate(self, melody: Melody) -> Melody:
+        ints = pitches_to_intervals(melody.pitches)
+        ints2 = mutate_intervals(ints, self.cfg.mutation)
+        return Melody(intervals_to_pitches(self.cfg.start_pitch, ints2))
+
+    def _may_enter(self, elite: Elite, cell: Optional[List[Elite]]) -> bool:
+        if self.pareto:
+            return cell is None or may_enter_front(cell, elite.objectives)
+        return cell is None or len(cell) < self.per_cell or elite.score > min(e.score for e in cell)
 
     def _try_insert(self, elite: Elite) -> bool:
+        if not self._insert(elite):
+            return False
+        if not elite.features and any(e is elite for e in self.archive.get(elite.key, ())):
+            # cechy do features.json tylko dla elit, które naprawdę weszły
+            elite.features = stats_features(MelodyStats.compute(elite.melody), FEATURE_COLUMNS)
+        return True
+
+    def _insert(self, elite: Elite) -> bool:
         cell = self.archive.get(elite.key)
+
+        # globalny near-duplicate (inne nisze / poprzednie runy); liczymy tylko,
+        # gdy kandydat w ogóle ma szansę wejść do niszy
+        sig = None
+        if self.lsh is not None and self._may_enter(elite, cell):
+            sig = self.lsh.signature_of(pitches_to_intervals(elite.melody.pitches))
+            _, sim = self.lsh.query(sig)
+            if sim >= self.cfg.global_dedup_threshold:
+                self.dedup_rejected += 1
+                return False
+
         if cell is None:
             self.archive[elite.key] = [elite]
+            self._lsh_update(elite, sig, dropped=())
             return True
 
-        # jeśli już mamy prawie identyczną, nie dodawaj (novelty cutoff)
-        nov = novelty_against(elite, cell, ngram_n=4)
-        if nov < 0.15:
-            return False
+        if self.pareto:
+            return self._insert_pareto(elite, cell, sig)
+
+        with maybe_phase(self.profiler, "novelty"):
+            # jeśli już mamy prawie identyczną, nie dodawaj (novelty cutoff)
+            nov = novelty_against(elite, cell, ngram_n=4)
+            if nov < 0.15:
+                return False
 
-        cell.append(elite)
+            cell.append(elite)
 
-        # sort: najpierw score, ale jak score zbliżone, wolisz bardziej novel
-        cell.sort(key=lambda e: (e.score, novelty_against(e, cell, ngram_n=4)), reverse=True)
+            # sort: najpierw score, ale jak score zbliżone, wolisz bardziej novel
+            cell.sort(key=lambda e: (e.score, novelty_against(e, cell, ngram_n=4)), reverse=True)
 
         # obetnij do top-N
         changed = len(cell) > self.per_cell
         self.archive[elite.key] = cell[: self.per_cell]
+        self._lsh_update(elite, sig, dropped=cell[self.per_cell:])
         return True or changed
 
+    def _insert_pareto(self, elite: Elite, cell: List[Elite], sig) -> bool:
+        # najpierw tania dominacja, novelty tylko dla kandydatów, którzy mogą wejść
+        if not may_enter_front(cell, elite.objectives):
+            return False
+        with maybe_phase(self.profiler, "novelty"):
+            if novelty_against(elite, cell, ngram_n=4) < 0.15:
+                return False
+        inserted, removed = insert_into_front(cell, elite, self.per_cell)
+        self._lsh_update(elite, sig, dropped=removed)
+        return inserted
+
+    def _lsh_update(self, elite: Elite, sig, dropped: Iterable[Elite]) -> None:
+        if self.lsh is None:
+            return
+        for e in dropped:
+            if e is not elite:
+                self.lsh.remove(tuple(pitches_to_intervals(e.melody.pitches)))
+        if any(e is elite for e in self.archive[elite.key]):
+            ints = tuple(pitches_to_intervals(elite.melody.pitches))
+            self.lsh.add(ints, sig if sig is not None else self.lsh.signature_of(ints))
+
     def _pick_parent(self) -> Optional[Elite]:
         if not self.archive:
             return None
         cell = random.choice(list(self.archive.values()))
         return random.choice(cell)
 
-    def run(self) -> Dict[EliteKey, Elite]:
+    def _insert_with_feedback(self, elite: Optional[Elite]) -> InsertFeedback:
+        if elite is None:
+            return InsertFeedback(elite=None, inserted=False, new_cell=False)
+        cell = self.archive.get(elite.key)
+        new_cell = cell is None
+        prev_best = max(e.score for e in cell) if cell else 0.0
+        self._try_insert(elite)
+        survived = any(e is elite for e in self.archive.get(elite.key, ()))
+        improvement = (elite.score - prev_best) if (survived and not new_cell) else 0.0
+        return InsertFeedback(elite=elite, inserted=survived, new_cell=new_cell, improvement=improvement)
+
+    def _generation(self, batch_size: int) -> None:
+        sched = self.scheduler
+        counts = sched.allocate(batch_size)
+
+        proposals: List[List[Melody]] = []
+        for em, k in zip(sched.emitters, counts):
+            proposals.append(em.ask(self, k) if k > 0 else [])
+
+        # jeden wsad dla wszystkich emiterów -> pełne wykorzystanie puli
+        flat = [m for props in proposals for m in props]
+        if self.surrogate is None:
+            elites = self._evaluate_many(flat)
+        else:
+            # odrzucone przez surogat = jak nieudane dzieci (feedback: nie weszły)
+            keep = self.surrogate.screen(self, flat)
+            it = iter(self._evaluate_many([m for m, k in zip(flat, keep) if k]))
+            elites = [next(it) if k else None for k in keep]
+
+        pos = 0
+        for i, (em, props) in enumerate(zip(sched.emitters, proposals)):
+            fbs = [self._insert_with_feedback(e) for e in elites[pos:pos + len(props)]]
+            pos += len(props)
+            em.tell(self, props, fbs)
+            sched.update(i, len(props), sum(1 for fb in fbs if fb.inserted))
+
+    # ---------- budżet / zatrzymanie / migawki ----------
+
+    def qd_floor(self) -> Optional[float]:
+        if self._qd_floor is None:
+            finite = [e.score for cell in self.archive.values() for e in cell if math.isfinite(e.score)]
+            if finite:
+                self._qd_floor = min(finite)
+        return self._qd_floor
+
+    def qd_score(self) -> float:
+        # suma najlepszych score po niszach, przesuniętych o stały floor (>= 0, rośnie z pokryciem)
+        floor = self.qd_floor()
+        if floor is None:
+            return 0.0
+        return sum(max(0.0, max(e.score for e in cell) - floor) for cell in self.archive.values())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._t_start
+
+    def _remaining_evaluations(self) -> Optional[int]:
+        if self.cfg.max_evaluations is None:
+            return None
+        return max(0, self.cfg.max_evaluations - self.n_evaluations)
+
+    def _check_stagnation(self) -> bool:
+        cov, qd = len(self.archive), self.qd_score()
+        prev = self._last_check
+        self._last_check = (cov, qd)
+        if prev is None:
+            return False
+        cov_gain = (cov - prev[0]) / max(1, prev[0])
+        qd_gain = (qd - prev[1]) / max(1e-9, prev[1])
+        return cov_gain < self.cfg.stagnation_min_coverage_gain and qd_gain < self.cfg.stagnation_min_qd_gain
+
+    def add_progress_listener(self, fn: Callable[["MapElites"], None], every_evaluations: int) -> None:
+        """fn(me) wołane co ~every_evaluations ewaluacji (między generacjami / iteracjami)."""
+        self._listeners.append([fn, max(1, every_evaluations), every_evaluations])
+
+    def _notify(self) -> None:
+        for entry in self._listeners:
+            fn, every, due = entry
+            if self.n_evaluations >= due:
+                entry[2] = self.n_evaluations + every
+                fn(self)
+
+    def _should_stop(self, main_loop: bool = True) -> bool:
+        if self.stop_reason is not None:
+            return True
+        if self._listeners:
+            self._notify()
+        cfg = self.cfg
+        if cfg.max_evaluations is not None and self.n_evaluations >= cfg.max_evaluations:
+            self.stop_reason = "max_evaluations"
+        elif cfg.max_seconds is not None and self.elapsed() >= cfg.max_seconds:
+            self.stop_reason = "max_seconds"
+        elif main_loop and cfg.stagnation_window > 0:
+            if self._next_check is None:
+                self._next_check = self.n_evaluations
+            if self.n_evaluations >= self._next_check:
+                self._next_check = self.n_evaluations + cfg.stagnation_window
+                if self._check_stagnation():
+                    self.stop_reason = "stagnation"
+
+        if (
+            self.stop_reason is None
+            and self._snapshot_dir is not None
+            and cfg.snapshot_every_s is not None
+            and time.monotonic() - self._last_snapshot >= cfg.snapshot_every_s
+        ):
+            self.save_snapshot(self._snapshot_dir, self._snapshot_meta)
+        return self.stop_reason is not None
+
+    def run_summary(self) -> dict:
+        return {
+            "stop_reason": self.stop_reason,
+            "evaluations": self.n_evaluations,
+            "elapsed_s": self.elapsed(),
+            "coverage": len(self.archive),
+            "qd_score": self.qd_score(),
+            "qd_floor": self.qd_floor(),
+            "emitters": self.emitter_stats(),
+            "dedup_rejected": self.dedup_rejected,
+            "warm_start": dict(self.warm_started),
+            "symmetry": {"variants": list(self.cfg.symmetry_variants), **self.symmetry_stats},
+            "surrogate": self.surrogate.summary() if self.surrogate is not None else None,
+        }
+
+    def save_snapshot(self, out_dir: str, run_meta: Optional[dict] = None) -> None:
+        meta = dict(run_meta or {})
+        meta["search"] = self.run_summary()
+        index = self.save_archive(out_dir, run_meta=meta)
+        # kolejne migawki nadpisują katalog: usuń elity, które wypadły z indeksu
+        keep = {it["file"] for it in index}
+        for fname in os.listdir(out_dir):
+            if fname.startswith("elite_") and fname.endswith(".json") and fname not in keep:
+                os.remove(os.path.join(out_dir, fname))
+        self._last_snapshot = time.monotonic()
+
+    # ---------- pętle ----------
+
+    def _batch_len(self, bs: int, left: int) -> int:
+        k = min(bs, left)
+        rem = self._remaining_evaluations()
+        return k if rem is None else min(k, rem)
+
+    def _warm_start(self) -> int:
+        melodies = load_warm_start_melodies(self.cfg.warm_start, self.cfg.n_notes, self.cfg.start_pitch)
+        self.warm_started = {"loaded": len(melodies), "inserted": 0}
+
+        # re-ewaluacja wsadami (równolegle, jeśli workers > 1)
+        bs = max(256, self.cfg.batch_size)
+        inserted = 0
+        for i in range(0, len(melodies), bs):
+            if self._should_stop(main_loop=False):
+                break
+            for e in self._evaluate_many(melodies[i:i + bs]):
+                if e is not None and self._insert_with_feedback(e).inserted:
+                    inserted += 1
+        self.warm_started["inserted"] = inserted
+        return inserted
+
+    def _init_count(self, seeded: int) -> int:
+        if seeded > 0 and self.cfg.warm_start_init_random is not None:
+            return self.cfg.warm_start_init_random
+        return self.cfg.init_random
+
+    def _run_batched(self, n_init: int) -> None:
+        for _ in self._batched_steps(n_init):
+            pass
+
+    def _batched_steps(self, n_init: int) -> Iterator[None]:
+        # generator: yield po każdym wsadzie (przeplatanie kilku archiwów, zob. search/multi_length)
+        bs = max(1, self.cfg.batch_size)
+
+        # 1) inicjalizacja archiwum losowo (wsadami)
+        with maybe_phase(self.profiler, "init"):
+            left = n_init
+            while left > 0 and not self._should_stop(main_loop=False):
+                k = self._batch_len(bs, left)
+                for e in self._evaluate_many([self._random_candidate() for _ in range(k)]):
+                    if e is not None:
+                        self._try_insert(e)
+                left -= k
+                yield
+
+        # 2) generacje emiterów; iterations = liczba ewaluacji
+        with maybe_phase(self.profiler, "main_loop"):
+            left = self.cfg.iterations
+            while left > 0 and not self._should_stop():
+                k = self._batch_len(bs, left)
+                self._generation(k)
+                left -= k
+                yield
+
+    def emitter_stats(self) -> List[dict]:
+        return self.scheduler.stats() if self.scheduler is not None else []
+
+    def _run_serial(self, n_init: int) -> None:
         # 1) inicjalizacja archiwum losowo
-        for _ in range(self.cfg.init_random):
-            m = self._random_candidate()
-            e = self._evaluate(m)
-            if e is not None:
-                self._try_insert(e)
+        with maybe_phase(self.profiler, "init"):
+            for _ in range(n_init):
+                if self._should_stop(main_loop=False):
+                    return
+                m = self._random_candidate()
+                e = self._evaluate(m)
+                if e is not None:
+                    self._try_insert(e)
 
         # 2) pętla MAP-Elites
+        with maybe_phase(self.profiler, "main_loop"):
+            self._serial_loop()
+
+    def _serial_loop(self) -> None:
         for _ in range(self.cfg.iterations):
+            if self._should_stop():
+                return
             parent = self._pick_parent()
             if parent is None:
                 # jeśli archiwum puste (np. filtry zbyt ostre), próbuj dalej losowo
@@ -268,14 +1122,140 @@ class MapElites:
             ints2 = mutate_intervals(ints, self.cfg.mutation)
             pitches2 = intervals_to_pitches(self.cfg.start_pitch, ints2)
             child = Melody(pitches2)
+            if self.surrogate is not None and not self.surrogate.screen(self, [child])[0]:
+                continue
 
             e2 = self._evaluate(child)
             if e2 is not None:
                 self._try_insert(e2)
 
+    def run(self, snapshot_dir: Optional[str] = None, run_meta: Optional[dict] = None) -> Dict[EliteKey, Elite]:
+        """
+        snapshot_dir: jeśli podane, archiwum jest zapisywane tam, gdy run kończy się
+        przed czasem (budżet, stagnacja, Ctrl+C) oraz co cfg.snapshot_every_s sekund.
+        """
+        self.begin_run(snapshot_dir, run_meta)
+        try:
+            with maybe_phase(self.profiler, "warm_start"):
+                seeded = self._warm_start() if self.cfg.warm_start else 0
+            n_init = self._init_count(seeded)
+            if self.scheduler is not None:
+                self._run_batched(n_init)
+            else:
+                self._run_serial(n_init)
+        except KeyboardInterrupt:
+            self.stop_reason = "interrupted"
+        finally:
+            self._release()
+        return self.end_run()
+
+    def steps(self) -> Iterator[None]:
+        """
+        Run krokami (tylko tryb wsadowy): begin_run(), potem next() na tym
+        generatorze wykonuje jeden wsad; po wyczerpaniu -> end_run().
+        """
+        if self.scheduler is None:
+            raise ValueError("steps() needs emitters or batch_size > 1")
+        try:
+            seeded = self._warm_start() if self.cfg.warm_start else 0
+            yield
+            yield from self._batched_steps(self._init_count(seeded))
+        finally:
+            self._release()
+
+    def begin_run(self, snapshot_dir: Optional[str] = None, run_meta: Optional[dict] = None) -> None:
+        self.n_evaluations = 0
+        self.stop_reason = None
+        self.symmetry_stats = {"offered": 0, "inserted": 0}
+        self._t_start = self._last_snapshot = time.monotonic()
+        self._next_check = None
+        self._last_check = None
+        self._snapshot_dir = snapshot_dir
+        self._snapshot_meta = run_meta
+        for entry in self._listeners:
+            entry[2] = entry[1]
+        if self.cfg.candidate_log:
+            self._candidate_log = CandidateLogWriter(self.cfg.candidate_log)
+
+    def _release(self) -> None:
+        self.close()
+        if self._candidate_log is not None:
+            self._candidate_log.close()
+            self._candidate_log = None
+
+    def end_run(self) -> Dict[EliteKey, Elite]:
+        if self.stop_reason is None:
+            self.stop_reason = "completed"
+        elif self._snapshot_dir is not None:
+            self.save_snapshot(self._snapshot_dir, self._snapshot_meta)
         return self.archive
 
-    def save_archive(self, out_dir: str, run_meta: Optional[dict] = None) -> None:
+    # ---------- kolumny cech ----------
+
+    @staticmethod
+    def _elite_features(elite: Elite) -> Tuple[float, ...]:
+        # zwykle policzone przy wstawieniu (_try_insert)
+        return elite.features or stats_features(MelodyStats.compute(elite.melody), FEATURE_COLUMNS)
+
+    def _save_feature_columns(self, out_dir: str, flat: List[tuple], files: Dict[int, str]) -> None:
+        """
+        Całe archiwum (nie tylko zapisane elity) w układzie kolumnowym: surowe
+        wartości scorerów (bez wagi) + cechy -> przeważanie / przekoszykowanie
+        bez ponownego wyszukiwania (search.feature_store, scripts/rescore_archive).
+        """
+        scorers = list(getattr(self.evaluator, "scorers", []))
+        weights = [float(getattr(sc, "weight", 1.0)) for sc in scorers]
+        raw, feats = [], []
+        for _, elite, _ in flat:
+            if elite.raw:
+                raw.append(list(elite.raw))
+            else:
+                # ewaluator bez "raw" w rozbiciu: odtwórz z wagi (waga 0 -> wartość nieznana)
+                vals = list(elite.objectives) or [0.0] * len(weights)
+                raw.append([v / w if w else 0.0 for v, w in zip(vals, weights)])
+            feats.append(list(self._elite_features(elite)))
+
+        cvt = self.cfg.cvt
+        cols = {
+            "scorers": [
+                {
+                    "type": sc.__class__.__name__,
+                    "weight": w,
+                    "params": {k: v for k, v in sc.__dict__.items() if not k.startswith("_")},
+                }
+                for sc, w in zip(scorers, weights)
+            ],
+            "feature_names": list(FEATURE_COLUMNS),
+            # dokładnie jeden z nich: siatka albo CVT (komórki CVT nie dają się przekoszykować na siatkę)
+            "descriptor": asdict(self.cfg.descriptor) if cvt is None and is_dataclass(self.cfg.descriptor) else None,
+            "cvt": asdict(cvt) if cvt is not None else None,
+            "per_cell": self.per_cell,
+            # front Pareto: rescore po sumie wybiera top-per_cell z frontu
+            "pareto": self.pareto,
+            # próg QD-score runu (MapElites.qd_score), żeby rescore liczył QD tak samo
+            "qd_floor": self.qd_floor(),
+            "score": [e.score for _, e, _ in flat],
+            "cell": [list(key) for key, _, _ in flat],
+            "cell_rank": [k for _, _, k in flat],
+            "file": [files.get(id(e)) for _, e, _ in flat],
+            "unit_duration": [e.melody.unit_duration for _, e, _ in flat],
+            "pitches": [list(e.melody.pitches) for _, e, _ in flat],
+            "scorer_raw": raw,
+            "features": feats,
+        }
+        with open(os.path.join(out_dir, FEATURES_FILE), "w", encoding="utf-8") as f:
+            json.dump(cols, f, ensure_ascii=False, separators=(",", ":"))
+
+    def save_archive(
+        self,
+        out_dir: str,
+        run_meta: Optional[dict] = None,
+        store: Optional[EliteStore] = None,
+    ) -> List[dict]:
+        with maybe_phase(self.profiler, "save_archive"):
+            return self._save_archive(out_dir, run_meta, store)
+
+    def _save_archive(self, out_dir: str, run_meta: Optional[dict], store: Optional[EliteStore]) -> List[dict]:
         os.makedirs(out_dir, exist_ok=True)
 
         # spłaszcz archiwum: (key, elite, k)
@@ -286,47 +1266,65 @@ class MapElites:
 
         # sortuj globalnie po score
         flat.sort(key=lambda x: x[1].score, reverse=True)
+        all_flat = flat
 
         # ogranicz liczbę zapisywanych elit
         flat = flat[: self.cfg.max_elites_to_save]
 
         index = []
+        stored: List[tuple[SearchResult, str]] = []
+        scorer_types = [sc.__class__.__name__ for sc in getattr(self.evaluator, "scorers", [])]
 
         for key, elite, k in flat:
-            a, t, pc = key
-            fname = f"elite_a{a:02d}_t{t:02d}_pc{pc:02d}_k{k:02d}.json"
+            key_meta = self.descriptor.key_meta(key)
+            fname = f"elite_{self.descriptor.key_stem(key)}_k{k:02d}.json"
             path = os.path.join(out_dir, fname)
+            breakdown = tuple(zip(scorer_types, elite.objectives))
+            feats = self._elite_features(elite)
 
             sr = SearchResult(
                 melody=elite.melody,
                 score=elite.score,
                 passed=True,
                 reason="",
-                score_breakdown=(),
+                score_breakdown=breakdown,
                 filter_trace=(),
                 meta={
                     "descriptor": {
-                        "ambitus_bin": a,
-                        "turn_rate_bin": t,
-                        "pc_bin": pc,
+                        **key_meta,
                         "cell_rank": k,
                     },
                     "n_notes": self.cfg.n_notes,
+                    "features": dict(zip(FEATURE_COLUMNS, feats)),
                     "run": run_meta or {},
                 },
             )
 
             save_result_json(path, sr)
+            stored.append((sr, fname))
 
             index.append({
                 "file": fname,
                 "score": elite.score,
-                "ambitus_bin": a,
-                "turn_rate_bin": t,
-                "pc_bin": pc,
+                **key_meta,
                 "cell_rank": k,
                 "n_notes": self.cfg.n_notes,
             })
 
         with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
             json.dump(index, f, ensure_ascii=False, indent=2)
+
+        self._save_feature_columns(out_dir, all_flat, {id(e): it["file"] for (_, e, _), it in zip(flat, index)})
+
+        # indeks LSH całego archiwum (nie tylko zapisanych elit) -> dedup w kolejnych runach
+        if self.lsh is not None:
+            self.lsh.save(os.path.join(out_dir, LSH_INDEX_FILE))
+
+        # baza elit: cały run w jednej transakcji (migawka zastępuje poprzednią)
+        if store is None and self.cfg.elite_store:
+            with EliteStore(self.cfg.elite_store) as s:
+                s.replace_run(out_dir, run_meta, stored)
+        elif store is not None:
+            store.replace_run(out_dir, run_meta, stored)
+
+        return index
@@ -0,0 +1,172 @@
+# search/minhash.py
+from __future__ import annotations
+
+import json
+import os
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# MinHash po zbiorze n-gramów interwałów + LSH (banding), żeby pytanie
+# "czy mamy już prawie taką samą melodię gdziekolwiek w archiwum" było
+# podliniowe zamiast O(archiwum).
+
+_PRIME = (1 << 31) - 1  # a*h < 2**62, więc wszystko mieści się w int64 / szybkich intach
+_MASK31 = _PRIME
+
+LSHKey = Tuple[int, ...]  # interwały melodii (niezależne od transpozycji)
+Signature = Tuple[int, ...]
+
+
+def _gram_hash(g: Sequence[int]) -> int:
+    # stabilny między procesami/wersjami Pythona (w przeciwieństwie do hash())
+    h = 0xCBF29CE484222325
+    for v in g:
+        h ^= v & 0xFF
+        h = (h * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF
+    return h & _MASK31
+
+
+def interval_gram_hashes(intervals: Sequence[int], n: int = 4) -> Set[int]:
+    return {_gram_hash(intervals[i:i + n]) for i in range(len(intervals) - n + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 32, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.seed = seed
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, hashes: Iterable[int]) -> Signature:
+        hs = list(hashes)
+        if not hs:
+            return tuple([_PRIME] * self.num_perm)
+        return tuple(min((a * h + b) % _PRIME for h in hs) for a, b in self._perms)
+
+
+def estimate_jaccard(a: Signature, b: Signature) -> float:
+    if not a:
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class MinHashLSH:
+    """
+    Indeks LSH: sygnatura dzielona na `bands` pasm po rows = num_perm // bands.
+    Kandydaci do porównania to tylko melodie dzielące choć jeden kubełek.
+    Wpisy "zamrożone" (np. z poprzednich runów) nie są usuwane przez remove().
+    """
+
+    def __init__(self, num_perm: int = 32, bands: int = 8, ngram_n: int = 4, seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands.")
+        self.hasher = MinHasher(num_perm=num_perm, seed=seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram_n = ngram_n
+        self._sigs: Dict[LSHKey, Signature] = {}
+        self._frozen: Set[LSHKey] = set()
+        self._buckets: List[Dict[Signature, Set[LSHKey]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def __contains__(self, key: LSHKey) -> bool:
+        return key in self._sigs
+
+    def signature_of(self, intervals: Sequence[int]) -> Signature:
+        return self.hasher.signature(interval_gram_hashes(intervals, self.ngram_n))
+
+    def _bands_of(self, sig: Signature):
+        r = self.rows
+        for b in range(self.bands):
+            yield b, sig[b * r:(b + 1) * r]
+
+    def add(self, key: LSHKey, sig: Signature, frozen: bool = False) -> None:
+        if key in self._sigs:
+            if frozen:
+                self._frozen.add(key)
+            return
+        self._sigs[key] = sig
+        if frozen:
+            self._frozen.add(key)
+        for b, band in self._bands_of(sig):
+            self._buckets[b].setdefault(band, set()).add(key)
+
+    def remove(self, key: LSHKey) -> None:
+        sig = self._sigs.get(key)
+        if sig is None or key in self._frozen:
+            return
+        del self._sigs[key]
+        for b, band in self._bands_of(sig):
+            bucket = self._buckets[b].get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[b][band]
+
+    def query(self, sig: Signature, exclude: Optional[LSHKey] = None) -> Tuple[Optional[LSHKey], float]:
+        """Najbliższy sąsiad (szacowany Jaccard) spośród kandydatów z kubełków."""
+        seen: Set[LSHKey] = set()
+        best_key: Optional[LSHKey] = None
+        best = 0.0
+        for b, band in self._bands_of(sig):
+            for key in self._buckets[b].get(band, ()):
+                if key in seen or key == exclude:
+                    continue
+                seen.add(key)
+                sim = estimate_jaccard(sig, self._sigs[key])
+                if sim > best:
+                    best_key, best = key, sim
+        return best_key, best
+
+    # ---------- zapis / odczyt ----------
+
+    def to_dict(self) -> dict:
+        return {
+            "num_perm": self.hasher.num_perm,
+            "bands": self.bands,
+            "ngram_n": self.ngram_n,
+            "seed": self.hasher.seed,
+            "entries": [[list(k), list(s)] for k, s in self._sigs.items()],
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    def merge_file(self, path: str, frozen: bool = True) -> int:
+        """Dokłada wpisy z zapisanego indeksu (np. innego runu). Zwraca liczbę wpisów."""
+        if os.path.isdir(path):
+            path = os.path.join(path, LSH_INDEX_FILE)
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        same_params = (
+            int(d["num_perm"]) == self.hasher.num_perm
+            and int(d["seed"]) == self.hasher.seed
+            and int(d.get("ngram_n", 4)) == self.ngram_n
+        )
+        for k, s in d["entries"]:
+            key = tuple(int(v) for v in k)
+            # inne parametry -> sygnatury nieporównywalne, przelicz z interwałów
+            sig = tuple(int(v) for v in s) if same_params else self.signature_of(key)
+            self.add(key, sig, frozen=frozen)
+        return len(d["entries"])
+
+    @staticmethod
+    def load(path: str, frozen: bool = False) -> "MinHashLSH":
+        if os.path.isdir(path):
+            path = os.path.join(path, LSH_INDEX_FILE)
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        idx = MinHashLSH(
+            num_perm=int(d["num_perm"]),
+            bands=int(d["bands"]),
+            ngram_n=int(d.get("ngram_n", 4)),
+            seed=int(d["seed"]),
+        )
+        idx.merge_file(path, frozen=frozen)
+        return idx
+
+
+LSH_INDEX_FILE = "lsh_index.json"
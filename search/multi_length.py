@@ -0,0 +1,119 @@
+# search/multi_length.py
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional, Sequence
+
+from search.map_elites import (
+    MapElites,
+    MapElitesConfig,
+    default_emitters,
+    make_descriptor,
+    make_eval_pool,
+)
+
+# Kilka długości melodii w jednym runie: osobne archiwum (MapElites) per
+# długość, wspólny ewaluator, deskryptor i pula procesów. Generacje są
+# przeplatane (round-robin po wsadzie), więc każdy wsad rozkłada się na całą
+# pulę, a start procesów / importy płacimy raz. Wynik: <out>/n16/, <out>/n32/...
+# (jak zwykły run) plus wspólny <out>/index.json ze ścieżkami względnymi.
+
+MULTI_SUMMARY_FILE = "multi_length.json"
+
+
+def length_dir(n_notes: int) -> str:
+    return f"n{n_notes}"
+
+
+def length_configs(base: MapElitesConfig, lengths: Sequence[int]) -> Dict[int, MapElitesConfig]:
+    """Konfiguracja per długość; candidate_log dostaje przyrostek długości."""
+    out = {}
+    for n in sorted(set(lengths)):
+        if n < 2:
+            raise ValueError(f"Melody length must be >= 2: {n}")
+        log = None
+        if base.candidate_log:
+            root, ext = os.path.splitext(base.candidate_log)
+            log = f"{root}_{length_dir(n)}{ext}"
+        out[n] = replace(base, n_notes=n, candidate_log=log)
+    return out
+
+
+class MultiLengthRun:
+    def __init__(
+        self,
+        evaluator,
+        cfgs: Dict[int, MapElitesConfig],
+        emitters_factory: Callable[[], list] = default_emitters,
+    ):
+        if not cfgs:
+            raise ValueError("No lengths given")
+        first = next(iter(cfgs.values()))
+        for n, cfg in cfgs.items():
+            # jedna pula = jeden deskryptor i te same ustawienia ewaluacji w procesach
+            if (cfg.descriptor, cfg.cvt, cfg.require_passed, cfg.symmetry_variants, cfg.workers) != (
+                first.descriptor, first.cvt, first.require_passed, first.symmetry_variants, first.workers,
+            ):
+                raise ValueError(f"Length {n}: descriptor / evaluation settings differ from length {min(cfgs)}")
+        self.evaluator = evaluator
+        self.descriptor = make_descriptor(first)
+        self._pool = make_eval_pool(evaluator, first, self.descriptor) if first.workers > 1 else None
+        self.runs: Dict[int, MapElites] = {}
+        for n, cfg in cfgs.items():
+            me = MapElites(evaluator, cfg, emitters=emitters_factory(), pool=self._pool)
+            me.descriptor = self.descriptor
+            self.runs[n] = me
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def run(self, out_dir: Optional[str] = None, run_meta: Optional[dict] = None) -> Dict[int, MapElites]:
+        """out_dir: katalog migawek per długość (<out>/nXX), jak snapshot_dir w MapElites.run."""
+        active = {}
+        for n, me in self.runs.items():
+            snap = os.path.join(out_dir, length_dir(n)) if out_dir is not None else None
+            me.begin_run(snap, dict(run_meta or {}, n_notes=n))
+            active[n] = me.steps()
+        try:
+            while active:
+                for n in list(active):
+                    try:
+                        next(active[n])
+                    except StopIteration:
+                        del active[n]
+        except KeyboardInterrupt:
+            for n, gen in active.items():
+                self.runs[n].stop_reason = "interrupted"
+                gen.close()
+        finally:
+            self.close()
+        for me in self.runs.values():
+            me.end_run()
+        return self.runs
+
+    def summary(self) -> dict:
+        return {str(n): me.run_summary() for n, me in self.runs.items()}
+
+    def save(self, out_dir: str, run_meta: Optional[dict] = None) -> List[dict]:
+        """Archiwa per długość + wspólny index.json (najlepsze najpierw) i multi_length.json."""
+        os.makedirs(out_dir, exist_ok=True)
+        combined: List[dict] = []
+        for n, me in self.runs.items():
+            sub = length_dir(n)
+            meta = dict(run_meta or {}, n_notes=n, search=me.run_summary())
+            for it in me.save_archive(os.path.join(out_dir, sub), run_meta=meta):
+                combined.append({**it, "file": f"{sub}/{it['file']}", "length_dir": sub})
+        combined.sort(key=lambda it: it["score"], reverse=True)
+
+        with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(combined, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(out_dir, MULTI_SUMMARY_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {"lengths": sorted(self.runs), "run": run_meta or {}, "search": self.summary()},
+                f, ensure_ascii=False, indent=2, default=str,
+            )
+        return combined
@@ -0,0 +1,79 @@
+# search/pareto.py
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+# Front Pareto w niszy (tryb wielokryterialny MapElites): cele = wartości
+# poszczególnych scorerów (większe lepsze). Nisza trzyma wyłącznie punkty
+# niezdominowane, więc wstawienie to jedno przejście po froncie (O(F·d)),
+# bez pełnego sortowania niezdominowanego; przy przepełnieniu wypada punkt
+# o najmniejszej odległości zatłoczenia (crowding distance, NSGA-II).
+# Dominacja nie zależy od dodatnich wag scorerów.
+
+Objectives = Tuple[float, ...]
+
+
+def weakly_dominates(a: Sequence[float], b: Sequence[float]) -> bool:
+    """a >= b na każdym celu (także a == b)."""
+    for x, y in zip(a, b):
+        if x < y:
+            return False
+    return True
+
+
+def dominates(a: Sequence[float], b: Sequence[float]) -> bool:
+    return weakly_dominates(a, b) and tuple(a) != tuple(b)
+
+
+def crowding_distances(points: Sequence[Sequence[float]]) -> List[float]:
+    n = len(points)
+    if n <= 2:
+        return [float("inf")] * n
+    dist = [0.0] * n
+    for j in range(len(points[0])):
+        order = sorted(range(n), key=lambda i: points[i][j])
+        lo, hi = points[order[0]][j], points[order[-1]][j]
+        dist[order[0]] = dist[order[-1]] = float("inf")
+        span = hi - lo
+        if span <= 0.0:
+            continue
+        for k in range(1, n - 1):
+            dist[order[k]] += (points[order[k + 1]][j] - points[order[k - 1]][j]) / span
+    return dist
+
+
+def may_enter_front(front: Sequence, objectives: Objectives) -> bool:
+    """Czy kandydat nie jest (słabo) zdominowany przez żaden punkt frontu."""
+    return not any(weakly_dominates(e.objectives, objectives) for e in front)
+
+
+def insert_into_front(front: List, elite, max_size: int) -> Tuple[bool, List]:
+    """
+    Wstawia elitę (obiekt z .objectives i .score) do frontu w miejscu.
+    Zwraca (czy elita jest we froncie, usunięte elity). Front jest
+    utrzymywany w kolejności malejącego score (ranga w niszy przy zapisie).
+    """
+    obj = elite.objectives
+    kept, removed = [], []
+    for e in front:
+        if weakly_dominates(e.objectives, obj):
+            return False, []
+        (removed if weakly_dominates(obj, e.objectives) else kept).append(e)
+
+    # wstaw wg score malejąco (front jest mały - liniowo)
+    pos = 0
+    while pos < len(kept) and kept[pos].score >= elite.score:
+        pos += 1
+    kept.insert(pos, elite)
+
+    inserted = True
+    # przepełnienie możliwe tylko, gdy elita nikogo nie zdominowała
+    if len(kept) > max_size:
+        cd = crowding_distances([e.objectives for e in kept])
+        # najmniej "rozpychający" front; remis -> niższy score
+        worst = kept.pop(min(range(len(kept)), key=lambda i: (cd[i], kept[i].score)))
+        removed.append(worst)
+        inserted = worst is not elite
+
+    front[:] = kept
+    return inserted, removed
@@ -0,0 +1,213 @@
+# search/random_search.py
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.io import SearchResult
+from core.melody import Melody
+
+# Baseline: losowe spacery oceniane wsadami w puli procesów, z ograniczonym
+# kopcem top-k scalanym w procesie głównym. Każdy wsad ma własne ziarno
+# (seed, numer wsadu), więc przy budżecie ewaluacji wynik nie zależy od liczby
+# procesów ani kolejności, w jakiej wsady wracają.
+
+
+@dataclass(frozen=True)
+class RandomSearchConfig:
+    n_notes: int = 32
+    start: int = 60
+    steps: Tuple[int, ...] = (-4, -3, -2, -1, 0, 1, 2, 3, 4)
+    top_k: int = 20
+    chunk_size: int = 2000
+    workers: int = 1
+    seed: int = 1337
+    # budżety (co pierwsze); bez obu = max_evaluations 20000 jak wcześniej
+    max_evaluations: Optional[int] = 20000
+    max_seconds: Optional[float] = None
+
+
+# wpis kopca: (score, -chunk, -i, pitches, score_breakdown, filter_trace)
+HeapItem = Tuple[float, int, int, Tuple[int, ...], tuple, tuple]
+
+
+def chunk_seed(seed: int, chunk: int) -> int:
+    return (seed * 1_000_003 + chunk * 7919) & 0xFFFFFFFF
+
+
+def random_walk_chunk(rng: random.Random, size: int, n: int, start: int, steps: Tuple[int, ...]) -> List[Melody]:
+    # jedno losowanie kroków na cały wsad, potem sumy narastające per melodia
+    flat = rng.choices(steps, k=size * (n - 1))
+    out = []
+    for j in range(size):
+        pitches = tuple(accumulate(flat[j * (n - 1):(j + 1) * (n - 1)], initial=start))
+        out.append(Melody(pitches).transpose_to_first(0))
+    return out
+
+
+def _push(heap: List[HeapItem], item: HeapItem, k: int) -> None:
+    if len(heap) < k:
+        heapq.heappush(heap, item)
+    elif item[:3] > heap[0][:3]:
+        heapq.heapreplace(heap, item)
+
+
+def evaluate_chunk(evaluator, cfg: RandomSearchConfig, chunk: int, size: int) -> Tuple[int, int, List[HeapItem]]:
+    """(ewaluacje, ile przeszło filtry, lokalny top-k)."""
+    rng = random.Random(chunk_seed(cfg.seed, chunk))
+    heap: List[HeapItem] = []
+    passed = 0
+    for i, m in enumerate(random_walk_chunk(rng, size, cfg.n_notes, cfg.start, cfg.steps)):
+        res = evaluator.evaluate(m)
+        if not res.passed:
+            continue
+        passed += 1
+        if len(heap) >= cfg.top_k and res.score <= heap[0][0]:
+            continue
+        breakdown = tuple((str(b["type"]), float(b["value"])) for b in res.score_breakdown)
+        trace = tuple((str(t["type"]), bool(t["passed"]), str(t["reason"])) for t in res.filter_trace)
+        _push(heap, (float(res.score), -chunk, -i, m.pitches, breakdown, trace), cfg.top_k)
+    return size, passed, heap
+
+
+_WORKER: dict = {}
+
+
+def _worker_init(evaluator, cfg: RandomSearchConfig) -> None:
+    _WORKER["evaluator"] = evaluator
+    _WORKER["cfg"] = cfg
+
+
+def _worker_chunk(task: Tuple[int, int]) -> Tuple[int, int, List[HeapItem]]:
+    return evaluate_chunk(_WORKER["evaluator"], _WORKER["cfg"], *task)
+
+
+class RandomSearch:
+    def __init__(self, evaluator, cfg: RandomSearchConfig):
+        self.evaluator = evaluator
+        self.cfg = cfg
+        self.heap: List[HeapItem] = []
+        self.n_evaluations = 0
+        self.n_passed = 0
+        self.stop_reason: Optional[str] = None
+        self._t_start = time.monotonic()
+        self._listeners: List[Tuple[Callable[["RandomSearch"], None], float]] = []
+
+    def add_progress_listener(self, fn: Callable[["RandomSearch"], None], every_s: float = 5.0) -> None:
+        """fn(search) co every_s sekund (z procesu głównego) - wyjście anytime."""
+        self._listeners.append((fn, every_s))
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._t_start
+
+    def _tasks(self):
+        # (numer wsadu, rozmiar) aż do budżetu ewaluacji
+        chunk, issued = 0, 0
+        limit = self.cfg.max_evaluations
+        while limit is None or issued < limit:
+            size = self.cfg.chunk_size if limit is None else min(self.cfg.chunk_size, limit - issued)
+            yield chunk, size
+            chunk += 1
+            issued += size
+
+    def _merge(self, result: Tuple[int, int, List[HeapItem]]) -> None:
+        n, passed, heap = result
+        self.n_evaluations += n
+        self.n_passed += passed
+        for item in heap:
+            _push(self.heap, item, self.cfg.top_k)
+
+    def _out_of_time(self) -> bool:
+        return self.cfg.max_seconds is not None and self.elapsed() >= self.cfg.max_seconds
+
+    def run(self) -> List[SearchResult]:
+        self.heap, self.n_evaluations, self.n_passed = [], 0, 0
+        self.stop_reason = None
+        self._t_start = time.monotonic()
+        next_notify = [every for _, every in self._listeners]
+
+        def tick() -> None:
+            for j, (fn, every) in enumerate(self._listeners):
+                if self.elapsed() >= next_notify[j]:
+                    next_notify[j] = self.elapsed() + every
+                    fn(self)
+
+        tasks = self._tasks()
+        try:
+            if self.cfg.workers <= 1:
+                for task in tasks:
+                    if self._out_of_time():
+                        break
+                    self._merge(evaluate_chunk(self.evaluator, self.cfg, *task))
+                    tick()
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=self.cfg.workers,
+                    initializer=_worker_init,
+                    initargs=(self.evaluator, self.cfg),
+                ) as ex:
+                    # ograniczona liczba wsadów w locie -> stała pamięć, szybkie zatrzymanie
+                    pending = set()
+                    for task in tasks:
+                        if self._out_of_time():
+                            break
+                        pending.add(ex.submit(_worker_chunk, task))
+                        if len(pending) >= 2 * self.cfg.workers:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for f in done:
+                                self._merge(f.result())
+                            tick()
+                    for f in pending:
+                        self._merge(f.result())
+        except KeyboardInterrupt:
+            self.stop_reason = "interrupted"
+
+        if self.stop_reason is None:
+            self.stop_reason = "max_seconds" if self._out_of_time() else "max_evaluations"
+        return self.top()
+
+    def top(self) -> List[SearchResult]:
+        out = []
+        for score, neg_chunk, neg_i, pitches, breakdown, trace in sorted(self.heap, reverse=True):
+            out.append(SearchResult(
+                melody=Melody(pitches),
+                score=score,
+                passed=True,
+                reason="",
+                score_breakdown=breakdown,
+                filter_trace=trace,
+                meta={"chunk": -neg_chunk, "index": -neg_i, "seed": self.cfg.seed, "n": self.cfg.n_notes},
+            ))
+        return out
+
+    def summary(self) -> Dict:
+        el = self.elapsed()
+        return {
+            "stop_reason": self.stop_reason,
+            "evaluations": self.n_evaluations,
+            "passed": self.n_passed,
+            "elapsed_s": el,
+            "evals_per_s": self.n_evaluations / el if el > 0 else 0.0,
+            "best_score": max((h[0] for h in self.heap), default=None),
+        }
+
+
+def write_top_k(path: str, search: RandomSearch) -> None:
+    """Atomowy zapis bieżącego top-k (plik tymczasowy + os.replace)."""
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(
+            {"search": search.summary(), "results": [r.to_dict() for r in search.top()]},
+            f, ensure_ascii=False, indent=2,
+        )
+    os.replace(tmp, path)
@@ -0,0 +1,57 @@
+# search/streaming.py
+from __future__ import annotations
+
+import heapq
+from typing import Callable, Dict, List, Tuple
+
+from core.melody import Melody
+
+# Strumieniowanie elit w trakcie runu: co jakiś czas patrzymy na globalne top-K
+# (to samo, co zapisze save_archive) i elity, które utrzymały się w top-K przez
+# kilka kolejnych sprawdzeń, uznajemy za "ustabilizowane" i oddajemy dalej
+# (np. do renderowania w tle).
+
+
+class StableEliteTracker:
+    def __init__(self, top_k: int, stable_checks: int = 3):
+        self.top_k = top_k
+        self.stable_checks = stable_checks
+        self._streak: Dict[Tuple[int, ...], int] = {}
+        self._emitted: set = set()
+
+    def update(self, me) -> List[Melody]:
+        """Zwraca melodie, które właśnie się ustabilizowały (każda tylko raz)."""
+        elites = (e for cell in me.archive.values() for e in cell)
+        top = heapq.nlargest(self.top_k, elites, key=lambda e: e.score)
+
+        streak: Dict[Tuple[int, ...], int] = {}
+        out: List[Melody] = []
+        for e in top:
+            key = e.melody.pitches
+            n = self._streak.get(key, 0) + 1
+            streak[key] = n
+            if n >= self.stable_checks and key not in self._emitted:
+                self._emitted.add(key)
+                out.append(e.melody)
+        # kto wypadł z top-K, traci serię
+        self._streak = streak
+        return out
+
+
+def attach_stable_stream(
+    me,
+    sink: Callable[[Melody], object],
+    *,
+    top_k: int,
+    every_evaluations: int = 2000,
+    stable_checks: int = 3,
+) -> StableEliteTracker:
+    """Podpina tracker pod MapElites; każdą ustabilizowaną elitę przekazuje do sink(melody)."""
+    tracker = StableEliteTracker(top_k=top_k, stable_checks=stable_checks)
+
+    def on_progress(m) -> None:
+        for melody in tracker.update(m):
+            sink(melody)
+
+    me.add_progress_listener(on_progress, every_evaluations)
+    return tracker
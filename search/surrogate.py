@@ -0,0 +1,180 @@
+# search/surrogate.py
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.melody import Melody
+from core.stats import MelodyStats
+
+if TYPE_CHECKING:
+    from search.map_elites import Elite, MapElites
+
+# Surogat przed pełną ewaluacją: ridge regression (online, na statystykach
+# wystarczających XᵀX / Xᵀy) przewiduje score dziecka z histogramu interwałów
+# i 3-gramów konturu. Nisza nie jest przewidywana, tylko liczona dokładnie
+# (MelodyStats + deskryptor to ułamek kosztu scorerów). Pełną ewaluację dostaje
+# dziecko, które trafia do pustej / niepełnej niszy albo według modelu pobije
+# najsłabszą elitę niszy; resztę pomijamy, poza losowym ułamkiem explore_rate.
+#
+# Opłaca się tylko przy drogich scorerach: cechy + MelodyStats dla każdego
+# dziecka kosztują ~70 µs, domyślny ewaluator (build_evaluator) ~45 µs. Przy
+# pomijaniu ~20% dzieci zysk jest dopiero od ~0.4 ms na ewaluację; z domyślnym,
+# tanim ewaluatorem surogat spowalnia run (20k iteracji: ~4 s bez, ~4.5 s z).
+
+
+@dataclass(frozen=True)
+class SurrogateConfig:
+    # ułamek odrzuconych przez model, które i tak ewaluujemy (eksploracja + pomiar błędów)
+    explore_rate: float = 0.1
+    # ile próbek uczących, zanim model zacznie odrzucać
+    min_train: int = 2000
+    ridge_lambda: float = 1.0
+    refit_every: int = 256
+    # zapominanie starszych próbek (archiwum się poprawia, rozkład score się przesuwa)
+    decay: float = 0.999
+    # dziecko przechodzi, jeśli przewidziany score > najsłabsza elita niszy - margin.
+    # Kompromis (build_config, 20k iteracji, MAE modelu ~1.5):
+    #   margin 0, min_train 500:  pomija 23%, z pominiętych weszłoby 31% (false_skip_rate)
+    #   margin 1, min_train 2000: pomija 18%, false_skip_rate 18%
+    #   margin 2, min_train 2000: pomija 11%, false_skip_rate 8%
+    margin: float = 1.0
+    max_interval: int = 12
+    seed: int = 0
+
+
+def _n_features(cfg: SurrogateConfig) -> int:
+    return (2 * cfg.max_interval + 1) + 27 + 3 + 1
+
+
+def melody_features(melody: Melody, stats: MelodyStats, cfg: SurrogateConfig) -> np.ndarray:
+    K = cfg.max_interval
+    d = np.asarray(stats.intervals, dtype=np.int64)
+    m = max(1, d.size)
+    ihist = np.bincount(np.clip(d, -K, K) + K, minlength=2 * K + 1) / m
+
+    c = np.sign(d) + 1
+    if c.size >= 3:
+        codes = c[:-2] * 9 + c[1:-1] * 3 + c[2:]
+        chist = np.bincount(codes, minlength=27) / codes.size
+    else:
+        chist = np.zeros(27)
+
+    scalars = np.array([
+        np.abs(d).mean() / K if d.size else 0.0,
+        stats.ambitus / (2.0 * K),
+        stats.turns / max(1, stats.n - 2),
+        1.0,  # wyraz wolny
+    ])
+    return np.concatenate([ihist, chist, scalars])
+
+
+class Surrogate:
+    def __init__(self, cfg: Optional[SurrogateConfig] = None):
+        self.cfg = cfg or SurrogateConfig()
+        d = _n_features(self.cfg)
+        self._A = np.zeros((d, d))
+        self._b = np.zeros(d)
+        self._w: Optional[np.ndarray] = None
+        self._since_fit = 0
+        self._rng = random.Random(self.cfg.seed)
+        # pitches -> (cechy, przewidziany score albo None, próg niszy albo None)
+        self._pending: Dict[Tuple[int, ...], Tuple[np.ndarray, Optional[float], Optional[float]]] = {}
+        self.stats = {
+            "screened": 0, "skipped": 0, "explored": 0, "explored_would_insert": 0,
+            "trained": 0, "fits": 0, "abs_err_sum": 0.0, "err_n": 0,
+        }
+
+    @property
+    def ready(self) -> bool:
+        return self._w is not None
+
+    def _fit(self) -> None:
+        d = self._A.shape[0]
+        self._w = np.linalg.solve(self._A + self.cfg.ridge_lambda * np.eye(d), self._b)
+        self._since_fit = 0
+        self.stats["fits"] += 1
+
+    # ---------- decyzja ----------
+
+    def screen(self, me: "MapElites", melodies: Sequence[Melody]) -> List[bool]:
+        """True = pełna ewaluacja. Zapamiętuje cechy do późniejszego learn()."""
+        stats = [MelodyStats.compute(m) for m in melodies]
+        keys = me.descriptor.keys(stats)
+        X = np.stack([melody_features(m, st, self.cfg) for m, st in zip(melodies, stats)]) if melodies else None
+        preds = X @ self._w if (self.ready and X is not None) else None
+
+        mask: List[bool] = []
+        for i, (m, key) in enumerate(zip(melodies, keys)):
+            self.stats["screened"] += 1
+            cell = me.archive.get(key)
+            pred = float(preds[i]) if preds is not None else None
+            thr = None
+            if pred is None or cell is None or len(cell) < me.per_cell:
+                keep = True
+            else:
+                thr = min(e.score for e in cell)
+                keep = pred > thr - self.cfg.margin
+                if not keep and self._rng.random() < self.cfg.explore_rate:
+                    keep = True
+                    self.stats["explored"] += 1
+                else:
+                    thr = None  # próg zapamiętujemy tylko dla eksploracji
+            if keep:
+                self._pending[m.pitches] = (X[i], pred, thr)
+            else:
+                self.stats["skipped"] += 1
+            mask.append(keep)
+        return mask
+
+    # ---------- uczenie ----------
+
+    def learn(self, melodies: Sequence[Melody], elites: Sequence[Optional["Elite"]]) -> None:
+        """Dopisz wyniki pełnej ewaluacji (tylko melodie, które przeszły filtry)."""
+        rows, ys = [], []
+        for m, e in zip(melodies, elites):
+            pending = self._pending.pop(m.pitches, None)
+            if e is None:
+                continue
+            if pending is None:
+                st = MelodyStats.compute(m)
+                x, pred, thr = melody_features(m, st, self.cfg), None, None
+            else:
+                x, pred, thr = pending
+            if pred is not None:
+                self.stats["abs_err_sum"] += abs(pred - e.score)
+                self.stats["err_n"] += 1
+            if thr is not None and e.score > thr:
+                # model by go odrzucił, a wszedłby do niszy
+                self.stats["explored_would_insert"] += 1
+            rows.append(x)
+            ys.append(e.score)
+        self._pending.clear()
+        if not rows:
+            return
+
+        X = np.stack(rows)
+        y = np.asarray(ys)
+        k = len(ys)
+        self._A *= self.cfg.decay ** k
+        self._b *= self.cfg.decay ** k
+        self._A += X.T @ X
+        self._b += X.T @ y
+        self.stats["trained"] += k
+        self._since_fit += k
+        if self.stats["trained"] >= self.cfg.min_train and (not self.ready or self._since_fit >= self.cfg.refit_every):
+            self._fit()
+
+    def summary(self) -> dict:
+        s = dict(self.stats)
+        n_err = s.pop("err_n")
+        err = s.pop("abs_err_sum")
+        s["mae"] = err / n_err if n_err else None
+        s["skip_rate"] = s["skipped"] / s["screened"] if s["screened"] else 0.0
+        # odsetek eksplorowanych "odrzutów", które jednak weszłyby do archiwum
+        s["false_skip_rate"] = s["explored_would_insert"] / s["explored"] if s["explored"] else None
+        s["config"] = {k: getattr(self.cfg, k) for k in self.cfg.__dataclass_fields__}
+        return s
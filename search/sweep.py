@@ -0,0 +1,262 @@
+# search/sweep.py
+from __future__ import annotations
+
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.runs import next_run_dir
+from search.map_elites import FEATURES_FILE, MapElites, MapElitesConfig
+
+# Sweep parametrów ewaluatora i MapElitesConfig z successive halving:
+# każda konfiguracja dostaje mały budżet iteracji, przeżywa górne 1/eta
+# (po QD-score albo pokryciu), a przeżywające są kontynuowane (warm start
+# z features.json własnego runu) z budżetem razy eta.
+#
+# QD-score prób w szczeblu liczony ze wspólnym progiem (najniższy najlepszy
+# score niszy wśród prób), żeby był porównywalny. Jeśli sweep zmienia wagi
+# scorerów, score prób są w różnych skalach: wtedy "ref_qd_score" (archiwum
+# każdej próby ocenione bazowym ewaluatorem) albo "coverage".
+#
+# Ścieżki parametrów:
+#   "mutation.motif_prob", "descriptor.turn_rate_step", "batch_size"  -> MapElitesConfig
+#   "scorer.MotifNGramScorer.weight", "filter.AmbitusFilter.max_ambitus" -> ewaluator
+
+
+@dataclass(frozen=True)
+class Range:
+    lo: float
+    hi: float
+    log: bool = False
+    integer: bool = False
+
+    def sample(self, rng: random.Random) -> Any:
+        if self.log:
+            v = math.exp(rng.uniform(math.log(self.lo), math.log(self.hi)))
+        else:
+            v = rng.uniform(self.lo, self.hi)
+        return int(round(v)) if self.integer else v
+
+
+def grid_space(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    names = list(grid)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+
+def random_space(space: Dict[str, Any], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """space: ścieżka -> Range albo lista wartości do wyboru."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        out.append({k: (v.sample(rng) if isinstance(v, Range) else rng.choice(list(v))) for k, v in space.items()})
+    return out
+
+
+def _replace_path(obj, parts: List[str], value):
+    name = parts[0]
+    if not hasattr(obj, name):
+        raise KeyError(f"{obj.__class__.__name__} has no field '{name}'")
+    if len(parts) == 1:
+        return replace(obj, **{name: value})
+    return replace(obj, **{name: _replace_path(getattr(obj, name), parts[1:], value)})
+
+
+def apply_params(evaluator, cfg: MapElitesConfig, params: Dict[str, Any]):
+    filters = list(evaluator.filters)
+    scorers = list(evaluator.scorers)
+    for path, value in params.items():
+        parts = path.split(".")
+        if parts[0] in ("scorer", "filter"):
+            if len(parts) != 3:
+                raise KeyError(f"Expected {parts[0]}.<Type>.<field>: {path}")
+            items = scorers if parts[0] == "scorer" else filters
+            hits = [i for i, o in enumerate(items) if o.__class__.__name__ == parts[1]]
+            if not hits:
+                raise KeyError(f"No {parts[0]} of type {parts[1]} in evaluator")
+            for i in hits:
+                items[i] = _replace_path(items[i], parts[2:], value)
+        else:
+            cfg = _replace_path(cfg, parts, value)
+    return evaluator.__class__(filters=filters, scorers=scorers), cfg
+
+
+@dataclass(frozen=True)
+class HalvingConfig:
+    # budżet iteracji w pierwszym szczeblu; kolejne: razy eta
+    min_iterations: int = 2000
+    eta: int = 3
+    max_rungs: int = 3
+    metric: str = "qd_score"  # albo "ref_qd_score", "coverage"
+    workers: int = max(1, (os.cpu_count() or 2) - 1)
+    seed: int = 1337
+
+
+METRICS = ("qd_score", "ref_qd_score", "coverage")
+
+
+def is_weight_path(path: str) -> bool:
+    parts = path.split(".")
+    return len(parts) == 3 and parts[0] == "scorer" and parts[2] == "weight"
+
+
+@dataclass
+class Trial:
+    trial_id: int
+    params: Dict[str, Any]
+    run_dir: str
+    rung: int = -1
+    iterations: int = 0
+    summary: Dict[str, Any] = field(default_factory=dict)
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    # wartość metryki w ostatnim szczeblu (QD ze wspólnym progiem szczebla)
+    metric_value: float = float("-inf")
+
+
+def _cell_best(me: MapElites, ref_evaluator=None) -> List[float]:
+    """Najlepszy score w każdej niszy; z ref_evaluator: elity ocenione na nowo (odrzucone pomijane)."""
+    out = []
+    for cell in me.archive.values():
+        if ref_evaluator is None:
+            out.append(max(e.score for e in cell))
+            continue
+        scores = [r.score for r in (ref_evaluator.evaluate(e.melody) for e in cell) if r.passed]
+        if scores:
+            out.append(max(scores))
+    return out
+
+
+def _run_trial(spec: Tuple) -> Tuple[Dict[str, Any], List[float]]:
+    evaluator, cfg, params, run_dir, rung, seed, run_meta, metric = spec
+    base = evaluator
+    evaluator, cfg = apply_params(evaluator, cfg, params)
+    random.seed(seed)
+    me = MapElites(evaluator, cfg)
+    me.run()
+    # jak migawka: elity, które wypadły w tym szczeblu, znikają z katalogu
+    me.save_snapshot(run_dir, run_meta=dict(run_meta, sweep_params=params, sweep_rung=rung))
+    cells = _cell_best(me, base if metric == "ref_qd_score" else None) if metric != "coverage" else []
+    return me.run_summary(), cells
+
+
+def _shared_floor_qd(cells: List[List[float]]) -> List[float]:
+    finite = [b for c in cells for b in c if math.isfinite(b)]
+    floor = min(finite) if finite else 0.0
+    return [sum(max(0.0, b - floor) for b in c) for c in cells]
+
+
+def successive_halving(
+    evaluator,
+    base_cfg: MapElitesConfig,
+    configs: List[Dict[str, Any]],
+    out_base: str,
+    hcfg: Optional[HalvingConfig] = None,
+    run_meta: Optional[dict] = None,
+    log=print,
+) -> List[Trial]:
+    """
+    Zwraca wszystkie próby posortowane: najdalszy szczebel, potem metryka malejąco.
+    Każda próba ma własny katalog next_run_dir(out_base); procesy robocze
+    liczą całe próby (MapElites w próbie: workers=1).
+    """
+    hcfg = hcfg or HalvingConfig()
+    if hcfg.metric not in METRICS:
+        raise ValueError(f"Unknown metric: {hcfg.metric}")
+    weights = sorted({p for c in configs for p in c if is_weight_path(p)})
+    if hcfg.metric == "qd_score" and weights:
+        # waga skaluje score, ranking odzwierciedlałby głównie wartości wag
+        raise ValueError(
+            f"metric='qd_score' is not comparable when sweeping scorer weights ({', '.join(weights)}); "
+            "use 'ref_qd_score' or 'coverage'"
+        )
+
+    # katalogi przydzielamy w procesie głównym (next_run_dir nie jest bezpieczne między procesami)
+    trials = [Trial(i, p, str(next_run_dir(out_base))) for i, p in enumerate(configs)]
+    base_cfg = replace(base_cfg, workers=1, snapshot_every_s=None)
+
+    alive = list(trials)
+    with ProcessPoolExecutor(max_workers=hcfg.workers) as ex:
+        for rung in range(hcfg.max_rungs):
+            total = hcfg.min_iterations * hcfg.eta ** rung
+            t0 = time.perf_counter()
+            specs = []
+            for t in alive:
+                if rung == 0:
+                    cfg = replace(base_cfg, iterations=total)
+                else:
+                    # kontynuacja: całe archiwum z poprzedniego szczebla + brakujące iteracje
+                    cfg = replace(
+                        base_cfg,
+                        iterations=total - t.iterations,
+                        warm_start=(os.path.join(t.run_dir, FEATURES_FILE),),
+                        warm_start_init_random=0,
+                    )
+                seed = hcfg.seed * 1_000_003 + t.trial_id * 101 + rung
+                specs.append((evaluator, cfg, t.params, t.run_dir, rung, seed, run_meta or {}, hcfg.metric))
+
+            results = list(ex.map(_run_trial, specs))
+            if hcfg.metric == "coverage":
+                values = [float(summary["coverage"]) for summary, _ in results]
+            else:
+                values = _shared_floor_qd([cells for _, cells in results])
+            for t, (summary, _), value in zip(alive, results, values):
+                t.rung, t.iterations, t.summary, t.metric_value = rung, total, summary, value
+                t.history.append({
+                    "rung": rung,
+                    "iterations": total,
+                    **{k: summary[k] for k in ("coverage", "qd_score", "evaluations", "elapsed_s")},
+                    hcfg.metric + "_shared": value,
+                })
+
+            alive.sort(key=lambda t: t.metric_value, reverse=True)
+            log(f"rung {rung}: {len(alive)} trials x {total} iterations in {time.perf_counter() - t0:.1f}s; "
+                f"best {hcfg.metric}={alive[0].metric_value:.3f} ({alive[0].run_dir})")
+
+            keep = max(1, len(alive) // hcfg.eta)
+            if rung == hcfg.max_rungs - 1 or len(alive) == 1:
+                break
+            alive = alive[:keep]
+
+    return sorted(trials, key=lambda t: (t.rung, t.metric_value), reverse=True)
+
+
+def summary_rows(trials: List[Trial]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "trial": t.trial_id,
+            "run_dir": t.run_dir,
+            "rung": t.rung,
+            "iterations": t.iterations,
+            "coverage": t.summary.get("coverage"),
+            "qd_score": t.summary.get("qd_score"),
+            # metryka rankingu (QD: wspólny próg prób szczebla)
+            "metric": t.metric_value,
+            "evaluations": sum(h["evaluations"] for h in t.history),
+            "elapsed_s": sum(h["elapsed_s"] for h in t.history),
+            "params": t.params,
+            "history": t.history,
+        }
+        for t in trials
+    ]
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    if not rows:
+        return "(no trials)"
+    names = sorted({k for r in rows for k in r["params"]})
+    head = ["trial", "rung", "metric", "coverage", "qd_score", "evals", "sec"] + names + ["run_dir"]
+    lines = [head]
+    for r in rows:
+        vals = [str(r["trial"]), str(r["rung"]), f"{r['metric']:.3f}", str(r["coverage"]), f"{r['qd_score']:.3f}",
+                str(r["evaluations"]), f"{r['elapsed_s']:.1f}"]
+        for n in names:
+            v = r["params"].get(n, "")
+            vals.append(f"{v:.4g}" if isinstance(v, float) else str(v))
+        vals.append(os.path.basename(r["run_dir"]))
+        lines.append(vals)
+    widths = [max(len(l[i]) for l in lines) for i in range(len(head))]
+    return "\n".join("  ".join(c.rjust(w) for c, w in zip(l, widths)) for l in lines)